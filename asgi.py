@@ -0,0 +1,225 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# ASGI entry point: async handlers for the polled dashboard API, the Flask app for everything else
+#
+#   uvicorn asgi:app --host 0.0.0.0 --port 5000
+#
+# /api/status, /api/status/<sensor_type> and /api/popular-times[/<day>|/week]
+# run on the event loop with an async driver (aiosqlite or asyncpg), so
+# thousands of slow or idle keep-alive clients cost no thread each. They
+# share the ring buffers, status cache and precomputed store with the Flask
+# routes in the same process and return the same bytes and headers. Every
+# other request (pages, admin, ingest, SSE) goes to main:app on a thread pool.
+import logging
+import os
+import re
+from datetime import datetime
+from urllib.parse import parse_qsl
+from a2wsgi import WSGIMiddleware
+from sqlalchemy.ext.asyncio import create_async_engine
+from werkzeug.exceptions import InternalServerError
+import instrumentation
+import main
+import precompute
+import rollup
+import queries
+import sqlite_profile
+from status_cache import status_cache
+
+logger = logging.getLogger(__name__)
+
+# Threads running the Flask routes; every open /api/status/stream holds one
+ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', 64))
+# Async database connections shared by the async handlers
+ASGI_DB_POOL_SIZE = int(os.environ.get('ASGI_DB_POOL_SIZE', 10))
+
+_STATUS_PATH = re.compile(r'/api/status(?:/(?P<sensor_type>[^/]+))?')
+# Other day numbers go to Flask, which answers them as before
+_POPULAR_TIMES_PATH = re.compile(r'/api/popular-times(?:/(?P<day>[0-6]|week))?')
+
+
+def async_database_url(url):
+    """The app's SQLAlchemy URL with the async driver of its database."""
+    scheme, rest = url.split('://', 1)
+    if scheme.startswith('sqlite'):
+        return f'sqlite+aiosqlite://{rest}'
+    if scheme.startswith('postgresql'):
+        return f'postgresql+asyncpg://{rest}'
+    raise ValueError(f'no async driver configured for {scheme} URLs')
+
+
+def _create_engine():
+    url = async_database_url(main.app.config["SQLALCHEMY_DATABASE_URI"])
+    # A ping is another trip through aiosqlite's thread and a file cannot go away
+    engine = create_async_engine(url, pool_size=ASGI_DB_POOL_SIZE, pool_recycle=300,
+                                 pool_pre_ping=not url.startswith('sqlite'))
+    if main.use_sqlite_profile:
+        # The async handlers only read
+        sqlite_profile.configure_engine(engine.sync_engine, read_only=True,
+                                        busy_timeout_ms=main.SQLITE_BUSY_TIMEOUT_MS,
+                                        mmap_mb=main.SQLITE_MMAP_MB, cache_mb=main.SQLITE_CACHE_MB)
+    return engine
+
+
+engine = _create_engine()
+if main.METRICS_ENABLED:
+    instrumentation.instrument_engine(engine.sync_engine)
+flask_app = WSGIMiddleware(main.app, workers=ASGI_WSGI_THREADS)
+
+
+async def get_status_snapshots(sensor_types=None):
+    """Async counterpart of main.get_status_snapshots."""
+    def compute(missing):
+        return main.statuses_from_inputs({sensor_type: inputs_by_type[sensor_type] for sensor_type in missing},
+                                         datetime.now(main.TIMEZONE))
+
+    with instrumentation.phase('status'):
+        async with engine.connect() as conn:
+            if sensor_types is None:
+                sensor_types = status_cache.cached_sensor_types()
+                if sensor_types is None:
+                    result = await conn.execute(queries.active_sensor_types())
+                    sensor_types = status_cache.store_sensor_types(list(dict.fromkeys(result.scalars())))
+                # If no registered sensors, fall back to just washer
+                sensor_types = sensor_types or ['washer']
+            status_cache.invalidate(await main.recent_readings.sync_async(conn))
+            inputs_by_type = await main.recent_readings.status_inputs_async(conn, sensor_types)
+
+        return status_cache.get_many(sensor_types, compute, datetime.now(main.TIMEZONE))
+
+
+async def read_dashboard(sensor_type, days):
+    """Async counterpart of main.read_dashboard (without all_statuses)."""
+    now = datetime.now(main.TIMEZONE)
+    stored = {}
+    if main.PRECOMPUTE_ENABLED:
+        keys = [precompute.STATUS_KEY] + [precompute.popular_times_key(sensor_type, day) for day in days]
+        async with engine.connect() as conn:
+            stored = precompute.snapshots_from_rows(await conn.execute(precompute.snapshots_query(keys)))
+
+    statuses, status_age = stored.get(precompute.STATUS_KEY, (None, None))
+    if statuses is None or status_age > main.STATUS_MAX_AGE or sensor_type not in statuses:
+        snapshots = await get_status_snapshots([sensor_type])
+        statuses = {sensor_type: snapshots[sensor_type].status}
+        status_age = 0.0
+
+    usage = None
+    popular_times = {}
+    for day in days:
+        histogram, age = stored.get(precompute.popular_times_key(sensor_type, day), (None, None))
+        if histogram is None or age > main.POPULAR_TIMES_MAX_AGE:
+            if usage is None:
+                with instrumentation.phase('popular_times'):
+                    async with engine.connect() as conn:
+                        usage = rollup.usage_from_rows(
+                            await conn.execute(*rollup.usage_query(sensor_type, day if len(days) == 1 else None)))
+            histogram, age = main.popular_times_histogram(sensor_type, day, usage), 0.0
+        day_data = main.popular_times_with_status(histogram, statuses[sensor_type], now)
+        day_data['data_age_seconds'] = max(age, status_age)
+        day_data['max_age_seconds'] = main.POPULAR_TIMES_MAX_AGE
+        popular_times[day] = day_data
+    return statuses, popular_times
+
+
+async def status_endpoint(scope, sensor_type):
+    snapshots = await get_status_snapshots(None if sensor_type is None else [sensor_type])
+    if sensor_type is None:
+        payload = {sensor_type: snapshot.status for sensor_type, snapshot in snapshots.items()}
+    else:
+        payload = snapshots[sensor_type].status
+    return main.conditional_status_response(snapshots, payload, _conditional_environ(scope))
+
+
+async def popular_times_endpoint(scope, day):
+    sensor_type = _query_arg(scope, 'sensor', 'washer')
+    if day == 'week':
+        _, week_data = await read_dashboard(sensor_type, list(range(7)))
+        return main.app.json.response(week_data)
+    day = main.day_index_of(datetime.now(main.TIMEZONE)) if day is None else int(day)
+    _, popular_times = await read_dashboard(sensor_type, [day])
+    return main.app.json.response(popular_times[day])
+
+
+def _conditional_environ(scope):
+    """The part of a WSGI environ that Response.make_conditional reads."""
+    environ = {'REQUEST_METHOD': scope['method']}
+    for name, value in scope['headers']:
+        if name in (b'if-none-match', b'if-modified-since'):
+            environ['HTTP_' + name.decode('latin-1').upper().replace('-', '_')] = value.decode('latin-1')
+    return environ
+
+
+def _query_arg(scope, name, default):
+    """First value of a query string argument, like request.args.get."""
+    for key, value in parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True):
+        if key == name:
+            return value
+    return default
+
+
+def _route(scope):
+    """(handler, argument, endpoint label) for the requests served here, None for Flask.
+
+    The label is the rule of the Flask route serving the same URL, so
+    /metrics reports both servers' requests under one name.
+    """
+    if scope['method'] != 'GET':
+        return None
+    path = scope['path']
+    match = _STATUS_PATH.fullmatch(path)
+    if match and match['sensor_type'] != 'stream':
+        sensor_type = match['sensor_type']
+        return status_endpoint, sensor_type, '/api/status' if sensor_type is None else '/api/status/<sensor_type>'
+    match = _POPULAR_TIMES_PATH.fullmatch(path)
+    if match:
+        day = match['day']
+        endpoint = {None: '/api/popular-times', 'week': '/api/popular-times/week'}.get(
+            day, '/api/popular-times/<int:day>')
+        return popular_times_endpoint, day, endpoint
+    return None
+
+
+async def _send(send, scope, response):
+    # As a WSGI server would send it: no entity headers or body on a 304.
+    # The server adds its own Date header.
+    environ = _conditional_environ(scope)
+    headers = response.get_wsgi_headers(environ)
+    await send({
+        'type': 'http.response.start',
+        'status': response.status_code,
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in headers.items() if name.lower() != 'date'],
+    })
+    await send({'type': 'http.response.body', 'body': b''.join(response.get_app_iter(environ))})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # Same background jobs the Flask app starts on its first request
+            main.start_precompute_scheduler()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await engine.dispose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    route = _route(scope) if scope['type'] == 'http' else None
+    if route is None:
+        return await flask_app(scope, receive, send)
+    handler, argument, endpoint = route
+    stats = instrumentation.begin_request(endpoint)
+    try:
+        response = await handler(scope, argument)
+    except Exception:
+        logger.exception(f"Exception on {scope['path']} [GET]")
+        response = InternalServerError().get_response()  # Flask's own 500 page
+    query_string = scope['query_string'].decode('latin-1')
+    instrumentation.end_request(stats, scope['method'], scope['path'] + (f'?{query_string}' if query_string else ''),
+                                response.status_code)
+    await _send(send, scope, response)
+
@@ -0,0 +1,325 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# Static asset pipeline: minified, content-hashed and pre-compressed copies of static/
+#
+# init_app() builds every .css and .js file of the static folder in memory
+# when the app starts. url_for('static', filename='script.js') then returns
+# /static/script.<hash>.js, which is served with the best encoding the
+# browser accepts and cached for a year: a changed file gets a new name.
+# Other static files and the plain names are served by Flask as before.
+# HTML responses are compressed on the fly.
+#
+#   python assets.py    # sizes of the built assets
+import gzip
+import hashlib
+import logging
+import os
+import re
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Hex digits of the content hash in built file names
+HASH_LENGTH = 10
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Smaller responses gain nothing from compression
+COMPRESS_MIN_BYTES = 512
+# Assets are compressed once at startup, HTML on every response
+STATIC_LEVELS = {'br': 11, 'gzip': 9}
+DYNAMIC_LEVELS = {'br': 4, 'gzip': 6}
+# Preferred first when the browser accepts both
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+_CSS_STRING = r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\''
+_CSS_STRING_OR_COMMENT = re.compile(rf'({_CSS_STRING})|/\*.*?\*/', re.S)
+_CSS_SPLIT_STRINGS = re.compile(rf'({_CSS_STRING})')
+
+
+def minify_css(source):
+    """Drop comments and the whitespace CSS does not need; strings are kept as they are."""
+    source = _CSS_STRING_OR_COMMENT.sub(lambda match: match.group(1) or '', source)
+    parts = _CSS_SPLIT_STRINGS.split(source)
+    for index in range(0, len(parts), 2):  # odd indexes are strings
+        part = re.sub(r'\s+', ' ', parts[index])
+        part = re.sub(r'\s*([{};,>])\s*', r'\1', part)
+        parts[index] = re.sub(r':\s+', ':', part)
+    return ''.join(parts).replace(';}', '}').strip()
+
+
+# After these a / starts a regular expression, not a division
+_REGEX_AFTER_PUNCT = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_AFTER_WORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw'}
+# Whitespace next to these characters is never needed
+_JS_TIGHT = set('{}()[];,:=<>!&|?*%^~')
+_WORD = re.compile(r'[A-Za-z0-9_$]+')
+
+
+def _skip_string(source, i):
+    quote = source[i]
+    i += 1
+    while source[i] != quote:
+        i += 2 if source[i] == '\\' else 1
+    return i + 1
+
+
+def _skip_regex(source, i):
+    i += 1
+    in_class = False
+    while in_class or source[i] != '/':
+        if source[i] == '\\':
+            i += 1
+        elif source[i] == '[':
+            in_class = True
+        elif source[i] == ']':
+            in_class = False
+        i += 1
+    return _WORD.match(source, i + 1).end() if _WORD.match(source, i + 1) else i + 1  # flags
+
+
+def _skip_template(source, i):
+    i += 1
+    while source[i] != '`':
+        if source[i] == '\\':
+            i += 2
+        elif source.startswith('${', i):
+            depth = 1
+            tokens = _js_tokens(source, i + 2)
+            for kind, text in tokens:
+                if text == '{':
+                    depth += 1
+                elif text == '}':
+                    depth -= 1
+                    if depth == 0:
+                        break
+            i = tokens.position
+        else:
+            i += 1
+    return i + 1
+
+
+class _js_tokens:
+    """Iterator of (kind, text) from source[start:]: kind is 'space',
+    'comment', 'string' (also templates and regular expressions), 'word' or
+    'punct'. position is the index after the last token."""
+
+    def __init__(self, source, start=0):
+        self.source = source
+        self.position = start
+        self._previous = None  # last token that is not space or comment
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        source, i = self.source, self.position
+        if i >= len(source):
+            raise StopIteration
+        char = source[i]
+        if char.isspace():
+            end = i
+            while end < len(source) and source[end].isspace():
+                end += 1
+            kind = 'space'
+        elif source.startswith('//', i):
+            end = source.find('\n', i)
+            end = len(source) if end == -1 else end
+            kind = 'comment'
+        elif source.startswith('/*', i):
+            end = source.index('*/', i + 2) + 2
+            kind = 'comment'
+        elif char in '\'"':
+            end, kind = _skip_string(source, i), 'string'
+        elif char == '`':
+            end, kind = _skip_template(source, i), 'string'
+        elif char == '/' and (self._previous is None or self._previous in _REGEX_AFTER_PUNCT
+                              or self._previous in _REGEX_AFTER_WORDS):
+            end, kind = _skip_regex(source, i), 'string'
+        elif _WORD.match(source, i):
+            end, kind = _WORD.match(source, i).end(), 'word'
+        else:
+            end, kind = i + 1, 'punct'
+        text = source[i:end]
+        self.position = end
+        if kind not in ('space', 'comment'):
+            self._previous = text
+        return kind, text
+
+
+def _without_console_log(tokens):
+    """Drop console.log(...) statements; calls inside expressions are kept."""
+    kept = []
+    i = 0
+    while i < len(tokens):
+        previous = next((text for kind, text in reversed(kept) if kind != 'space'), None)
+        if [text for _, text in tokens[i:i + 4]] == ['console', '.', 'log', '('] \
+                and (previous is None or previous in (';', '{', '}')):
+            depth = 0
+            for i in range(i + 3, len(tokens)):
+                if tokens[i][1] == '(':
+                    depth += 1
+                elif tokens[i][1] == ')':
+                    depth -= 1
+                    if depth == 0:
+                        break
+            i += 1
+            while i < len(tokens) and tokens[i][0] == 'space' and '\n' not in tokens[i][1]:
+                i += 1
+            if i < len(tokens) and tokens[i][1] == ';':
+                i += 1
+            continue
+        kept.append(tokens[i])
+        i += 1
+    return kept
+
+
+def minify_js(source, drop_console_log=True):
+    """Drop comments, indentation and the whitespace JavaScript does not
+    need, and console.log statements. Line breaks are kept where automatic
+    semicolon insertion could depend on them; strings, templates and
+    regular expressions are copied unchanged."""
+    tokens = [(kind, text) for kind, text in _js_tokens(source) if kind != 'comment']
+    if drop_console_log:
+        tokens = _without_console_log(tokens)
+    merged = []  # whitespace on both sides of what was dropped becomes one token
+    for kind, text in tokens:
+        if kind == 'space' and merged and merged[-1][0] == 'space':
+            merged[-1] = ('space', merged[-1][1] + text)
+        else:
+            merged.append((kind, text))
+    tokens = merged
+    out = []
+    for index, (kind, text) in enumerate(tokens):
+        if kind != 'space':
+            out.append(text)
+            continue
+        if not out:
+            continue
+        before = out[-1][-1]
+        after = next((text for kind, text in tokens[index + 1:] if kind != 'space'), '')[:1]
+        if not after:
+            continue
+        if '\n' in text:
+            if before not in '{;,([' and after not in '})];,':
+                out.append('\n')
+        elif before not in _JS_TIGHT and after not in _JS_TIGHT:
+            out.append(' ')
+    return ''.join(out).strip() + '\n'
+
+
+_MINIFIERS = {'.css': minify_css, '.js': minify_js}
+_MIMETYPES = {'.css': 'text/css', '.js': 'text/javascript'}
+
+
+def compress(data, encoding, levels=STATIC_LEVELS):
+    if encoding == 'br':
+        return brotli.compress(data, quality=levels['br'])
+    return gzip.compress(data, compresslevel=levels['gzip'], mtime=0)
+
+
+def negotiate(accept_encodings, available=ENCODINGS):
+    """Best of the available encodings the Accept-Encoding header allows, or None."""
+    for encoding in available:
+        if accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+class Asset:
+    """A built static file: its body in every encoding."""
+    __slots__ = ('name', 'hashed_name', 'mimetype', 'digest', 'bodies', 'source_bytes')
+
+    def __init__(self, name, hashed_name, mimetype, digest, bodies, source_bytes):
+        self.name = name
+        self.hashed_name = hashed_name
+        self.mimetype = mimetype
+        self.digest = digest
+        self.bodies = bodies  # {None: minified, 'gzip': ..., 'br': ...}
+        self.source_bytes = source_bytes
+
+
+def build(static_folder):
+    """Build every .css and .js file under static_folder; returns {name: Asset}
+    with '/'-separated names relative to it."""
+    assets = {}
+    for directory, _, filenames in os.walk(static_folder):
+        for filename in sorted(filenames):
+            stem, extension = os.path.splitext(filename)
+            if extension not in _MINIFIERS:
+                continue
+            path = os.path.join(directory, filename)
+            with open(path, encoding='utf-8') as f:
+                source = f.read()
+            minified = _MINIFIERS[extension](source).encode('utf-8')
+            digest = hashlib.sha256(minified).hexdigest()[:HASH_LENGTH]
+            name = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            hashed_name = name[:-len(filename)] + f'{stem}.{digest}{extension}'
+            bodies = {None: minified}
+            for encoding in ENCODINGS:
+                bodies[encoding] = compress(minified, encoding)
+            assets[name] = Asset(name, hashed_name, _MIMETYPES[extension], digest, bodies, len(source.encode('utf-8')))
+    return assets
+
+
+def asset_response(asset):
+    """The asset in the best accepted encoding, cacheable for a year."""
+    encoding = negotiate(request.accept_encodings, [key for key in ENCODINGS if key in asset.bodies])
+    response = Response(asset.bodies[encoding], mimetype=asset.mimetype)
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    response.set_etag(f'{asset.digest}-{encoding or "identity"}')
+    return response.make_conditional(request)
+
+
+def compress_html(response):
+    """Compress an HTML response for browsers that accept it (after_request)."""
+    if response.mimetype != 'text/html' or response.direct_passthrough or response.is_streamed \
+            or 'Content-Encoding' in response.headers or response.status_code in (204, 304):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(request.accept_encodings)
+    data = response.get_data()
+    if encoding is None or len(data) < COMPRESS_MIN_BYTES:
+        return response
+    response.set_data(compress(data, encoding, DYNAMIC_LEVELS))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_app(app, compress_html_responses=True):
+    """Serve hashed builds of app's static CSS/JS and compress its HTML.
+
+    Returns the {name: Asset} built.
+    """
+    assets = build(app.static_folder)
+    by_hashed_name = {asset.hashed_name: asset for asset in assets.values()}
+    send_static = app.view_functions['static']
+
+    @app.url_defaults
+    def _hashed_static_url(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in assets:
+            values['filename'] = assets[values['filename']].hashed_name
+
+    def static(filename):
+        asset = by_hashed_name.get(filename)
+        if asset is None:
+            return send_static(filename=filename)
+        return asset_response(asset)
+
+    app.view_functions['static'] = static
+    if compress_html_responses:
+        app.after_request(compress_html)
+    logger.info(f"Built static assets: {sorted(asset.hashed_name for asset in assets.values())}")
+    return assets
+
+
+if __name__ == '__main__':
+    static_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    for asset in build(static_folder).values():
+        sizes = ', '.join(f'{encoding or "minified"} {len(body)}' for encoding, body in asset.bodies.items())
+        print(f'{asset.hashed_name}: source {asset.source_bytes}, {sizes} bytes')
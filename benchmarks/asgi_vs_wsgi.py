@@ -0,0 +1,233 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# Concurrent dashboard connections: gunicorn (WSGI, main:app) against uvicorn (ASGI, asgi:app)
+#
+# Usage (the database is copied for every server, the original is not modified):
+#   python benchmarks/asgi_vs_wsgi.py --db /tmp/hot-paths/hot-paths-1000000.db \
+#       --connections 250,1000,2000,4000 --slow-clients 100 --duration 30 --output asgi.json
+#
+# For every server and connection count, that many keep-alive connections
+# poll like open dashboards: one request every --interval seconds, mostly
+# /api/status with the ETag of the previous answer, sometimes one sensor or
+# the popular times of a day or the week. --slow-clients more connections
+# send each request in two parts --slow-seconds apart, like phones on poor
+# Wi-Fi. Latency is measured on the regular connections only. A connection
+# the server closed while idle is reopened and the request retried once,
+# as a browser would. The capacity of a server is the largest connection
+# count with under 1% errors and a p99 below --p99-limit-ms.
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from common import Connection, percentile
+
+SERVERS = {
+    # The deployment in docker/Dockerfile.txt with one worker
+    'wsgi': ['gunicorn', '--workers', '1', '--worker-class', 'gthread', '--threads', '64',
+             '--backlog', '4096', 'main:app'],
+    'asgi': ['uvicorn', '--workers', '1', '--backlog', '4096', '--no-access-log', 'asgi:app'],
+}
+# (weight, path) of what an open dashboard requests; {day} is a day number
+DASHBOARD_PATHS = [
+    (90, '/api/status'),
+    (5, '/api/status/washer'),
+    (4, '/api/popular-times/{day}'),
+    (1, '/api/popular-times/week'),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare concurrent-connection capacity of WSGI and ASGI serving")
+    parser.add_argument('--db', help='SQLite database to copy for every server')
+    parser.add_argument('--database-url', help='PostgreSQL URL to use instead of --db (not copied)')
+    parser.add_argument('--servers', default='wsgi,asgi', help='Comma-separated: wsgi, asgi')
+    parser.add_argument('--connections', default='250,1000,2000,4000',
+                        help='Comma-separated counts of polling connections')
+    parser.add_argument('--slow-clients', type=int, default=0, help='Additional slow connections')
+    parser.add_argument('--slow-seconds', type=float, default=2.0, help='Pause inside every slow request')
+    parser.add_argument('--interval', type=float, default=5.0, help='Seconds between polls (REFRESH_INTERVAL)')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds of load per connection count')
+    parser.add_argument('--timeout', type=float, default=10, help='Seconds before a request counts as failed')
+    parser.add_argument('--p99-limit-ms', type=float, default=1000, help='Highest p99 that still counts')
+    parser.add_argument('--output', help='Write the JSON results here as well')
+    args = parser.parse_args()
+    if not args.db and not args.database_url:
+        parser.error('one of --db and --database-url is required')
+    return args
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_up(port, server, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            sys.exit(f"server exited with {server.returncode}")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=5) as s:
+                s.sendall(b'GET /api/status HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n')
+                if s.recv(12).startswith(b'HTTP/1.1 200'):
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    sys.exit("server did not answer in time")
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+        self.errors = {}
+        self.reconnects = 0
+        self.slow_requests = 0
+
+    def error(self, name):
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+
+async def dashboard(port, args, deadline, stats, rng, slow):
+    """Poll like one open dashboard until deadline."""
+    connection = Connection(port, args.timeout)
+    paths = [path for weight, path in DASHBOARD_PATHS for _ in range(weight)]
+    etag = None
+    await asyncio.sleep(rng.uniform(0, args.interval))  # spread the connections over one interval
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        path = rng.choice(paths).format(day=rng.randrange(7))
+        headers = {'If-None-Match': etag} if path == '/api/status' and etag else None
+        pause = args.slow_seconds if slow else 0.0
+        try:
+            status, response_headers, _, reopened = await connection.fetch(path, headers, pause)
+        except asyncio.TimeoutError:
+            stats.error('timeout')
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            stats.error(type(e).__name__)
+        else:
+            stats.reconnects += reopened
+            if path == '/api/status' and 'etag' in response_headers:
+                etag = response_headers['etag']
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            if slow:
+                stats.slow_requests += 1
+            elif status in (200, 304):
+                stats.latencies.append(time.monotonic() - started)
+            else:
+                stats.error(f'HTTP {status}')
+        await asyncio.sleep(max(0.0, args.interval - (time.monotonic() - started)))
+    connection.close()
+
+
+async def load(port, args, connections):
+    stats = Stats()
+    deadline = time.monotonic() + args.duration
+    rng = random.Random(connections)
+    tasks = [dashboard(port, args, deadline, stats, random.Random(rng.random()), slow=False)
+             for _ in range(connections)]
+    tasks += [dashboard(port, args, deadline, stats, random.Random(rng.random()), slow=True)
+              for _ in range(args.slow_clients)]
+    await asyncio.gather(*tasks)
+    return stats
+
+
+def run_server(args, server_name, work_dir):
+    env = dict(os.environ, LOG_LEVEL='WARNING')
+    if args.database_url:
+        env.update(USE_POSTGRES='true', DATABASE_URL=args.database_url)
+    else:
+        db_path = os.path.join(work_dir, f'{server_name}.db')
+        shutil.copyfile(args.db, db_path)
+        env['SQLITE_PATH'] = db_path
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'main', 'db-upgrade'],
+                   cwd=ROOT, env=env, check=True, capture_output=True)
+    env['AUTO_MIGRATE'] = 'false'
+
+    port = _free_port()
+    command = [sys.executable, '-m'] + SERVERS[server_name] + \
+        (['--bind', f'127.0.0.1:{port}'] if server_name == 'wsgi' else ['--host', '127.0.0.1', '--port', str(port)])
+    log_path = os.path.join(work_dir, f'{server_name}.log')
+    with open(log_path, 'w') as log:
+        server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    results = []
+    try:
+        _wait_until_up(port, server)
+        for connections in (int(value) for value in args.connections.split(',')):
+            stats = asyncio.run(load(port, args, connections))
+            stats.latencies.sort()
+            requests = len(stats.latencies) + sum(stats.errors.values())
+            result = {
+                'connections': connections,
+                'slow_clients': args.slow_clients,
+                'requests': requests,
+                'requests_per_second': round(len(stats.latencies) / args.duration, 1),
+                'p50_ms': round(percentile(stats.latencies, 0.5) * 1000, 1) if stats.latencies else None,
+                'p99_ms': round(percentile(stats.latencies, 0.99) * 1000, 1) if stats.latencies else None,
+                'max_ms': round(stats.latencies[-1] * 1000, 1) if stats.latencies else None,
+                'error_rate': round(sum(stats.errors.values()) / requests, 4) if requests else None,
+                'errors': stats.errors,
+                'statuses': {str(status): count for status, count in sorted(stats.statuses.items())},
+                'reconnects': stats.reconnects,
+                'slow_requests': stats.slow_requests,
+            }
+            results.append(result)
+            print(f"{server_name} {connections:5} connections: {result['requests_per_second']:7.1f} req/s  "
+                  f"p50 {result['p50_ms']} ms  p99 {result['p99_ms']} ms  errors {result['errors']}  "
+                  f"reconnects {result['reconnects']}", file=sys.stderr)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return results
+
+
+def capacity(results, p99_limit_ms):
+    """Largest connection count with under 1% errors and p99 within the limit."""
+    passing = [result['connections'] for result in results
+               if result['error_rate'] is not None and result['error_rate'] < 0.01
+               and result['p99_ms'] is not None and result['p99_ms'] <= p99_limit_ms]
+    return max(passing) if passing else 0
+
+
+def main_():
+    args = parse_args()
+    work_dir = tempfile.mkdtemp(prefix='asgi-vs-wsgi-')
+    runs = {}
+    try:
+        for server_name in args.servers.split(','):
+            results = run_server(args, server_name, work_dir)
+            runs[server_name] = {'results': results, 'capacity': capacity(results, args.p99_limit_ms)}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = json.dumps({
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'cpus': os.cpu_count(),
+        'interval': args.interval,
+        'duration': args.duration,
+        'slow_seconds': args.slow_seconds,
+        'p99_limit_ms': args.p99_limit_ms,
+        'servers': {name: ' '.join(command) for name, command in SERVERS.items()},
+        'runs': runs,
+    }, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main_()
@@ -0,0 +1,99 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# Helpers shared by the benchmark scripts
+import asyncio
+import threading
+
+
+class QueryCounter:
+    """Counts statements the app sends to its engines (writer and reader)."""
+
+    def __init__(self, engines):
+        from sqlalchemy import event
+        self.count = 0
+        self._lock = threading.Lock()
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args):
+        with self._lock:
+            self.count += 1
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection (asyncio) with the minimum of parsing."""
+
+    def __init__(self, port, timeout, host='127.0.0.1'):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.reader = self.writer = None
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def request(self, path, headers=None, pause=0.0, method='GET', body=b''):
+        """Send a request (in two parts pause seconds apart); returns (status, headers, body)."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port, limit=1 << 20)
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {self.host}']
+        lines += [f'{name}: {value}' for name, value in (headers or {}).items()]
+        if body:
+            lines.append(f'Content-Length: {len(body)}')
+        data = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+        if pause:
+            self.writer.write(data[:len(data) // 2])
+            await self.writer.drain()
+            await asyncio.sleep(pause)
+            data = data[len(data) // 2:]
+        self.writer.write(data)
+        await self.writer.drain()
+
+        head = await self.reader.readuntil(b'\r\n\r\n')
+        status_line, *header_lines = head.decode('latin-1').split('\r\n')
+        status = int(status_line.split()[1])
+        response_headers = {}
+        for line in header_lines:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                response_headers[name.strip().lower()] = value.strip()
+        if response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                chunks.append(await self.reader.readexactly(size + 2))
+                if size == 0:  # no trailers
+                    break
+            response_body = b''.join(chunk[:-2] for chunk in chunks)
+        else:
+            length = int(response_headers.get('content-length', 0))
+            response_body = await self.reader.readexactly(length) if length else b''
+        if response_headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, response_headers, response_body
+
+    async def fetch(self, path, headers=None, pause=0.0, method='GET', body=b''):
+        """request() within the timeout, reopening once a connection the server
+        closed while idle (as a browser does). Returns (status, headers, body,
+        reopened); raises asyncio.TimeoutError, OSError and friends."""
+        for attempt in range(2):
+            reused = self.writer is not None
+            try:
+                return (*await asyncio.wait_for(self.request(path, headers, pause, method, body), self.timeout),
+                        attempt == 1)
+            except (asyncio.IncompleteReadError, ConnectionResetError, BrokenPipeError):
+                self.close()
+                if attempt or not reused:
+                    raise
+            except BaseException:
+                self.close()
+                raise
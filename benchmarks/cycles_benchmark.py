@@ -0,0 +1,133 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# Compare vectorized and per-row cycle extraction on synthetic history
+#
+# Usage:
+#   python benchmarks/cycles_benchmark.py --sensors 50 --days 365
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark historical cycle extraction")
+    parser.add_argument('--sensors', type=int, default=50)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--cycles-per-day', type=int, default=4)
+    parser.add_argument('--end-to-end-days', type=int, default=30,
+                        help='Days per sensor written to a temporary SQLite for the update() run')
+    parser.add_argument('--output', help='Write the JSON results here as well')
+    return parser.parse_args()
+
+
+def synthetic_times(days, cycles_per_day, seed):
+    """Per-minute readings during cycles of 30-90 minutes, as naive local datetimes."""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    times = []
+    for day in range(days):
+        day_start = start + timedelta(days=day)
+        offsets = sorted(rng.sample(range(6 * 60, 22 * 60, 120), cycles_per_day))
+        for offset in offsets:
+            cycle_start = day_start + timedelta(minutes=offset, seconds=rng.randint(0, 59))
+            for minute in range(rng.randint(30, 90)):
+                times.append(cycle_start + timedelta(minutes=minute))
+    return times
+
+
+def bench_in_memory(args, timezone, gap_tolerance):
+    import cycles
+
+    per_sensor = [synthetic_times(args.days, args.cycles_per_day, seed) for seed in range(args.sensors)]
+    total_rows = sum(len(times) for times in per_sensor)
+
+    started = time.perf_counter()
+    naive_count = 0
+    for times in per_sensor:
+        localized = [timezone.localize(value) for value in times]
+        naive_count += len(cycles.naive_extract_cycles(localized, gap_tolerance))
+    naive_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    texts = [value.strftime('%Y-%m-%d %H:%M:%S') for times in per_sensor for value in times]
+    codes = np.repeat(np.arange(args.sensors), [len(times) for times in per_sensor])
+    convert_started = time.perf_counter()
+    epoch = cycles.to_epoch_seconds(texts, timezone)
+    order = np.lexsort((epoch, codes))
+    first, last = cycles.extract_cycles(epoch[order], codes[order], gap_tolerance)
+    vector_seconds = time.perf_counter() - convert_started
+    formatting_seconds = convert_started - started
+
+    assert len(first) == naive_count, (len(first), naive_count)
+    return {
+        'rows': total_rows,
+        'cycles': naive_count,
+        'naive_seconds': round(naive_seconds, 3),
+        'vectorized_seconds': round(vector_seconds, 3),
+        'speedup': round(naive_seconds / vector_seconds, 1),
+        'text_formatting_seconds': round(formatting_seconds, 3),
+    }
+
+
+def bench_end_to_end(args, gap_tolerance):
+    db_path = os.path.join(tempfile.mkdtemp(), 'cycles-bench.db')
+    os.environ['SQLITE_PATH'] = db_path
+    os.environ['AUTO_MIGRATE'] = 'true'
+    import main
+    import cycles
+
+    rows = []
+    for seed in range(args.sensors):
+        for value in synthetic_times(args.end_to_end_days, args.cycles_per_day, seed):
+            rows.append({'sensor_name': f'sensor{seed}', 'vib_date': value.strftime('%Y-%m-%d %H:%M:%S')})
+    with main.app.app_context():
+        from sqlalchemy import text
+        from models import db
+        with db.engine.begin() as conn:
+            conn.execute(text('INSERT INTO sensor_data (sensor_name, vib_date) VALUES (:sensor_name, :vib_date)'), rows)
+
+        started = time.perf_counter()
+        processed, inserted = cycles.update(main.TIMEZONE, gap_tolerance)
+        seconds = time.perf_counter() - started
+
+        # A second run finds nothing new
+        started = time.perf_counter()
+        cycles.update(main.TIMEZONE, gap_tolerance)
+        idle_seconds = time.perf_counter() - started
+    return {
+        'rows': processed,
+        'cycles': inserted,
+        'update_seconds': round(seconds, 3),
+        'rows_per_second': round(processed / seconds),
+        'idle_update_seconds': round(idle_seconds, 4),
+    }
+
+
+def main():
+    args = parse_args()
+    import pytz
+    timezone = pytz.timezone('America/Los_Angeles')
+    gap_tolerance = 8.25  # MID_CYCLE_GAP_TOLERANCE in main.py
+
+    results = {
+        'sensors': args.sensors,
+        'days': args.days,
+        'in_memory': bench_in_memory(args, timezone, gap_tolerance),
+        'end_to_end': bench_end_to_end(args, gap_tolerance),
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
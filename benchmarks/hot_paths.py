@@ -0,0 +1,230 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# Time the status, popular times and admin hot paths at several database sizes
+#
+# Usage:
+#   python benchmarks/hot_paths.py --sizes 10k,1m,50m --data-dir /tmp/hot-paths --output results.json
+#   python benchmarks/hot_paths.py --sizes 10k --compare results.json
+#
+# Databases are generated once per size with `flask generate-data` and
+# reused on later runs. Every size is measured in its own process because
+# main.py binds its database at import time.
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from common import QueryCounter, percentile
+
+# A regression is reported when p50 grows by more than this factor and
+# REGRESSION_MIN_MS, or when a call issues more queries than before
+REGRESSION_FACTOR = 1.2
+REGRESSION_MIN_MS = 2
+
+
+def parse_size(value):
+    value = value.strip().lower()
+    multiplier = {'k': 1000, 'm': 1000000}.get(value[-1], 1)
+    return int(float(value.rstrip('km')) * multiplier)
+
+
+def sensors_for(rows):
+    """Sensor count that keeps the history to a plausible couple of years."""
+    return max(2, min(200, rows // 250000 * 2))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark main.py hot paths at several data sizes")
+    parser.add_argument('--sizes', default='10k,1m,50m', help='Comma-separated row counts (k/m suffixes)')
+    parser.add_argument('--data-dir', default='/tmp/hot-paths', help='Where the SQLite databases are kept')
+    parser.add_argument('--database-url', help='PostgreSQL URL instead of SQLite; {rows} is replaced '
+                                               'by the size, e.g. postgresql://localhost/bench_{rows}')
+    parser.add_argument('--sensors', type=int, help='Sensors per database (default scales with size)')
+    parser.add_argument('--iterations', type=int, default=50, help='Calls per target and mode')
+    parser.add_argument('--max-seconds', type=float, default=30, help='Time budget per target and mode')
+    parser.add_argument('--output', help='Write the JSON results here')
+    parser.add_argument('--compare', help='Earlier results file to compare p50 latencies against')
+    parser.add_argument('--measure', help=argparse.SUPPRESS)  # internal: measure one size
+    return parser.parse_args()
+
+
+def database_env(args, rows):
+    env = dict(os.environ, AUTO_MIGRATE='true')
+    if args.database_url:
+        env['USE_POSTGRES'] = 'true'
+        env['DATABASE_URL'] = args.database_url.format(rows=rows)
+    else:
+        os.makedirs(args.data_dir, exist_ok=True)
+        env['SQLITE_PATH'] = os.path.abspath(os.path.join(args.data_dir, f'hot-paths-{rows}.db'))
+    return env
+
+
+def ensure_data(args, rows, env):
+    """Generate the database for a size unless it already has its readings."""
+    sensors = args.sensors or sensors_for(rows)
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-m', 'flask', '--app', 'main', 'generate-data',
+         '--rows', str(rows), '--sensors', str(sensors)],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        if 'already has' in result.stderr:
+            return None  # generated on an earlier run
+        sys.exit(f"generate-data failed for {rows} rows:\n{result.stderr[-2000:]}")
+    return round(time.perf_counter() - started, 1)
+
+
+def _targets(main):
+    """(name, callable) pairs; callables run inside an app context."""
+    client = main.app.test_client()
+    today = int(datetime.now(main.TIMEZONE).strftime('%w'))
+
+    def route(path):
+        def call():
+            response = client.get(path)
+            assert response.status_code == 200, (path, response.status_code)
+        return call
+
+    return [
+        ('get_sensor_status', lambda: main.get_sensor_status('washer')),
+        ('get_all_sensors_status', main.get_all_sensors_status),
+        ('get_popular_times', lambda: main.get_popular_times('washer', today)),
+        ('GET /api/status', route('/api/status')),
+        ('GET /api/status/washer', route('/api/status/washer')),
+        ('GET /api/popular-times', route('/api/popular-times')),
+        ('GET /api/popular-times/week', route('/api/popular-times/week')),
+        ('GET /admin', route('/admin')),
+        ('GET /', route('/')),
+    ]
+
+
+def _reset_caches(main):
+    main.status_cache.clear()
+    main.recent_readings.clear()
+
+
+def measure(args):
+    """Measure every target in this process (database chosen by the environment)."""
+    import logging
+    import main
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = {}
+    with main.app.app_context():
+        counter = QueryCounter(main.db.engines.values())
+        rows = main.synthetic.count_readings()
+        sensors = len(main._load_active_sensor_types())
+        for name, call in _targets(main):
+            results[name] = {}
+            # cold: status cache and ring buffers emptied before every call;
+            # warm: caches kept, as a busy worker serves requests
+            for mode in ('cold', 'warm'):
+                call()  # warm-up, also fills the caches for the warm mode
+                latencies = []
+                queries = []
+                deadline = time.perf_counter() + args.max_seconds
+                while len(latencies) < args.iterations and \
+                        (len(latencies) < 3 or time.perf_counter() < deadline):
+                    if mode == 'cold':
+                        _reset_caches(main)
+                    queries_before = counter.count
+                    started = time.perf_counter()
+                    call()
+                    latencies.append(time.perf_counter() - started)
+                    queries.append(counter.count - queries_before)
+                    main.db.session.remove()
+                latencies.sort()
+                results[name][mode] = {
+                    'iterations': len(latencies),
+                    'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+                    'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+                    'max_ms': round(latencies[-1] * 1000, 3),
+                    'queries_per_call': round(sum(queries) / len(queries), 2),
+                }
+        dialect = main.db.engine.dialect.name
+    return {'rows': rows, 'sensors': sensors, 'database': dialect, 'targets': results}
+
+
+def compare(previous, current):
+    """Print p50 changes against an earlier results file; returns the regressions."""
+    regressions = []
+    previous_sizes = {size['rows']: size for size in previous.get('sizes', [])}
+    for size in current['sizes']:
+        before = previous_sizes.get(size['rows'])
+        if before is None:
+            continue
+        print(f"\n{size['rows']} rows: {previous.get('git_commit', '?')[:10]} -> {current['git_commit'][:10]}")
+        for name, modes in size['targets'].items():
+            for mode, stats in modes.items():
+                old = before['targets'].get(name, {}).get(mode)
+                if old is None:
+                    continue
+                ratio = stats['p50_ms'] / old['p50_ms'] if old['p50_ms'] else float('inf')
+                regressed = (ratio > REGRESSION_FACTOR and stats['p50_ms'] - old['p50_ms'] > REGRESSION_MIN_MS) \
+                    or stats['queries_per_call'] > old['queries_per_call']
+                if regressed:
+                    regressions.append((size['rows'], name, mode))
+                print(f"  {name:28} {mode:4}  p50 {old['p50_ms']:10.3f} -> {stats['p50_ms']:10.3f} ms "
+                      f"({ratio:5.2f}x)  queries {old['queries_per_call']} -> {stats['queries_per_call']}"
+                      f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def main_():
+    args = parse_args()
+    if args.measure:
+        print(json.dumps(measure(args)))
+        return
+
+    results = {
+        'git_commit': git_commit(),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'iterations': args.iterations,
+        'sizes': [],
+    }
+    for rows in (parse_size(size) for size in args.sizes.split(',')):
+        env = database_env(args, rows)
+        generate_seconds = ensure_data(args, rows, env)
+        measured = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--measure', '1',
+             '--iterations', str(args.iterations), '--max-seconds', str(args.max_seconds)],
+            cwd=ROOT, env=env, capture_output=True, text=True
+        )
+        if measured.returncode != 0:
+            sys.exit(f"Measuring {rows} rows failed:\n{measured.stderr[-2000:]}")
+        size = json.loads(measured.stdout.strip().splitlines()[-1])
+        size['generate_seconds'] = generate_seconds
+        if 'SQLITE_PATH' in env:
+            size['database_bytes'] = os.path.getsize(env['SQLITE_PATH'])
+        results['sizes'].append(size)
+        print(f"{rows} rows measured", file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main_()
@@ -0,0 +1,546 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# End-to-end load test: dashboards on kiosks and phones as script.js drives them, plus sensors writing readings
+#
+# Usage (the database is copied for every run, the original is not modified):
+#   python benchmarks/load_test.py --db /tmp/hot-paths/hot-paths-1000000.db \
+#       --kiosks 20 --phones 200 --sensors 50 --workers 1,2,4 \
+#       --settings SQLITE_PRODUCTION_MODE=true --settings SQLITE_PRODUCTION_MODE=false \
+#       --duration 120 --output load.json
+#   python benchmarks/load_test.py --url http://127.0.0.1:5000 --server-pid 1234 ...
+#
+# Every run (worker count x --settings) starts gunicorn on a fresh copy of
+# the database, or uses the server at --url. The clients then follow
+# static/script.js:
+#   - a page load fetches /, the /static/ files it links (kept in an HTTP
+#     cache as the browser does) and /api/popular-times
+#   - /api/status every --interval seconds (REFRESH_INTERVAL) with the ETag
+#     of the last answer; /api/popular-times again when the hour or the
+#     washer status differs from the shown popular times
+#   - now and then someone picks a day (/api/popular-times/<day>), the week
+#     view (/api/popular-times/week, once per page load) or Today; kiosks
+#     go back to today after 30 idle minutes
+# --kiosks stay on the page for the whole run. --phones are concurrent
+# visits of --phone-session-seconds; each ends and a new phone arrives,
+# --returning of them with the assets of an earlier visit in cache.
+# --sensors each write one reading a minute, POSTed to /api/ingest like
+# the gateways or, with --sensor-mode direct, committed straight into the
+# SQLite file like the older ones.
+#
+# After --warmup seconds, for --duration seconds, every request is timed
+# per route, and the server's processes (gunicorn master and workers, read
+# from /proc) are sampled for CPU and RSS. The JSON has one entry per run
+# with its configuration, so runs can be compared directly.
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+import re
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from urllib.parse import urlsplit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from common import Connection, percentile
+
+SITE_OFFSET = dt_timezone(timedelta(hours=-7))
+# Answers that are not errors
+OK_STATUSES = (200, 202, 304)
+ACCEPT_ENCODING = 'gzip, deflate'  # the harness does not need to decode brotli
+AUTO_RESET_SECONDS = 30 * 60
+# (weight, action) of one interaction with the popular times widget
+INTERACTIONS = [(70, 'day'), (20, 'week'), (10, 'today')]
+_ASSET_URL = re.compile(r'<(?:link[^>]+href|script[^>]+src)="(/static/[^"]+)"')
+_ROUTES = [
+    (re.compile(r'/static/.*'), '/static/<file>'),
+    (re.compile(r'/api/popular-times/\d'), '/api/popular-times/<day>'),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load-test the app with simulated dashboards and sensors")
+    target = parser.add_argument_group('target')
+    target.add_argument('--db', help='SQLite database to copy for every run')
+    target.add_argument('--database-url', help='PostgreSQL URL to use instead of --db (written to, not copied)')
+    target.add_argument('--url', help='Load an already running server instead of starting gunicorn')
+    target.add_argument('--server-pid', type=int, help='With --url: process whose tree is sampled for CPU/RSS')
+    target.add_argument('--workers', default='1', help='Comma-separated gunicorn worker counts')
+    target.add_argument('--threads', type=int, default=8, help='gthread threads per worker')
+    target.add_argument('--settings', action='append',
+                        help='Comma-separated KEY=VALUE environment of the server, one run each (repeatable)')
+    load = parser.add_argument_group('load')
+    load.add_argument('--kiosks', type=int, default=10, help='Dashboards open for the whole run')
+    load.add_argument('--phones', type=int, default=50, help='Concurrent phone visits')
+    load.add_argument('--phone-session-seconds', default='30,180', help='min,max length of a phone visit')
+    load.add_argument('--returning', type=float, default=0.5, help='Share of phones with a warm cache')
+    load.add_argument('--interactions-per-hour', type=float, default=6,
+                      help='Taps on the popular times widget per kiosk (phones: 10x)')
+    load.add_argument('--sensors', type=int, default=20, help='Sensors writing one reading a minute')
+    load.add_argument('--sensor-mode', choices=('ingest', 'direct'), default='ingest',
+                      help='POST to /api/ingest or commit into the SQLite file')
+    load.add_argument('--interval', type=float, default=5.0, help='Seconds between status polls')
+    load.add_argument('--warmup', type=float, default=10, help='Seconds of load before measuring')
+    load.add_argument('--duration', type=float, default=60, help='Seconds of measured load per run')
+    load.add_argument('--timeout', type=float, default=10, help='Seconds before a request counts as failed')
+    load.add_argument('--seed', type=int, default=1, help='Seed of the simulated behaviour')
+    parser.add_argument('--output', help='Write the JSON results here as well')
+    args = parser.parse_args()
+    if sum(bool(value) for value in (args.db, args.database_url, args.url)) != 1:
+        parser.error('exactly one of --db, --database-url and --url is required')
+    if args.sensor_mode == 'direct' and not args.db:
+        parser.error('--sensor-mode direct needs --db')
+    return args
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_up(port, server, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            sys.exit(f"gunicorn exited with {server.returncode}")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=5) as s:
+                s.sendall(b'GET /api/status HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n')
+                if s.recv(12).startswith(b'HTTP/1.1 200'):
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    sys.exit("gunicorn did not answer in time")
+
+
+def _today():
+    """Day number as script.js has it (Date.getDay(): Sunday is 0)."""
+    return (datetime.now(SITE_OFFSET).weekday() + 1) % 7
+
+
+def route_of(path):
+    path = path.split('?', 1)[0]
+    for pattern, route in _ROUTES:
+        if pattern.fullmatch(path):
+            return route
+    return path
+
+
+class Recorder:
+    """Latencies and outcomes per route, kept once the warm-up is over."""
+
+    def __init__(self, measure_from):
+        self.measure_from = measure_from
+        self.routes = {}
+
+    def _route(self, route):
+        return self.routes.setdefault(route, {'latencies': [], 'statuses': {}, 'errors': {}})
+
+    def add(self, route, started, outcome):
+        """outcome is an HTTP status or the name of the failure."""
+        if started < self.measure_from:
+            return
+        entry = self._route(route)
+        if outcome in OK_STATUSES:
+            entry['latencies'].append(time.monotonic() - started)
+        if isinstance(outcome, int):
+            entry['statuses'][outcome] = entry['statuses'].get(outcome, 0) + 1
+        if outcome not in OK_STATUSES:
+            name = f'HTTP {outcome}' if isinstance(outcome, int) else outcome
+            entry['errors'][name] = entry['errors'].get(name, 0) + 1
+
+    def summary(self, duration):
+        routes = {}
+        for route, entry in sorted(self.routes.items()):
+            latencies = sorted(entry['latencies'])
+            errors = sum(entry['errors'].values())
+            requests = sum(entry['statuses'].values()) + sum(
+                count for name, count in entry['errors'].items() if not name.startswith('HTTP '))
+            routes[route] = {
+                'requests': requests,
+                'requests_per_second': round(requests / duration, 2),
+                'p50_ms': _ms(percentile(latencies, 0.5)),
+                'p95_ms': _ms(percentile(latencies, 0.95)),
+                'p99_ms': _ms(percentile(latencies, 0.99)),
+                'max_ms': _ms(latencies[-1] if latencies else None),
+                'error_rate': round(errors / requests, 4) if requests else None,
+                'errors': entry['errors'],
+                'statuses': {str(status): count for status, count in sorted(entry['statuses'].items())},
+            }
+        return routes
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+class Browser:
+    """One device showing the dashboard: its connection, HTTP cache and page state."""
+
+    def __init__(self, host, port, args, recorder, rng):
+        self.connection = Connection(port, args.timeout, host)
+        self.args = args
+        self.recorder = recorder
+        self.rng = rng
+        self.cache = {}  # path: (expires at or None, ETag, body)
+        self.reconnects = 0
+        self.week_loaded = False
+        self.last_interaction = time.monotonic()
+        self.shown_hour = self.shown_washer_status = None
+
+    async def get(self, path):
+        """GET through the cache; returns the body, or None when it failed."""
+        cached = self.cache.get(path)
+        if cached is not None and cached[0] is not None and cached[0] > time.time():
+            return cached[2]
+        headers = {'Accept-Encoding': ACCEPT_ENCODING}
+        if cached is not None and cached[1]:
+            headers['If-None-Match'] = cached[1]
+        started = time.monotonic()
+        try:
+            status, response_headers, body, reopened = await self.connection.fetch(path, headers)
+        except asyncio.TimeoutError:
+            self.recorder.add(route_of(path), started, 'timeout')
+            return None
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            self.recorder.add(route_of(path), started, type(e).__name__)
+            return None
+        self.reconnects += reopened
+        self.recorder.add(route_of(path), started, status)
+        if status == 304 and cached is not None:
+            return cached[2]
+        if status != 200:
+            return None
+        if response_headers.get('content-encoding') == 'gzip':
+            body = gzip.decompress(body)
+        max_age = re.search(r'max-age=(\d+)', response_headers.get('cache-control', ''))
+        expires = time.time() + int(max_age.group(1)) if max_age and \
+            'no-cache' not in response_headers.get('cache-control', '') else None
+        if expires or 'etag' in response_headers:
+            self.cache[path] = (expires, response_headers.get('etag'), body)
+        return body
+
+    async def get_json(self, path):
+        body = await self.get(path)
+        try:
+            return json.loads(body) if body else None
+        except ValueError:
+            return None
+
+    async def load_page(self):
+        html = await self.get('/')
+        for url in _ASSET_URL.findall(html.decode('utf-8', 'replace')) if html else []:
+            await self.get(url)
+        self.week_loaded = False
+        self.last_interaction = time.monotonic()
+        await self.popular_times('/api/popular-times')
+
+    async def popular_times(self, path):
+        data = await self.get_json(path)
+        if path == '/api/popular-times' and isinstance(data, dict):
+            self.shown_hour = datetime.now(SITE_OFFSET).hour
+            self.shown_washer_status = data.get('washer_status')
+
+    async def poll_status(self):
+        data = await self.get_json('/api/status')
+        washer = data.get('washer') if isinstance(data, dict) else None
+        if isinstance(washer, dict) and (washer.get('status') != self.shown_washer_status
+                                         or datetime.now(SITE_OFFSET).hour != self.shown_hour):
+            await self.popular_times('/api/popular-times')
+
+    async def interact(self):
+        self.last_interaction = time.monotonic()
+        action = self.rng.choices([action for _, action in INTERACTIONS],
+                                  [weight for weight, _ in INTERACTIONS])[0]
+        if action == 'week':
+            if not self.week_loaded:
+                self.week_loaded = (await self.get('/api/popular-times/week')) is not None
+        else:
+            day = self.rng.randrange(7) if action == 'day' else _today()
+            await self.popular_times(f'/api/popular-times/{day}')
+
+    async def run(self, until, interactions_per_hour):
+        """Show the dashboard until the monotonic time until."""
+        await self.load_page()
+        now = time.monotonic()
+        next_poll = now + self.args.interval
+        next_interaction = now + self.rng.expovariate(interactions_per_hour / 3600) \
+            if interactions_per_hour else float('inf')
+        next_reset_check = now + 60
+        while True:
+            wake = min(next_poll, next_interaction, next_reset_check)
+            if wake >= until:
+                break
+            await asyncio.sleep(max(0.0, wake - time.monotonic()))
+            if wake == next_poll:
+                next_poll += self.args.interval
+                await self.poll_status()
+            elif wake == next_interaction:
+                next_interaction += self.rng.expovariate(interactions_per_hour / 3600)
+                await self.interact()
+            else:
+                next_reset_check += 60
+                if time.monotonic() - self.last_interaction > AUTO_RESET_SECONDS:
+                    self.last_interaction = time.monotonic()
+                    await self.popular_times(f'/api/popular-times/{_today()}')
+        await asyncio.sleep(max(0.0, until - time.monotonic()))  # still on the page
+        self.connection.close()
+
+
+async def kiosk(host, port, args, recorder, rng, end):
+    await asyncio.sleep(rng.uniform(0, args.interval))  # spread over one interval
+    browser = Browser(host, port, args, recorder, rng)
+    await browser.run(end, args.interactions_per_hour)
+    return browser.reconnects
+
+
+async def phone(host, port, args, recorder, rng, end):
+    shortest, longest = (float(value) for value in args.phone_session_seconds.split(','))
+    reconnects = 0
+    cache = {}
+    await asyncio.sleep(rng.uniform(0, args.interval))
+    session = rng.uniform(0, longest)  # the first visit is already under way
+    while time.monotonic() < end:
+        browser = Browser(host, port, args, recorder, rng)
+        if rng.random() < args.returning:
+            browser.cache = cache
+        await browser.run(min(end, time.monotonic() + session), args.interactions_per_hour * 10)
+        session = rng.uniform(shortest, longest)
+        reconnects += browser.reconnects
+        cache = browser.cache
+    return reconnects
+
+
+def _reading(index, rng):
+    return {'sensor_name': 'washer' if index % 2 == 0 else 'dryer', 'mac_address': f'load-test-{index:04d}',
+            'temp': round(rng.uniform(20, 30), 1), 'vibration': round(rng.uniform(0, 20), 2),
+            'voltage': round(rng.uniform(3.3, 4.1), 2)}
+
+
+async def sensor(index, host, port, args, recorder, rng, end, db_path):
+    """Write one reading a minute until end."""
+    await asyncio.sleep(rng.uniform(0, 60))
+    while time.monotonic() < end:
+        started = time.monotonic()
+        reading = _reading(index, rng)
+        if db_path:
+            outcome = await asyncio.to_thread(_insert_directly, db_path, reading)
+            recorder.add('sqlite INSERT', started, outcome)
+        else:
+            connection = Connection(port, args.timeout, host)  # the gateways do not keep connections
+            try:
+                status, _, _, _ = await connection.fetch('/api/ingest', {'Content-Type': 'application/json'},
+                                                         method='POST', body=json.dumps(reading).encode())
+                recorder.add('/api/ingest', started, status)
+            except asyncio.TimeoutError:
+                recorder.add('/api/ingest', started, 'timeout')
+            except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+                recorder.add('/api/ingest', started, type(e).__name__)
+            connection.close()
+        await asyncio.sleep(max(0.0, min(started + 60, end) - time.monotonic()))
+
+
+def _insert_directly(db_path, reading):
+    connection = sqlite3.connect(db_path, timeout=5)
+    try:
+        connection.execute(
+            'INSERT INTO sensor_data (sensor_name, vib_date, temp, vibration, voltage) VALUES (?, ?, ?, ?, ?)',
+            (reading['sensor_name'], datetime.now(SITE_OFFSET).isoformat(sep=' '), reading['temp'],
+             reading['vibration'], reading['voltage'])
+        )
+        connection.commit()
+        return 200
+    except sqlite3.OperationalError as e:
+        return 'database is locked' if 'locked' in str(e) else 'OperationalError'
+    finally:
+        connection.close()
+
+
+class ProcessSampler:
+    """CPU and RSS of a process and its descendants, read from /proc (Linux)."""
+
+    _TICKS = os.sysconf('SC_CLK_TCK')
+    _PAGE = os.sysconf('SC_PAGE_SIZE')
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.samples = []  # (cpu percent of one core, rss bytes, processes)
+        self._last = None
+
+    @staticmethod
+    def _stat(pid):
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            return None
+        # state ppid ... utime(14) stime(15) ... rss(24), counted from the state field at 3
+        return int(fields[1]), int(fields[11]) + int(fields[12]), int(fields[21])
+
+    def _tree(self):
+        stats = {int(pid): self._stat(pid) for pid in os.listdir('/proc') if pid.isdigit()}
+        stats = {pid: stat for pid, stat in stats.items() if stat is not None}
+        tree, frontier = {}, [self.pid]
+        while frontier:
+            pid = frontier.pop()
+            if pid in stats:
+                tree[pid] = stats[pid]
+                frontier += [child for child, stat in stats.items() if stat[0] == pid]
+        return tree
+
+    def sample(self):
+        now, tree = time.monotonic(), self._tree()
+        if self._last is not None:
+            last_time, last_tree = self._last
+            ticks = sum(max(0, stat[1] - last_tree[pid][1]) for pid, stat in tree.items() if pid in last_tree)
+            cpu = ticks / self._TICKS / (now - last_time) * 100
+            self.samples.append((cpu, sum(stat[2] for stat in tree.values()) * self._PAGE, len(tree)))
+        self._last = (now, tree)
+
+    async def run(self, start, end, every=1.0):
+        await asyncio.sleep(max(0.0, start - time.monotonic()))
+        while time.monotonic() < end:
+            self.sample()
+            await asyncio.sleep(every)
+        self.sample()
+
+    def summary(self):
+        if not self.samples:
+            return None
+        cpu = sorted(sample[0] for sample in self.samples)
+        rss = [sample[1] / 1024 / 1024 for sample in self.samples]
+        return {
+            'cpu_percent_mean': round(sum(cpu) / len(cpu), 1),
+            'cpu_percent_p95': round(percentile(cpu, 0.95), 1),
+            'cpu_percent_max': round(cpu[-1], 1),
+            'rss_mb_mean': round(sum(rss) / len(rss), 1),
+            'rss_mb_max': round(max(rss), 1),
+            'processes': self.samples[-1][2],
+        }
+
+
+async def load(host, port, args, server_pid, db_path):
+    rng = random.Random(args.seed)
+    start = time.monotonic()
+    measure_from = start + args.warmup
+    end = measure_from + args.duration
+    recorder = Recorder(measure_from)
+    sampler = ProcessSampler(server_pid) if server_pid else None
+    cpu_before = time.process_time()
+    tasks = [kiosk(host, port, args, recorder, random.Random(rng.random()), end) for _ in range(args.kiosks)]
+    tasks += [phone(host, port, args, recorder, random.Random(rng.random()), end) for _ in range(args.phones)]
+    tasks += [sensor(index, host, port, args, recorder, random.Random(rng.random()), end, db_path)
+              for index in range(args.sensors)]
+    if sampler:
+        tasks.append(sampler.run(measure_from, end))
+    results = await asyncio.gather(*tasks)
+    return {
+        'routes': recorder.summary(args.duration),
+        'reconnects': sum(result for result in results[:args.kiosks + args.phones]),
+        'server': sampler.summary() if sampler else None,
+        'load_generator_cpu_percent': round((time.process_time() - cpu_before) / (time.monotonic() - start) * 100, 1),
+    }
+
+
+def _totals(routes, duration):
+    requests = sum(route['requests'] for route in routes.values())
+    errors = sum(sum(route['errors'].values()) for route in routes.values())
+    return {
+        'requests': requests,
+        'requests_per_second': round(requests / duration, 1),
+        'error_rate': round(errors / requests, 4) if requests else None,
+    }
+
+
+def run_once(args, name, workers, settings, work_dir):
+    """Start gunicorn with settings, load it and return the run's results."""
+    env = dict(os.environ, LOG_LEVEL='WARNING', **settings)
+    db_path = None
+    if args.database_url:
+        env.update(USE_POSTGRES='true', DATABASE_URL=args.database_url)
+    else:
+        db_path = os.path.join(work_dir, f'{name}.db')
+        shutil.copyfile(args.db, db_path)
+        env['SQLITE_PATH'] = db_path
+    # Migrate once up front so the workers do not all start with it
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'main', 'db-upgrade'],
+                   cwd=ROOT, env=env, check=True, capture_output=True)
+    env['AUTO_MIGRATE'] = 'false'
+
+    port = _free_port()
+    log_path = os.path.join(work_dir, f'{name}.log')
+    with open(log_path, 'w') as log:
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+             '--worker-class', 'gthread', '--threads', str(args.threads), 'main:app'],
+            cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+    try:
+        _wait_until_up(port, server)
+        result = asyncio.run(load('127.0.0.1', port, args, server.pid,
+                                  db_path if args.sensor_mode == 'direct' else None))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    with open(log_path) as log:
+        text = log.read()
+    result['server_log'] = {'database_is_locked': text.count('database is locked'),
+                            'tracebacks': text.count('Traceback')}
+    return result
+
+
+def main_():
+    args = parse_args()
+    variants = [dict(setting.split('=', 1) for setting in spec.split(',') if setting) for spec in args.settings or ['']]
+    config = {key: getattr(args, key) for key in (
+        'kiosks', 'phones', 'phone_session_seconds', 'returning', 'interactions_per_hour', 'sensors',
+        'sensor_mode', 'interval', 'warmup', 'duration', 'timeout', 'seed')}
+    runs = []
+    if args.url:
+        url = urlsplit(args.url)
+        result = asyncio.run(load(url.hostname, url.port or 80, args, args.server_pid, None))
+        runs.append({'url': args.url, **result})
+    else:
+        work_dir = tempfile.mkdtemp(prefix='load-test-')
+        try:
+            for variant, settings in enumerate(variants):
+                for workers in (int(value) for value in args.workers.split(',')):
+                    result = run_once(args, f'run-{variant}-{workers}', workers, settings, work_dir)
+                    runs.append({'workers': workers, 'threads': args.threads, 'settings': settings, **result})
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    for run in runs:
+        run['totals'] = _totals(run['routes'], args.duration)
+        server = run['server'] or {}
+        print(f"workers {run.get('workers', '-')} settings {run.get('settings', {})}: "
+              f"{run['totals']['requests_per_second']} req/s  errors {run['totals']['error_rate']}  "
+              f"server CPU {server.get('cpu_percent_mean')}% RSS {server.get('rss_mb_max')} MB", file=sys.stderr)
+        for route, summary in run['routes'].items():
+            print(f"  {route:28} {summary['requests']:6}  p50 {summary['p50_ms']} p95 {summary['p95_ms']} "
+                  f"p99 {summary['p99_ms']} ms  errors {summary['errors']}", file=sys.stderr)
+
+    output = json.dumps({
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'cpus': os.cpu_count(),
+        'config': config,
+        'runs': runs,
+    }, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main_()
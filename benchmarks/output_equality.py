@@ -0,0 +1,149 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# Check that the status and popular times APIs answer exactly like a baseline checkout
+#
+# Usage (the database is copied for every server):
+#   git worktree add /tmp/baseline <commit>
+#   python benchmarks/output_equality.py --db /tmp/hot-paths/hot-paths-10000.db \
+#       --baseline /tmp/baseline --tree .
+#
+# Both trees are served by gunicorn at the same time and every URL is
+# fetched from one right after the other, so the answers are computed for
+# the same minute. The JSON bodies are compared after dropping the --ignore
+# keys; keys only the tree returns are allowed (fields added since). Every
+# difference is printed and the exit status is 1 if there was any.
+#
+# The baseline's all_days is not the list of day names: a loop variable
+# shadowed it with the day count of the last hour (fixed since), so pass
+# --ignore all_days when the baseline predates that fix.
+import argparse
+import http.client
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+DAYS = range(7)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare API responses with a baseline checkout")
+    parser.add_argument('--db', required=True, help='SQLite database to copy for every server')
+    parser.add_argument('--baseline', required=True, help='Checkout whose answers are expected')
+    parser.add_argument('--tree', default='.', help='Checkout to check')
+    parser.add_argument('--ignore', action='append', default=['current_time'],
+                        help='JSON key to leave out of the comparison (repeatable; current_time always is)')
+    return parser.parse_args()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_up(port, server, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            sys.exit(f"server exited with {server.returncode}")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    sys.exit("server did not answer in time")
+
+
+def get_json(port, path):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    try:
+        connection.request('GET', path)
+        response = connection.getresponse()
+        body = response.read()
+        return {'status': response.status,
+                'body': json.loads(body) if response.status == 200 else body.decode('utf-8', 'replace')}
+    finally:
+        connection.close()
+
+
+def without(value, ignore):
+    if isinstance(value, dict):
+        return {key: without(item, ignore) for key, item in value.items() if key not in ignore}
+    if isinstance(value, list):
+        return [without(item, ignore) for item in value]
+    return value
+
+
+def differences(expected, actual, path=''):
+    """Paths (and values) where actual differs from expected."""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        found = []
+        for key in sorted(set(expected) | set(actual), key=str):
+            if key not in expected:
+                continue  # added by the tree
+            if key not in actual:
+                found.append(f"{path}/{key}: {expected.get(key, '<missing>')!r} != {actual.get(key, '<missing>')!r}")
+            else:
+                found += differences(expected[key], actual[key], f'{path}/{key}')
+        return found
+    if isinstance(expected, list) and isinstance(actual, list) and len(expected) == len(actual):
+        return [found for index, (a, b) in enumerate(zip(expected, actual))
+                for found in differences(a, b, f'{path}/{index}')]
+    return [] if expected == actual else [f"{path or '/'}: {expected!r} != {actual!r}"]
+
+
+def start_server(name, tree, args, work_dir):
+    db_path = os.path.join(work_dir, f'{name}.db')
+    shutil.copyfile(args.db, db_path)
+    env = dict(os.environ, LOG_LEVEL='WARNING', SQLITE_PATH=db_path, PRECOMPUTE_ENABLED='false')
+    port = _free_port()
+    with open(os.path.join(work_dir, f'{name}.log'), 'w') as log:
+        server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '--workers', '1', '--bind',
+                                   f'127.0.0.1:{port}', 'main:app'],
+                                  cwd=os.path.abspath(tree), env=env, stdout=log, stderr=subprocess.STDOUT)
+    _wait_until_up(port, server)
+    return port, server
+
+
+def main_():
+    args = parse_args()
+    work_dir = tempfile.mkdtemp(prefix='output-equality-')
+    servers = []
+    try:
+        baseline_port, server = start_server('baseline', args.baseline, args, work_dir)
+        servers.append(server)
+        tree_port, server = start_server('tree', args.tree, args, work_dir)
+        servers.append(server)
+
+        statuses = get_json(baseline_port, '/api/status')['body']
+        paths = ['/api/status']
+        for sensor_type in sorted(statuses):
+            paths += [f'/api/status/{sensor_type}', f'/api/popular-times?sensor={sensor_type}',
+                      f'/api/popular-times/week?sensor={sensor_type}']
+            paths += [f'/api/popular-times/{day}?sensor={sensor_type}' for day in DAYS]
+
+        failed = 0
+        ignore = set(args.ignore)
+        for path in paths:
+            expected = without(get_json(baseline_port, path), ignore)
+            actual = without(get_json(tree_port, path), ignore)
+            found = differences(expected, actual)
+            print(f"{'differs' if found else 'same   '} {path}")
+            for line in found:
+                print(f"    {line}")
+            failed += bool(found)
+        print(f"{len(paths) - failed} of {len(paths)} responses match the baseline")
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait(timeout=30)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main_()
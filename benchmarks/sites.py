@@ -0,0 +1,145 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# Per-site request latency at a growing number of site databases, and the cross-site fan-out
+#
+# Usage:
+#   python benchmarks/sites.py --db /tmp/hot-paths/hot-paths-10000.db --sites 1,10,100,300 --output sites.json
+#
+# Every site is a copy of --db under --data-dir/<count>/. For each site
+# count, in its own process (main.py reads SHARD_DATABASE_URL at import):
+#   - cold: the first /api/<location>/status of a site, which opens its
+#     database and loads its ring buffers
+#   - warm: /api/<location>/status and /api/<location>/popular-times/week
+#     of randomly chosen sites once all of them are open
+#   - /api/sites with 1 and --fan-out-threads threads
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from common import QueryCounter, percentile
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark location-sharded requests at several site counts")
+    parser.add_argument('--db', required=True, help='SQLite database copied for every site')
+    parser.add_argument('--sites', default='1,10,100,300', help='Comma-separated site counts')
+    parser.add_argument('--data-dir', default='/tmp/sites-bench', help='Where the site databases are kept')
+    parser.add_argument('--iterations', type=int, default=300, help='Warm requests per route')
+    parser.add_argument('--fan-out-threads', type=int, default=8, help='Threads of the parallel /api/sites run')
+    parser.add_argument('--output', help='Write the JSON results here')
+    parser.add_argument('--measure', help=argparse.SUPPRESS)  # internal: measure one site count
+    return parser.parse_args()
+
+
+def ensure_sites(args, count):
+    """Copy --db to site-0000.db ... once per count; returns the URL template."""
+    directory = os.path.join(args.data_dir, str(count))
+    os.makedirs(directory, exist_ok=True)
+    for index in range(count):
+        path = os.path.join(directory, f'site-{index:04d}.db')
+        if not os.path.exists(path):
+            shutil.copyfile(args.db, path)
+    return f'sqlite:///{os.path.abspath(directory)}/{{location}}.db'
+
+
+def _timed(latencies, call):
+    started = time.perf_counter()
+    call()
+    latencies.append(time.perf_counter() - started)
+
+
+def _summary(latencies, queries=None):
+    latencies.sort()
+    summary = {
+        'iterations': len(latencies),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+    }
+    if queries is not None:
+        summary['queries_per_call'] = round(queries / len(latencies), 2)
+    return summary
+
+
+def measure(args):
+    """Measure this process's sites (chosen by the environment)."""
+    import logging
+    from concurrent.futures import ThreadPoolExecutor
+    import main
+    logging.getLogger().setLevel(logging.WARNING)
+
+    client = main.app.test_client()
+    locations = main.shard_resolver.locations()
+    rng = random.Random(len(locations))
+
+    def get(path):
+        response = client.get(path)
+        assert response.status_code == 200, (path, response.status_code)
+
+    results = {'sites': len(locations)}
+    cold = []
+    for location in locations:
+        _timed(cold, lambda: get(f'/api/{location}/status'))
+    results['cold /api/<location>/status'] = _summary(cold)
+
+    shards = [main.shard_resolver.get(location) for location in locations]
+    counter = QueryCounter([engine for shard in shards for engine in (shard.engine, shard.reader) if engine])
+    for route in ('/api/{}/status', '/api/{}/popular-times/week'):
+        latencies = []
+        queries_before = counter.count
+        for _ in range(args.iterations):
+            location = rng.choice(locations)
+            _timed(latencies, lambda: get(route.format(location)))
+        results[f"warm {route.format('<location>')}"] = _summary(latencies, counter.count - queries_before)
+    # Every site stayed open: nothing was measured cold twice
+    assert main.shard_resolver.open_count() == len(locations)
+
+    for threads in sorted({1, args.fan_out_threads}):
+        main.shard_resolver._executor = ThreadPoolExecutor(max_workers=threads)
+        latencies = []
+        for _ in range(3):
+            _timed(latencies, lambda: get('/api/sites'))
+        results[f'/api/sites, {threads} threads'] = _summary(latencies)
+    return results
+
+
+def main_():
+    args = parse_args()
+    if args.measure:
+        print(json.dumps(measure(args)))
+        return
+
+    results = {'created_at': datetime.now().isoformat(timespec='seconds'), 'cpus': os.cpu_count(), 'counts': []}
+    for count in (int(value) for value in args.sites.split(',')):
+        url_template = ensure_sites(args, count)
+        main_db = os.path.join(args.data_dir, 'main.db')
+        if not os.path.exists(main_db):
+            shutil.copyfile(args.db, main_db)
+        env = dict(os.environ, SQLITE_PATH=main_db, SHARD_DATABASE_URL=url_template,
+                   SHARD_MAX_OPEN=str(count), PRECOMPUTE_ENABLED='false', LOG_LEVEL='WARNING')
+        measured = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--db', args.db, '--measure', '1',
+             '--iterations', str(args.iterations), '--fan-out-threads', str(args.fan_out_threads)],
+            cwd=ROOT, env=env, capture_output=True, text=True
+        )
+        if measured.returncode != 0:
+            sys.exit(f"Measuring {count} sites failed:\n{measured.stderr[-2000:]}")
+        results['counts'].append(json.loads(measured.stdout.strip().splitlines()[-1]))
+        print(f"{count} sites measured", file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main_()
@@ -0,0 +1,259 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# Compare dashboard load under /api/status polling and /api/status/stream (SSE)
+#
+# Usage (run against a copy of the database, readings are inserted):
+#   python benchmarks/sse_vs_polling.py --db /tmp/vib-copy.db --clients 500 --duration 60
+#
+# The app runs in gunicorn as deployed (one gthread worker with --threads
+# threads), so open streams hold real worker threads and the subscriber
+# cap (SSE_MAX_SUBSCRIBERS) applies. Dashboards whose stream is refused
+# poll instead, as static/script.js does. DB queries are read from the
+# worker's /metrics (laundry_db_queries_total) before and after each mode.
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import random
+import re
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import pytz
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from common import Connection, percentile
+
+TIMEZONE = pytz.timezone('America/Los_Angeles')
+_QUERY_COUNT = re.compile(r'^laundry_db_queries_total\{[^}]*\} ([0-9.e+]+)$', re.M)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare DB load of status polling and SSE")
+    parser.add_argument('--db', required=True, help='SQLite database to run against (a copy)')
+    parser.add_argument('--clients', type=int, default=500)
+    parser.add_argument('--duration', type=int, default=60, help='Seconds per mode')
+    parser.add_argument('--interval', type=float, default=5.0, help='Seconds between polls (REFRESH_INTERVAL)')
+    parser.add_argument('--threads', type=int, default=64, help='gthread threads of the worker')
+    parser.add_argument('--max-subscribers', type=int,
+                        help='SSE_MAX_SUBSCRIBERS of the server (default: the app default)')
+    parser.add_argument('--output', help='Write the JSON results here as well')
+    return parser.parse_args()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_up(port, server, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            sys.exit(f"gunicorn exited with {server.returncode}")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    sys.exit("gunicorn did not answer in time")
+
+
+def _get(port, path):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        connection.request('GET', path)
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+def query_count(port):
+    """SQL statements the worker has executed so far, all routes and background threads."""
+    _, body = _get(port, '/metrics')
+    return sum(float(value) for value in _QUERY_COUNT.findall(body.decode()))
+
+
+def sensor_writer(db_path, sensor_types, stop):
+    """Insert one reading per sensor per minute, like the gateways do."""
+    conn = sqlite3.connect(db_path, timeout=30)
+    while not stop.is_set():
+        now = datetime.now(TIMEZONE).strftime('%Y-%m-%d %H:%M:%S.%f%z')
+        now = now[:-2] + ':' + now[-2:]
+        for sensor_type in sensor_types:
+            conn.execute(
+                'INSERT INTO sensor_data (sensor_name, vib_date, temp, vibration, voltage) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (sensor_type, now, round(random.uniform(20, 30), 2),
+                 round(random.uniform(5, 15), 2), round(random.uniform(3.6, 3.9), 2))
+            )
+        conn.commit()
+        stop.wait(60)
+    conn.close()
+
+
+class Tally:
+    """Requests and their latencies, shared by the clients of one mode."""
+
+    def __init__(self):
+        self.latencies = []
+        self.responses = {}
+
+    def add(self, status, seconds):
+        self.latencies.append(seconds)
+        self.responses[status] = self.responses.get(status, 0) + 1
+
+
+async def poll(port, tally, interval, start, end):
+    """Poll /api/status every interval seconds from start until end, with the ETag of the last answer."""
+    connection = Connection(port, timeout=30)
+    etag = None
+    due = start
+    try:
+        while due < end:
+            await asyncio.sleep(max(0.0, due - time.monotonic()))
+            started = time.monotonic()
+            try:
+                status, headers, _, _ = await connection.fetch('/api/status',
+                                                               {'If-None-Match': etag} if etag else {})
+                etag = headers.get('etag', etag)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                status = 'error'
+            tally.add(status, time.monotonic() - started)
+            due += interval
+    finally:
+        connection.close()
+
+
+async def run_polling(port, args):
+    tally = Tally()
+    queries_before = query_count(port)
+    started = time.monotonic()
+    end = started + args.duration
+    await asyncio.gather(*(poll(port, tally, args.interval, started + random.uniform(0, args.interval), end)
+                           for _ in range(args.clients)))
+    elapsed = time.monotonic() - started
+    queries = query_count(port) - queries_before
+
+    latencies = sorted(tally.latencies)
+    return {
+        'mode': 'polling',
+        'clients': args.clients,
+        'seconds': round(elapsed, 1),
+        'requests': len(latencies),
+        'requests_per_sec': round(len(latencies) / elapsed, 1),
+        'responses': {str(code): n for code, n in sorted(tally.responses.items(), key=str)},
+        'db_queries': int(queries),
+        'db_queries_per_min': round(queries / elapsed * 60, 1),
+        'latency_p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'latency_p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+async def subscribe(port, stats, tally, args, end):
+    """Hold /api/status/stream open until end; poll instead when it is refused."""
+    started = time.monotonic()
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write(b'GET /api/status/stream HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n\r\n')
+        await writer.drain()
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 30)
+        status = int(head.split(b' ', 2)[1])
+        if status != 200:
+            stats['refused'] += 1
+            tally.add(status, time.monotonic() - started)
+        else:
+            stats['streams'] += 1
+            events = 0
+            while time.monotonic() < end:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), end - time.monotonic())
+                except asyncio.TimeoutError:
+                    break
+                if not line:
+                    break  # ended by the server
+                if line.startswith(b'event:'):
+                    if not events:
+                        stats['first_event'].append(time.monotonic() - started)
+                    events += 1
+            stats['events'] += events
+    finally:
+        writer.close()
+    if status != 200:
+        # like script.js: poll until the stream is tried again (after the run)
+        await poll(port, tally, args.interval, time.monotonic() + args.interval, end)
+
+
+async def run_sse(port, args):
+    tally = Tally()
+    stats = {'streams': 0, 'refused': 0, 'events': 0, 'first_event': []}
+    queries_before = query_count(port)
+    started = time.monotonic()
+    end = started + args.duration
+    await asyncio.gather(*(subscribe(port, stats, tally, args, end) for _ in range(args.clients)))
+    elapsed = time.monotonic() - started
+    queries = query_count(port) - queries_before
+
+    polls = sum(tally.responses.values()) - stats['refused']
+    return {
+        'mode': 'sse',
+        'clients': args.clients,
+        'seconds': round(elapsed, 1),
+        'requests': args.clients + polls,
+        'requests_per_sec': round((args.clients + polls) / elapsed, 1),
+        'streams': stats['streams'],
+        'refused': stats['refused'],
+        'fallback_polls': polls,
+        'responses': {str(code): n for code, n in sorted(tally.responses.items(), key=str)},
+        'events_delivered': stats['events'],
+        'first_event_p50_ms': round(statistics.median(stats['first_event']) * 1000, 2) if stats['first_event'] else None,
+        'db_queries': int(queries),
+        'db_queries_per_min': round(queries / elapsed * 60, 1),
+    }
+
+
+def main_():
+    args = parse_args()
+    db_path = os.path.abspath(args.db)
+    env = dict(os.environ, LOG_LEVEL='WARNING', SQLITE_PATH=db_path)
+    if args.max_subscribers is not None:
+        env['SSE_MAX_SUBSCRIBERS'] = str(args.max_subscribers)
+    port = _free_port()
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '--workers', '1', '--worker-class', 'gthread',
+                               '--threads', str(args.threads), '--bind', f'127.0.0.1:{port}', 'main:app'],
+                              cwd=ROOT, env=env)
+    stop = threading.Event()
+    try:
+        _wait_until_up(port, server)
+        _, body = _get(port, '/api/status')
+        writer = threading.Thread(target=sensor_writer, args=(db_path, list(json.loads(body)), stop), daemon=True)
+        writer.start()
+        results = [
+            asyncio.run(run_polling(port, args)),
+            asyncio.run(run_sse(port, args)),
+        ]
+    finally:
+        stop.set()
+        server.terminate()
+        server.wait(timeout=30)
+
+    output = json.dumps({'threads': args.threads, 'max_subscribers': args.max_subscribers, 'results': results},
+                        indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main_()
@@ -0,0 +1,215 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# Bytes per page visit and modelled time-to-interactive on a slow link, first and repeat visits
+#
+# Usage (compare two checkouts; the database is copied for every server):
+#   git worktree add /tmp/before <commit>
+#   python benchmarks/static_assets.py --db /tmp/hot-paths/hot-paths-10000.db \
+#       --tree before=/tmp/before --tree after=. --output static-assets.json
+#
+# For every tree a gunicorn server is started and each page is visited like
+# a browser with an empty cache, then again with the cache of the first
+# visit: the HTML, the same-origin stylesheets and scripts it links (the
+# Chart.js and theme CDN files are not ours and left out) and, for the
+# dashboard, the API calls script.js makes on load. Cached responses are
+# reused within their max-age and revalidated (If-None-Match /
+# If-Modified-Since) after it. Bytes count the response headers and body on
+# the wire. Time-to-interactive is modelled from those bytes as three
+# dependent steps on a --rtt-ms / --kbps link: the HTML, then its assets in
+# parallel sharing the bandwidth, then the load-time API calls; each step
+# adds the server time measured locally.
+import argparse
+import gzip
+import http.client
+import json
+import os
+import re
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+try:
+    import brotli
+except ImportError:  # then br is not asked for
+    brotli = None
+
+ACCEPT_ENCODING = 'gzip, deflate, br' if brotli is not None else 'gzip, deflate'
+# page: the API calls its script makes before it is usable
+PAGES = {
+    '/': ['/api/status', '/api/popular-times/week'],
+    '/admin': [],
+}
+_ASSET_URL = re.compile(rb'<(?:link[^>]+href|script[^>]+src)="(/static/[^"]+)"')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure bytes per visit and modelled time-to-interactive")
+    parser.add_argument('--db', required=True, help='SQLite database to copy for every server')
+    parser.add_argument('--tree', action='append', required=True,
+                        help='name=path of a checkout to serve (repeatable)')
+    parser.add_argument('--rtt-ms', type=float, default=150, help='Round-trip time of the modelled link')
+    parser.add_argument('--kbps', type=float, default=1000, help='Bandwidth of the modelled link')
+    parser.add_argument('--iterations', type=int, default=20, help='Visits per page; the median is reported')
+    parser.add_argument('--output', help='Write the JSON results here as well')
+    return parser.parse_args()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_up(port, server, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            sys.exit(f"server exited with {server.returncode}")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    sys.exit("server did not answer in time")
+
+
+class Browser:
+    """A keep-alive connection with an HTTP cache of what it fetched."""
+
+    def __init__(self, port):
+        self.connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        self.cache = {}  # path: (stored at, headers)
+        self.html = {}  # page: body, for the links of a cached page
+
+    def get(self, path):
+        """Fetch through the cache; returns (wire bytes, server seconds, body), (0, 0, None) when fresh."""
+        headers = {'Accept-Encoding': ACCEPT_ENCODING}
+        cached = self.cache.get(path)
+        if cached is not None:
+            stored_at, cached_headers = cached
+            max_age = re.search(r'max-age=(\d+)', cached_headers.get('cache-control', ''))
+            if max_age and 'no-cache' not in cached_headers.get('cache-control', '') \
+                    and time.time() - stored_at < int(max_age.group(1)):
+                return 0, 0.0, None
+            if 'etag' in cached_headers:
+                headers['If-None-Match'] = cached_headers['etag']
+            if 'last-modified' in cached_headers:
+                headers['If-Modified-Since'] = cached_headers['last-modified']
+        started = time.perf_counter()
+        self.connection.request('GET', path, headers=headers)
+        response = self.connection.getresponse()
+        body = response.read()
+        elapsed = time.perf_counter() - started
+        if response.status not in (200, 304):
+            raise RuntimeError(f"GET {path}: HTTP {response.status}")
+        head = len(f'HTTP/1.1 {response.status} {response.reason}\r\n') + \
+            sum(len(f'{name}: {value}\r\n') for name, value in response.getheaders()) + 2
+        if response.status == 200:
+            self.cache[path] = (time.time(), {name.lower(): value for name, value in response.getheaders()})
+        size = head + len(body)
+        if response.getheader('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        elif response.getheader('Content-Encoding') == 'br':
+            body = brotli.decompress(body)
+        return size, elapsed, body if response.status == 200 else None
+
+    def close(self):
+        self.connection.close()
+
+
+def _step(fetches, args):
+    """Modelled seconds of fetches made in parallel: (bytes, server seconds) pairs."""
+    fetched = [(size, server) for size, server in fetches if size]
+    if not fetched:
+        return 0.0
+    transfer = sum(size for size, _ in fetched) * 8 / (args.kbps * 1000)
+    return args.rtt_ms / 1000 + max(server for _, server in fetched) + transfer
+
+
+def visit(browser, page, args):
+    """One page visit; returns (requests, bytes, modelled seconds)."""
+    size, server, body = browser.get(page)
+    steps = [_step([(size, server)], args)]
+    if body is None:  # 304: the cached HTML
+        body = browser.html[page]
+    browser.html[page] = body
+    asset_fetches = [browser.get(url.decode())[:2] for url in _ASSET_URL.findall(body)]
+    steps.append(_step(asset_fetches, args))
+    api_fetches = [browser.get(path)[:2] for path in PAGES[page]]
+    steps.append(_step(api_fetches, args))
+    fetches = [(size, server)] + asset_fetches + api_fetches
+    return sum(1 for size, _ in fetches if size), sum(size for size, _ in fetches), sum(steps)
+
+
+def measure(port, args):
+    results = {}
+    for page in PAGES:
+        runs = {'first': [], 'repeat': []}
+        for _ in range(args.iterations):
+            browser = Browser(port)
+            for kind in ('first', 'repeat'):
+                runs[kind].append(visit(browser, page, args))
+            browser.close()
+        results[page] = {
+            kind: {
+                'requests': visits[0][0],
+                'bytes': int(statistics.median(size for _, size, _ in visits)),
+                'time_to_interactive_ms': round(statistics.median(seconds for _, _, seconds in visits) * 1000, 1),
+            }
+            for kind, visits in runs.items()
+        }
+    return results
+
+
+def run_server(args, name, tree, work_dir):
+    db_path = os.path.join(work_dir, f'{name}.db')
+    shutil.copyfile(args.db, db_path)
+    env = dict(os.environ, LOG_LEVEL='WARNING', SQLITE_PATH=db_path, PRECOMPUTE_ENABLED='false')
+    port = _free_port()
+    with open(os.path.join(work_dir, f'{name}.log'), 'w') as log:
+        server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '--workers', '1', '--bind',
+                                   f'127.0.0.1:{port}', 'main:app'],
+                                  cwd=tree, env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        _wait_until_up(port, server)
+        Browser(port).get('/')  # warm up
+        return measure(port, args)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main_():
+    args = parse_args()
+    work_dir = tempfile.mkdtemp(prefix='static-assets-')
+    trees = {}
+    try:
+        for spec in args.tree:
+            name, _, tree = spec.partition('=')
+            trees[name] = run_server(args, name, os.path.abspath(tree or name), work_dir)
+            for page, kinds in trees[name].items():
+                print(f"{name} {page}: " + '  '.join(
+                    f"{kind} {result['requests']} requests {result['bytes']} B {result['time_to_interactive_ms']} ms"
+                    for kind, result in kinds.items()), file=sys.stderr)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = json.dumps({
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'rtt_ms': args.rtt_ms,
+        'kbps': args.kbps,
+        'accept_encoding': ACCEPT_ENCODING,
+        'trees': trees,
+    }, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main_()
@@ -0,0 +1,266 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# Dashboard throughput of 1..N gunicorn workers on SQLite under concurrent ingestion
+#
+# Usage (the database is copied for every run, the original is not modified):
+#   python benchmarks/worker_scaling.py --db /tmp/hot-paths/hot-paths-1000000.db --workers 1,2,4 \
+#       --profiles on,off --duration 30 --output scaling.json
+#
+# Every run starts gunicorn on a fresh copy of the database and, for
+# --duration seconds, lets --clients keep-alive connections read the
+# dashboard endpoints as fast as they are answered while readings arrive
+# two ways: POSTed to /api/ingest (written by the workers' write-behind
+# buffers) and committed straight into the file by a separate process, as
+# the older gateways do. profile on/off sets SQLITE_PRODUCTION_MODE.
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from common import percentile
+
+READ_PATHS = ['/api/status', '/api/status/washer', '/api/popular-times', '/api/popular-times/week', '/']
+SITE_OFFSET = dt_timezone(timedelta(hours=-7))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure worker scaling of the SQLite deployment")
+    parser.add_argument('--db', required=True, help='SQLite database to copy for every run')
+    parser.add_argument('--workers', default='1,2,4', help='Comma-separated gunicorn worker counts')
+    parser.add_argument('--profiles', default='on,off', help='SQLITE_PRODUCTION_MODE values to compare')
+    parser.add_argument('--threads', type=int, default=8, help='gthread threads per worker')
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent reading connections')
+    parser.add_argument('--client-processes', type=int, default=4, help='Processes the clients are spread over')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds of load per run')
+    parser.add_argument('--ingest-rate', type=float, default=40, help='Readings per second POSTed to /api/ingest')
+    parser.add_argument('--direct-commits', type=float, default=10,
+                        help='Commits per second written straight into the database file')
+    parser.add_argument('--output', help='Write the JSON results here as well')
+    return parser.parse_args()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _now_text():
+    return datetime.now(SITE_OFFSET).isoformat(sep=' ')
+
+
+def _wait_until_up(port, server, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            sys.exit(f"gunicorn exited with {server.returncode}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', '/api/status')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    sys.exit("gunicorn did not answer in time")
+
+
+def reader_client(port, connections, deadline, queue):
+    """One process keeping `connections` keep-alive connections busy."""
+    import threading
+    latencies = []
+    errors = {}
+    lock = threading.Lock()
+
+    def run(seed):
+        rng = random.Random(seed)
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        while time.time() < deadline:
+            path = rng.choice(READ_PATHS)
+            started = time.perf_counter()
+            try:
+                conn.request('GET', path)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except OSError as e:
+                status = type(e).__name__
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            elapsed = time.perf_counter() - started
+            with lock:
+                if status == 200:
+                    latencies.append(elapsed)
+                else:
+                    errors[str(status)] = errors.get(str(status), 0) + 1
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(connections)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    queue.put((latencies, errors))
+
+
+def ingest_client(port, rate, deadline, queue):
+    """POST readings to /api/ingest in half-second batches."""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    accepted = refused = 0
+    carry = 0.0
+    while time.time() < deadline:
+        carry += rate / 2
+        count, carry = int(carry), carry - int(carry)
+        if count:
+            body = json.dumps([{'sensor_name': random.choice(['washer', 'dryer']), 'vib_date': _now_text(),
+                                'temp': 22.5, 'vibration': 9.5, 'voltage': 3.9} for _ in range(count)])
+            try:
+                conn.request('POST', '/api/ingest', body, {'Content-Type': 'application/json'})
+                response = conn.getresponse()
+                response.read()
+                if response.status == 202:
+                    accepted += count
+                else:
+                    refused += count
+            except OSError:
+                refused += count
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        time.sleep(0.5)
+    queue.put(('ingest', accepted, refused))
+
+
+def direct_writer(db_path, commits_per_second, deadline, queue):
+    """Commit single readings straight into the file, like the older gateways."""
+    conn = sqlite3.connect(db_path, timeout=30)
+    committed = failed = 0
+    commit_seconds = []
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            conn.execute(
+                'INSERT INTO sensor_data (sensor_name, vib_date, temp, vibration, voltage) VALUES (?, ?, ?, ?, ?)',
+                (random.choice(['washer', 'dryer']), _now_text(), 22.5, 9.5, 3.9)
+            )
+            conn.commit()
+            committed += 1
+            commit_seconds.append(time.perf_counter() - started)
+        except sqlite3.OperationalError:
+            conn.rollback()
+            failed += 1
+        time.sleep(max(0.0, 1 / commits_per_second - (time.perf_counter() - started)))
+    conn.close()
+    commit_seconds.sort()
+    queue.put(('direct', committed, failed, percentile(commit_seconds, 0.99)))
+
+
+def run_once(args, workers, profile, work_dir):
+    db_path = os.path.join(work_dir, f'scaling-{profile}-{workers}.db')
+    shutil.copyfile(args.db, db_path)
+    env = dict(os.environ, SQLITE_PATH=db_path, SQLITE_PRODUCTION_MODE='true' if profile == 'on' else 'false',
+               LOG_LEVEL='WARNING')
+    # Migrate once up front so the workers do not all start with it
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'main', 'db-upgrade'],
+                   cwd=ROOT, env=env, check=True, capture_output=True)
+    env['AUTO_MIGRATE'] = 'false'
+
+    port = _free_port()
+    log_path = os.path.join(work_dir, f'gunicorn-{profile}-{workers}.log')
+    with open(log_path, 'w') as log:
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+             '--worker-class', 'gthread', '--threads', str(args.threads), 'main:app'],
+            cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+    try:
+        _wait_until_up(port, server)
+        deadline = time.time() + args.duration
+        queue = multiprocessing.Queue()
+        processes = []
+        per_process = max(1, args.clients // args.client_processes)
+        for _ in range(args.client_processes):
+            processes.append(multiprocessing.Process(target=reader_client, args=(port, per_process, deadline, queue)))
+        if args.ingest_rate:
+            processes.append(multiprocessing.Process(target=ingest_client,
+                                                     args=(port, args.ingest_rate, deadline, queue)))
+        if args.direct_commits:
+            processes.append(multiprocessing.Process(target=direct_writer,
+                                                     args=(db_path, args.direct_commits, deadline, queue)))
+        for process in processes:
+            process.start()
+        results = [queue.get() for _ in processes]
+        for process in processes:
+            process.join()
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    latencies, errors = [], {}
+    result = {'profile': profile, 'workers': workers}
+    for item in results:
+        if item[0] == 'ingest':
+            result['ingest_accepted'], result['ingest_refused'] = item[1], item[2]
+        elif item[0] == 'direct':
+            result['direct_commits'], result['direct_failed'] = item[1], item[2]
+            result['direct_commit_p99_ms'] = round(item[3] * 1000, 1) if item[3] is not None else None
+        else:
+            latencies.extend(item[0])
+            for key, count in item[1].items():
+                errors[key] = errors.get(key, 0) + count
+    latencies.sort()
+    with open(log_path) as log:
+        locked = log.read().count('database is locked')
+    result.update({
+        'requests_per_second': round(len(latencies) / args.duration, 1),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 1) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 1) if latencies else None,
+        'errors': errors,
+        'locked_in_log': locked,
+    })
+    return result
+
+
+def main_():
+    args = parse_args()
+    work_dir = tempfile.mkdtemp(prefix='worker-scaling-')
+    runs = []
+    try:
+        for profile in args.profiles.split(','):
+            for workers in (int(value) for value in args.workers.split(',')):
+                result = run_once(args, workers, profile, work_dir)
+                runs.append(result)
+                print(f"profile {profile:3} workers {workers:2}: {result['requests_per_second']:7.1f} req/s  "
+                      f"p50 {result['p50_ms']} ms  p99 {result['p99_ms']} ms  errors {result['errors']}  "
+                      f"'database is locked' {result['locked_in_log']}  direct commits "
+                      f"{result.get('direct_commits')}/{result.get('direct_failed')} failed", file=sys.stderr)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = json.dumps({
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'cpus': os.cpu_count(),
+        'clients': args.clients,
+        'duration': args.duration,
+        'ingest_rate': args.ingest_rate,
+        'direct_commits_per_second': args.direct_commits,
+        'runs': runs,
+    }, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main_()
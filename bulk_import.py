@@ -0,0 +1,340 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# Bulk import of historical readings from CSV/NDJSON/JSON files, resumable
+import csv
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import insert, select, text
+from models import db, JobProgress, SensorData
+import cycles
+import ingest
+import partitions
+import rollup
+import sensor_stats
+
+logger = logging.getLogger(__name__)
+
+# Readings validated, deduplicated and inserted per transaction
+BATCH_SIZE = 10000
+# Characters read from a JSON file at a time
+READ_SIZE = 1 << 16
+# Secondary sensor_data indexes --defer-indexes drops during the load
+# (none at the moment).
+# ix_sensor_data_sensor_name_vib_date stays: the duplicate check needs it.
+DEFERRABLE_INDEXES = {}
+
+_COLUMNS = [column for column in SensorData.__table__.columns if column.name != 'id']
+_INSERT_SQL = text(
+    'INSERT INTO sensor_data (sensor_name, vib_date, temp, vibration, boot, voltage, rssi) '
+    'VALUES (:sensor_name, :vib_date, :temp, :vibration, :boot, :voltage, :rssi)'
+)
+
+
+class ImportFileError(ValueError):
+    """An input file cannot be read as readings."""
+
+
+def job_name(path):
+    """job_progress key of a file: its absolute path and size, so a changed
+    file is not resumed at the position of the old one."""
+    key = f'{os.path.abspath(path)}:{os.path.getsize(path)}'
+    return f"import:{hashlib.sha1(key.encode('utf-8')).hexdigest()[:24]}"
+
+
+def _open(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def _is_csv(path):
+    return path[:-3].endswith('.csv') if path.endswith('.gz') else path.endswith('.csv')
+
+
+def _csv_item(row):
+    """A CSV row as a reading item: empty cells are NULL and numbers are
+    parsed, so validate_reading sees the same types as from JSON."""
+    item = {}
+    for column in _COLUMNS:
+        value = row.get(column.name)
+        if value is None or value == '':
+            continue
+        python_type = column.type.python_type
+        try:
+            if python_type is float:
+                value = float(value)
+            elif python_type is int:
+                number = float(value)
+                value = int(number) if number.is_integer() else number
+        except ValueError:
+            pass  # left as text for validate_reading to reject
+        item[column.name] = value
+    return item
+
+
+def _iter_csv(f):
+    for row in csv.DictReader(f):
+        yield _csv_item(row)
+
+
+def _iter_json(f):
+    """Yield the objects of a JSON array, or of NDJSON / concatenated JSON,
+    reading READ_SIZE characters at a time."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    array = None
+    while True:
+        buffer = buffer.lstrip(' \t\r\n,')
+        if array is None and buffer:
+            array = buffer.startswith('[')
+            if array:
+                buffer = buffer[1:]
+                continue
+        if array and buffer.startswith(']'):
+            return
+        if buffer:
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise ImportFileError(f'invalid JSON: {e.msg}')
+            else:
+                # A number at the end of the buffer may continue in the next read
+                if end < len(buffer) or eof or isinstance(item, (dict, list)):
+                    yield item
+                    buffer = buffer[end:]
+                    continue
+        elif eof:
+            return
+        chunk = f.read(READ_SIZE)
+        eof = not chunk
+        buffer += chunk
+
+
+def iter_records(path):
+    """Yield the raw records of a .csv, .ndjson/.jsonl or .json file
+    (optionally .gz), in file order."""
+    with _open(path) as f:
+        yield from (_iter_csv(f) if _is_csv(path) else _iter_json(f))
+
+
+def _existing_times(conn, sensor_name, times):
+    """Naive vib_date of the stored readings of a sensor between the
+    smallest and largest of times."""
+    # One second either side: stored text with an offset or without
+    # microseconds sorts before the bound of the same instant
+    rows = conn.execute(
+        select(SensorData.vib_date)
+        .where(SensorData.sensor_name == sensor_name,
+               SensorData.vib_date >= min(times) - timedelta(seconds=1),
+               SensorData.vib_date < max(times) + timedelta(seconds=1))
+    ).scalars()
+    return {value.replace(tzinfo=None) for value in rows}
+
+
+def _deduplicate(conn, readings):
+    """Drop readings whose (sensor_name, vib_date) is stored or repeated."""
+    by_sensor = {}
+    for reading in readings:
+        by_sensor.setdefault(reading['sensor_name'], []).append((reading['vib_date'].replace(tzinfo=None), reading))
+    kept = []
+    for sensor_name, keyed in by_sensor.items():
+        seen = _existing_times(conn, sensor_name, [key for key, _ in keyed])
+        for key, reading in keyed:
+            if key not in seen:
+                seen.add(key)
+                kept.append(reading)
+    return kept
+
+
+def _copy_rows(conn, rows):
+    """COPY rows into sensor_data on PostgreSQL (psycopg2); returns False
+    if the driver has no COPY support."""
+    cursor = conn.connection.dbapi_connection.cursor()
+    if not hasattr(cursor, 'copy_expert'):
+        return False
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    for row in rows:
+        writer.writerow(row[column.name] for column in _COLUMNS)
+    buffer.seek(0)
+    names = ', '.join(column.name for column in _COLUMNS)
+    # Unquoted empty fields (None) are NULL in CSV format
+    cursor.copy_expert(f'COPY sensor_data ({names}) FROM STDIN WITH (FORMAT csv)', buffer)
+    cursor.close()
+    return True
+
+
+def write_batch(conn, readings):
+    """Insert validated readings (site-aware vib_date), COPY on PostgreSQL.
+
+    On a partitioned sensor_data the partitions of older months are
+    created first.
+    """
+    rows = [{column.name: reading[column.name] for column in _COLUMNS} for reading in readings]
+    if conn.dialect.name == 'sqlite':
+        # Same text layout the gateways write: local time with offset
+        for row in rows:
+            row['vib_date'] = row['vib_date'].isoformat(sep=' ')
+        conn.execute(_INSERT_SQL, rows)
+        return
+    for row in rows:
+        row['vib_date'] = row['vib_date'].replace(tzinfo=None)
+    partitions.ensure_partitions(conn, {row['vib_date'] for row in rows})
+    if conn.dialect.name != 'postgresql' or not _copy_rows(conn, rows):
+        conn.execute(insert(SensorData.__table__), rows)
+
+
+def _read_progress(job):
+    return db.session.execute(
+        select(JobProgress.last_reading_id).where(JobProgress.job == job)
+    ).scalar()
+
+
+def _save_progress(conn, job, consumed):
+    now = datetime.utcnow()
+    updated = conn.execute(text(
+        'UPDATE job_progress SET last_reading_id = :consumed, updated_at = :now WHERE job = :job'
+    ), {'consumed': consumed, 'now': now, 'job': job}).rowcount
+    if not updated:
+        conn.execute(insert(JobProgress.__table__), {'job': job, 'last_reading_id': consumed, 'updated_at': now})
+
+
+def import_file(path, timezone, batch_size=BATCH_SIZE, restart=False, affected=None, progress=None):
+    """Import the readings of one file, batch_size per transaction.
+
+    Records are validated like /api/ingest but a vib_date is required.
+    Readings whose (sensor_name, vib_date) is already stored, or earlier
+    in the file, are skipped. The number of records consumed is saved
+    with every batch, so a run that was interrupted continues after the
+    last committed batch; restart starts the file over. affected
+    collects {sensor_name: [first, last]} naive times of the inserted
+    readings.
+
+    Returns a dict of counters: skipped (consumed by an earlier run),
+    read, inserted, duplicates, rejected and seconds.
+    """
+    job = job_name(path)
+    if restart:
+        with db.engine.begin() as conn:
+            conn.execute(text('DELETE FROM job_progress WHERE job = :job'), {'job': job})
+    skip = _read_progress(job) or 0
+    db.session.close()
+    affected = {} if affected is None else affected
+    result = {'path': path, 'skipped': skip, 'read': 0, 'inserted': 0, 'duplicates': 0, 'rejected': 0}
+    started = time.perf_counter()
+    consumed = 0
+    batch = []
+
+    def flush():
+        with db.engine.begin() as conn:
+            readings = _deduplicate(conn, batch) if batch else []
+            if readings:
+                write_batch(conn, readings)
+            _save_progress(conn, job, consumed)
+        for reading in readings:
+            moment = reading['vib_date'].replace(tzinfo=None)
+            bounds = affected.setdefault(reading['sensor_name'], [moment, moment])
+            bounds[0], bounds[1] = min(bounds[0], moment), max(bounds[1], moment)
+        result['inserted'] += len(readings)
+        result['duplicates'] += len(batch) - len(readings)
+        batch.clear()
+        if progress:
+            progress(result)
+
+    records = iter_records(path)
+    while True:
+        try:
+            item = next(records)
+        except StopIteration:
+            break
+        except ImportFileError as e:
+            if consumed > skip:
+                flush()
+            raise ImportFileError(f'{path}, record {consumed + 1}: {e}')
+        consumed += 1
+        if consumed <= skip:
+            continue
+        result['read'] += 1
+        try:
+            if isinstance(item, dict) and item.get('vib_date') is None:
+                raise ingest.ValidationError('vib_date is required')
+            batch.append(ingest.validate_reading(item, timezone))
+        except ingest.ValidationError as e:
+            result['rejected'] += 1
+            if result['rejected'] <= 10:
+                logger.warning(f"{path}: record {consumed} rejected: {e}")
+        if len(batch) >= batch_size:
+            flush()
+    if consumed > skip:
+        flush()
+
+    result['seconds'] = round(time.perf_counter() - started, 2)
+    logger.info(f"Imported {path}: {result}")
+    return result
+
+
+def drop_deferrable_indexes(conn):
+    """Drop the secondary indexes and the insert triggers before a bulk load."""
+    for name in DEFERRABLE_INDEXES:
+        conn.execute(text(f'DROP INDEX IF EXISTS {name}'))
+    rollup.drop_trigger(conn)
+    sensor_stats.drop_trigger(conn)
+
+
+def restore_deferrable_indexes(conn):
+    """Rebuild what the insert triggers maintain, then recreate the triggers and indexes."""
+    rollup.rebuild(conn)
+    rollup.install_trigger(conn)
+    sensor_stats.reconcile(conn)
+    sensor_stats.install_trigger(conn)
+    for name, columns in DEFERRABLE_INDEXES.items():
+        conn.execute(text(f'CREATE INDEX IF NOT EXISTS {name} ON sensor_data {columns}'))
+
+
+def run(paths, timezone, gap_tolerance, batch_size=BATCH_SIZE, defer_indexes=False, restart=False,
+        progress=None):
+    """Import files and bring the derived tables up to date for them.
+
+    Without defer_indexes the usage_hourly and sensor_stats triggers see
+    every inserted reading. With it, the triggers and DEFERRABLE_INDEXES
+    are dropped for the load and both tables are rebuilt once at the end,
+    also when the import fails; do not use it while gateways write to the
+    same database. Stored cycles are extracted again for the backfilled
+    range of every sensor.
+
+    Returns (per-file result dicts, {sensor_name: [first, last]}).
+    """
+    affected = {}
+    results = []
+    if defer_indexes:
+        with db.engine.begin() as conn:
+            drop_deferrable_indexes(conn)
+    try:
+        for path in paths:
+            results.append(import_file(path, timezone, batch_size, restart, affected, progress))
+    finally:
+        if defer_indexes:
+            with db.engine.begin() as conn:
+                restore_deferrable_indexes(conn)
+        # Also after a failed or interrupted run: a resumed run only knows
+        # the range of what it inserts itself
+        refresh_cycles(timezone, gap_tolerance, affected)
+    return results, affected
+
+
+def refresh_cycles(timezone, gap_tolerance, affected):
+    """Extract the stored cycles of the imported ranges again."""
+    # Before the first cycle run there is nothing to correct: it processes
+    # the imported readings along with everything else
+    if affected and _read_progress(cycles.JOB_NAME) is not None:
+        cycles.update(timezone, gap_tolerance)
+        for sensor_name, (first, last) in sorted(affected.items()):
+            cycles.refresh(timezone, gap_tolerance, sensor_name, first, last)
+    db.session.close()
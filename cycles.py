@@ -0,0 +1,298 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# Vectorized extraction of historical machine cycles from sensor_data
+import logging
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, SensorCycle, SensorData, JobProgress
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = 'sensor_cycles'
+# Readings loaded and processed per transaction
+CHUNK_SIZE = 1000000
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch_seconds(values, timezone):
+    """Convert stored vib_date values to epoch seconds, vectorized.
+
+    Values are the SQLite text form ('YYYY-MM-DD HH:MM:SS[.ffffff][+hh:mm]')
+    or datetimes. Like the status logic, the wall-clock part is taken to
+    be in the site timezone and any stored offset is ignored. The UTC
+    offset is looked up once per distinct hour rather than once per row.
+    """
+    if len(values) == 0:
+        return np.empty(0, dtype=np.int64)
+    if isinstance(values[0], str):
+        wall = np.array(values, dtype='U19').astype('datetime64[s]')
+    else:
+        wall = np.array([value.replace(tzinfo=None) for value in values], dtype='datetime64[s]')
+    wall_seconds = wall.astype(np.int64)
+
+    hours, inverse = np.unique(wall_seconds // 3600, return_inverse=True)
+    offsets = np.array([
+        timezone.localize(_EPOCH + timedelta(hours=int(hour))).utcoffset().total_seconds()
+        for hour in hours
+    ], dtype=np.int64)
+    return wall_seconds - offsets[inverse]
+
+
+def extract_cycles(times, codes, gap_tolerance):
+    """Split readings into cycles with array operations only.
+
+    Args:
+        times: Epoch seconds, sorted by (codes, times)
+        codes: Integer sensor code of every reading
+        gap_tolerance: Largest gap in minutes inside one cycle
+
+    Returns:
+        (first, last) index arrays of every cycle into times
+    """
+    n = len(times)
+    if n == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    new_cycle = np.empty(n, dtype=bool)
+    new_cycle[0] = True
+    new_cycle[1:] = (codes[1:] != codes[:-1]) | (np.diff(times) > gap_tolerance * 60)
+    first = np.flatnonzero(new_cycle)
+    last = np.append(first[1:] - 1, n - 1)
+    return first, last
+
+
+def naive_extract_cycles(times, gap_tolerance):
+    """Per-row reference implementation of extract_cycles for one sensor
+    (sorted datetimes); used by the benchmark."""
+    cycles = []
+    start = previous = None
+    count = 0
+    for current in times:
+        if previous is not None and (current - previous).total_seconds() / 60 > gap_tolerance:
+            cycles.append((start, previous, count))
+            start, count = current, 0
+        if start is None:
+            start = current
+        count += 1
+        previous = current
+    if start is not None:
+        cycles.append((start, previous, count))
+    return cycles
+
+
+def _claim_progress(conn):
+    """Lock the job's progress row (first write of the transaction, so a
+    concurrent update waits here) and return the last processed id."""
+    now = datetime.utcnow()
+    updated = conn.execute(text(
+        'UPDATE job_progress SET updated_at = :now WHERE job = :job'
+    ), {'now': now, 'job': JOB_NAME}).rowcount
+    if not updated:
+        # Two first runs may both get here: the second one waits for the
+        # first one's row and then starts from its progress
+        dialect_insert = postgresql.insert if conn.dialect.name == 'postgresql' else sqlite.insert
+        inserted = conn.execute(
+            dialect_insert(JobProgress.__table__).on_conflict_do_nothing(index_elements=['job']),
+            {'job': JOB_NAME, 'last_reading_id': 0, 'updated_at': now}
+        ).rowcount
+        if inserted:
+            return 0
+        conn.execute(text(
+            'UPDATE job_progress SET updated_at = :now WHERE job = :job'
+        ), {'now': now, 'job': JOB_NAME})
+    return conn.execute(
+        select(JobProgress.last_reading_id).where(JobProgress.job == JOB_NAME)
+    ).scalar()
+
+
+def _local(epoch_seconds, timezone):
+    return datetime.fromtimestamp(int(epoch_seconds), timezone).replace(tzinfo=None)
+
+
+def _minutes(start, end):
+    # A Python float: psycopg2 cannot bind numpy scalars
+    return round(float(end - start) / 60, 2)
+
+
+def _process_chunk(conn, rows, timezone, gap_tolerance):
+    """Turn one chunk of (id, sensor_name, vib_date) rows into cycles."""
+    rows = [row for row in rows if row[1] is not None]
+    if not rows:
+        return 0
+
+    sensor_names, codes = np.unique(np.array([row[1] for row in rows], dtype=object).astype(str),
+                                    return_inverse=True)
+    times = to_epoch_seconds([row[2] for row in rows], timezone)
+    order = np.lexsort((times, codes))
+    times = times[order]
+    codes = codes[order]
+    first, last = extract_cycles(times, codes, gap_tolerance)
+
+    new_rows = []
+    for code, sensor_name in enumerate(sensor_names):
+        in_sensor = np.flatnonzero(codes[first] == code)
+        if len(in_sensor) == 0:
+            continue
+        sensor_first = first[in_sensor]
+        sensor_last = last[in_sensor]
+
+        # The newest stored cycle may continue into this chunk
+        previous = conn.execute(
+            select(SensorCycle.id, SensorCycle.start_time, SensorCycle.end_time, SensorCycle.reading_count)
+            .where(SensorCycle.sensor_name == sensor_name)
+            .order_by(SensorCycle.start_time.desc())
+            .limit(1)
+        ).first()
+        if previous is not None:
+            previous_end = timezone.localize(previous.end_time).timestamp()
+            gap = (times[sensor_first[0]] - previous_end) / 60
+            if 0 <= gap <= gap_tolerance:
+                start = timezone.localize(previous.start_time).timestamp()
+                end = times[sensor_last[0]]
+                conn.execute(text(
+                    'UPDATE sensor_cycles SET end_time = :end_time, duration_minutes = :duration, '
+                    'reading_count = :reading_count WHERE id = :id'
+                ), {
+                    'id': previous.id,
+                    'end_time': _local(end, timezone),
+                    'duration': _minutes(start, end),
+                    'reading_count': previous.reading_count + int(sensor_last[0] - sensor_first[0] + 1),
+                })
+                sensor_first = sensor_first[1:]
+                sensor_last = sensor_last[1:]
+
+        for start_index, end_index in zip(sensor_first, sensor_last):
+            start, end = times[start_index], times[end_index]
+            new_rows.append({
+                'sensor_name': str(sensor_name),
+                'start_time': _local(start, timezone),
+                'end_time': _local(end, timezone),
+                'duration_minutes': _minutes(start, end),
+                'reading_count': int(end_index - start_index + 1),
+            })
+
+    if new_rows:
+        conn.execute(insert(SensorCycle.__table__), new_rows)
+    return len(new_rows)
+
+
+def update(timezone, gap_tolerance, max_rows=None, keep_going=None):
+    """Extract cycles from readings added since the last run.
+
+    Readings are consumed in id order, CHUNK_SIZE per transaction, and a
+    cycle that was still running at the end of the previous run is
+    extended. Readings backfilled with older times than already processed
+    ones become separate cycles; run refresh() for the backfilled range
+    (import-readings does) or rebuild() afterwards. keep_going() is called
+    before every chunk; extraction stops when it returns False.
+
+    Returns (readings processed, cycles inserted).
+    """
+    processed = inserted = 0
+    while max_rows is None or processed < max_rows:
+        if keep_going is not None and not keep_going():
+            break
+        limit = CHUNK_SIZE if max_rows is None else min(CHUNK_SIZE, max_rows - processed)
+        with db.engine.begin() as conn:
+            last_id = _claim_progress(conn)
+            rows = conn.execute(text(
+                'SELECT id, sensor_name, vib_date FROM sensor_data WHERE id > :last_id ORDER BY id LIMIT :limit'
+            ), {'last_id': last_id, 'limit': limit}).fetchall()
+            if not rows:
+                break
+            inserted += _process_chunk(conn, rows, timezone, gap_tolerance)
+            conn.execute(text(
+                'UPDATE job_progress SET last_reading_id = :last_id WHERE job = :job'
+            ), {'last_id': rows[-1][0], 'job': JOB_NAME})
+        processed += len(rows)
+        if len(rows) < limit:
+            break
+
+    if processed:
+        logger.info(f"Cycle extraction: {processed} readings, {inserted} new cycles")
+    return processed, inserted
+
+
+def rebuild(timezone, gap_tolerance):
+    """Drop all cycles and extract them again from the full history.
+
+    Cycles that started before a sensor's oldest raw reading are kept:
+    retention has archived their readings, so they cannot be extracted again.
+    """
+    with db.engine.begin() as conn:
+        sensor_names = conn.execute(select(SensorCycle.sensor_name).distinct()).scalars().all()
+        for sensor_name in sensor_names:
+            oldest = conn.execute(
+                select(func.min(SensorData.vib_date)).where(SensorData.sensor_name == sensor_name)
+            ).scalar()
+            if oldest is None:
+                continue
+            # Cycle times are whole seconds
+            conn.execute(
+                delete(SensorCycle)
+                .where(SensorCycle.sensor_name == sensor_name)
+                .where(SensorCycle.start_time >= oldest.replace(tzinfo=None, microsecond=0))
+            )
+        conn.execute(text('DELETE FROM job_progress WHERE job = :job'), {'job': JOB_NAME})
+    return update(timezone, gap_tolerance)
+
+
+def refresh(timezone, gap_tolerance, sensor_type, start, end):
+    """Extract the cycles of one sensor between start and end (naive site
+    times) again, e.g. after readings were backfilled into that range.
+
+    The range is widened to every stored cycle within gap_tolerance of it,
+    so cycles the backfill joins up are replaced as a whole. Only readings
+    update() has processed are used; run it first. Returns the number of
+    cycles written.
+    """
+    margin = timedelta(minutes=gap_tolerance)
+    sensor = SensorCycle.sensor_name == sensor_type
+    with db.engine.begin() as conn:
+        processed_id = conn.execute(
+            select(JobProgress.last_reading_id).where(JobProgress.job == JOB_NAME)
+        ).scalar() or 0
+        first_start, last_end = conn.execute(
+            select(func.min(SensorCycle.start_time), func.max(SensorCycle.end_time))
+            .where(sensor, SensorCycle.end_time >= start - margin, SensorCycle.start_time <= end + margin)
+        ).first()
+        start = min(start, first_start) if first_start else start
+        end = max(end, last_end) if last_end else end
+        conn.execute(delete(SensorCycle).where(sensor, SensorCycle.start_time >= start.replace(microsecond=0),
+                                               SensorCycle.start_time <= end))
+
+        # One second either side: stored text with an offset or without
+        # microseconds sorts before the bound of the same instant
+        values = conn.execute(
+            select(SensorData.vib_date)
+            .where(SensorData.sensor_name == sensor_type, SensorData.id <= processed_id,
+                   SensorData.vib_date >= start - timedelta(seconds=1),
+                   SensorData.vib_date < end + timedelta(seconds=1))
+        ).scalars().all()
+        times = np.sort(to_epoch_seconds(values, timezone))
+        first, last = extract_cycles(times, np.zeros(len(times), dtype=np.int64), gap_tolerance)
+        new_rows = [{
+            'sensor_name': sensor_type,
+            'start_time': _local(times[start_index], timezone),
+            'end_time': _local(times[end_index], timezone),
+            'duration_minutes': _minutes(times[start_index], times[end_index]),
+            'reading_count': int(end_index - start_index + 1),
+        } for start_index, end_index in zip(first, last)]
+        if new_rows:
+            conn.execute(insert(SensorCycle.__table__), new_rows)
+    return len(new_rows)
+
+
+def find_cycles(sensor_type, start=None, end=None, limit=None):
+    """Stored cycles of a sensor starting within [start, end), oldest first."""
+    query = SensorCycle.query.filter_by(sensor_name=sensor_type)
+    if start is not None:
+        query = query.filter(SensorCycle.start_time >= start)
+    if end is not None:
+        query = query.filter(SensorCycle.start_time < end)
+    query = query.order_by(SensorCycle.start_time)
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
@@ -0,0 +1,145 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# Streaming CSV/NDJSON export of sensor_data in constant memory
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from sqlalchemy import String, literal, select, tuple_, type_coerce
+from models import db, SensorData
+
+FORMATS = ('csv', 'ndjson')
+COLUMNS = ('id', 'sensor_name', 'vib_date', 'temp', 'vibration', 'boot', 'voltage', 'rssi')
+# Rows per keyset query; also the rows held in memory at any time
+BATCH_SIZE = 5000
+
+# vib_date is read as stored (text with or without an offset in SQLite) so
+# keyset comparisons match the stored values exactly
+_RAW_VIB_DATE = type_coerce(SensorData.vib_date, String)
+
+
+class ExportError(ValueError):
+    """The export cannot start with the given arguments."""
+
+
+def _position_of(reading_id):
+    """Keyset position (raw vib_date, id) of an exported reading."""
+    raw_date = db.session.execute(
+        select(_RAW_VIB_DATE).where(SensorData.id == reading_id)
+    ).scalar()
+    if raw_date is None:
+        raise ExportError(f'reading {reading_id} does not exist (deleted or archived)')
+    return raw_date, reading_id
+
+
+def iter_rows(sensor_type, start=None, end=None, after_id=None, batch_size=BATCH_SIZE):
+    """Iterate over readings of a sensor in (vib_date, id) order, one batch per query.
+
+    Every batch is a separate short query continuing after the last row of
+    the previous one, so no read transaction stays open for the length of
+    the export (SQLite can checkpoint its WAL, PostgreSQL can vacuum) and
+    at most batch_size rows are held in memory. after_id resumes after
+    that reading; start and end are naive site times, [start, end).
+    Raises ExportError right away if after_id does not exist.
+    """
+    position = _position_of(after_id) if after_id is not None else None
+    return _iter_batches(sensor_type, start, end, position, batch_size)
+
+
+def _iter_batches(sensor_type, start, end, position, batch_size):
+    columns = [getattr(SensorData, name) if name != 'vib_date' else _RAW_VIB_DATE.label('vib_date')
+               for name in COLUMNS]
+    base = select(*columns).where(SensorData.sensor_name == sensor_type)
+    if start is not None:
+        base = base.where(SensorData.vib_date >= start)
+    if end is not None:
+        base = base.where(SensorData.vib_date < end)
+    base = base.order_by(SensorData.vib_date, SensorData.id).limit(batch_size)
+
+    while True:
+        query = base
+        if position is not None:
+            query = query.where(tuple_(_RAW_VIB_DATE, SensorData.id) >
+                                tuple_(literal(position[0], String), literal(position[1])))
+        rows = db.session.execute(query).all()
+        db.session.close()
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        position = (rows[-1].vib_date, rows[-1].id)
+
+
+def _format_time(value, timezone):
+    """ISO 8601 with the site UTC offset; naive stored times are site time."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = timezone.localize(value)
+    return value.isoformat()
+
+
+def _csv_chunks(rows, timezone, header):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    if header:
+        writer.writerow(COLUMNS)
+    count = 0
+    for row in rows:
+        values = list(row)
+        values[2] = _format_time(values[2], timezone)
+        writer.writerow(values)
+        count += 1
+        if count % BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ndjson_chunks(rows, timezone):
+    lines = []
+    for row in rows:
+        record = dict(zip(COLUMNS, row))
+        record['vib_date'] = _format_time(record['vib_date'], timezone)
+        lines.append(json.dumps(record) + '\n')
+        if len(lines) >= BATCH_SIZE:
+            yield ''.join(lines)
+            lines = []
+    yield ''.join(lines)
+
+
+def stream(rows, export_format, timezone, compress=False, header=True):
+    """Encode rows as CSV or NDJSON, yielding bytes chunks (gzip when compress).
+
+    header adds the CSV column names; leave it off when appending a resumed
+    export to an earlier file. Raises ExportError right away for an
+    unknown format.
+    """
+    if export_format not in FORMATS:
+        raise ExportError(f'format must be one of {", ".join(FORMATS)}')
+    return _encode(rows, export_format, timezone, compress, header)
+
+
+def _encode(rows, export_format, timezone, compress, header):
+    if export_format == 'csv':
+        chunks = _csv_chunks(rows, timezone, header)
+    else:
+        chunks = _ndjson_chunks(rows, timezone)
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # wbits 31: gzip container
+    for chunk in chunks:
+        data = chunk.encode('utf-8')
+        if compressor is not None:
+            data = compressor.compress(data)
+        if data:
+            yield data
+    if compressor is not None:
+        yield compressor.flush()
+
+
+def filename(sensor_type, start, end, export_format, compress):
+    """Download name such as washer_20250101_20250201.csv.gz."""
+    parts = [sensor_type,
+             start.strftime('%Y%m%d') if start else 'first',
+             end.strftime('%Y%m%d') if end else 'last']
+    return f"{'_'.join(parts)}.{export_format}{'.gz' if compress else ''}"
@@ -0,0 +1,342 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# Sensor reading ingestion: validation and the write-behind buffer
+import atexit
+import json
+import logging
+import math
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from sqlalchemy import DateTime, bindparam, insert, text
+from models import db, SensorData
+
+logger = logging.getLogger(__name__)
+
+# Readings held in memory waiting to be written; beyond this, ingestion
+# requests wait up to ENQUEUE_TIMEOUT and are then refused with a 503
+MAX_PENDING_READINGS = 50000
+ENQUEUE_TIMEOUT = 2.0
+# A flush writes at most this many readings in one transaction
+MAX_BATCH_SIZE = 2000
+# How long a reading may sit in the buffer before it is flushed
+FLUSH_INTERVAL = 0.5
+# A batch that fails to write (e.g. "database is locked" once busy_timeout
+# ran out) goes back to the head of the buffer and is retried this many
+# times in all, waiting RETRY_BACKOFF, twice that, ... up to
+# MAX_RETRY_BACKOFF seconds in between, before it is counted as failed
+WRITE_ATTEMPTS = 5
+RETRY_BACKOFF = 0.5
+MAX_RETRY_BACKOFF = 8.0
+# How long close() waits for the writer to drain the buffer at exit
+CLOSE_TIMEOUT = 30
+
+# Columns a reading may carry; id is the database's
+_INGEST_COLUMNS = [column for column in SensorData.__table__.columns if column.name != 'id']
+
+
+class ValidationError(ValueError):
+    """A reading does not fit the SensorData model."""
+
+
+def parse_payload(body, content_type, timezone):
+    """Parse a single reading, a JSON array of readings or NDJSON.
+
+    Returns (readings, rejected) where readings are validated column dicts
+    and rejected is a list of {'index', 'error'} for the invalid ones.
+    """
+    try:
+        text_body = body.decode('utf-8')
+    except UnicodeDecodeError:
+        raise ValidationError('body must be UTF-8')
+
+    if 'ndjson' in (content_type or ''):
+        items = _parse_ndjson(text_body)
+    else:
+        try:
+            parsed = json.loads(text_body)
+        except ValueError as e:
+            if len(text_body.strip().splitlines()) < 2:
+                raise ValidationError(f'invalid JSON: {e}')
+            items = _parse_ndjson(text_body)
+        else:
+            items = parsed if isinstance(parsed, list) else [parsed]
+
+    readings = []
+    rejected = []
+    for index, item in enumerate(items):
+        try:
+            if isinstance(item, Exception):
+                raise item
+            readings.append(validate_reading(item, timezone))
+        except ValidationError as e:
+            rejected.append({'index': index, 'error': str(e)})
+    return readings, rejected
+
+
+def _parse_ndjson(text_body):
+    items = []
+    for line in text_body.splitlines():
+        line = line.strip()
+        if line:
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                items.append(ValidationError(f'invalid JSON: {e}'))
+    return items
+
+
+def validate_reading(item, timezone):
+    """Validate one reading against the SensorData columns.
+
+    vib_date may be an ISO 8601 string or epoch seconds and defaults to now;
+    naive times are taken to be in the site timezone. mac_address is
+    optional and only used to update the matching Sensor row.
+    """
+    if not isinstance(item, dict):
+        raise ValidationError('reading must be a JSON object')
+
+    reading = {}
+    for column in _INGEST_COLUMNS:
+        value = item.get(column.name)
+        if value is None:
+            if column.name == 'vib_date':
+                value = datetime.now(timezone)
+            elif not column.nullable:
+                raise ValidationError(f'{column.name} is required')
+            else:
+                reading[column.name] = None
+                continue
+
+        python_type = column.type.python_type
+        try:
+            if python_type is datetime:
+                value = _parse_datetime(value, timezone)
+            elif python_type is str:
+                if not isinstance(value, str):
+                    raise TypeError
+                if column.type.length and len(value) > column.type.length:
+                    raise ValidationError(f'{column.name} is longer than {column.type.length} characters')
+            elif python_type is int:
+                if isinstance(value, bool) or int(value) != value:
+                    raise TypeError
+                value = int(value)
+            elif python_type is float:
+                if isinstance(value, bool):
+                    raise TypeError
+                value = float(value)
+        except (TypeError, ValueError, OverflowError):
+            raise ValidationError(f'{column.name} must be {python_type.__name__}')
+        if python_type is float and not math.isfinite(value):
+            raise ValidationError(f'{column.name} must be finite')
+        reading[column.name] = value
+
+    mac_address = item.get('mac_address')
+    if mac_address is not None and not isinstance(mac_address, str):
+        raise ValidationError('mac_address must be str')
+    reading['mac_address'] = mac_address
+    return reading
+
+
+def _parse_datetime(value, timezone):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value, timezone)
+    if not isinstance(value, str):
+        raise TypeError
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        return timezone.localize(parsed)
+    return parsed.astimezone(timezone)
+
+
+class WriteBehindBuffer:
+    """Bounded in-memory buffer of readings flushed in bulk by one thread.
+
+    Each flush inserts up to MAX_BATCH_SIZE readings with a single
+    executemany in one transaction and then updates last_seen/battery once
+    per sensor in the batch, not once per row. A failed flush is retried
+    (WRITE_ATTEMPTS) before its readings are given up and counted as failed.
+    """
+
+    def __init__(self, app, timezone, max_pending=MAX_PENDING_READINGS):
+        self._app = app
+        self._timezone = timezone
+        self._max_pending = max_pending
+        self._pending = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self.accepted = 0
+        self.written = 0
+        self.batches = 0
+        self.refused = 0
+        self.retries = 0
+        self.failed = 0
+        atexit.register(self.close)
+
+    def enqueue(self, readings, timeout=ENQUEUE_TIMEOUT):
+        """Add readings to the buffer as a whole.
+
+        Blocks for up to timeout while the buffer is full and returns False
+        if there is still no room (the caller should answer 503).
+        """
+        if len(readings) > self._max_pending:
+            self.refused += len(readings)
+            return False
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while len(self._pending) + len(readings) > self._max_pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._stopping:
+                    self.refused += len(readings)
+                    return False
+                self._condition.wait(remaining)
+            self._pending.extend(readings)
+            self.accepted += len(readings)
+            self._ensure_thread()
+            self._condition.notify_all()
+        return True
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='ingest-writer', daemon=True)
+            self._thread.start()
+
+    def _take_batch(self):
+        with self._condition:
+            if not self._pending:
+                self._condition.wait(FLUSH_INTERVAL)
+            elif len(self._pending) < MAX_BATCH_SIZE and not self._stopping:
+                # Give a trickle of readings a moment to become a batch
+                self._condition.wait(FLUSH_INTERVAL)
+            batch = [self._pending.popleft() for _ in range(min(MAX_BATCH_SIZE, len(self._pending)))]
+            self._condition.notify_all()
+            return batch
+
+    def _run(self):
+        """Write batches until stopping and the buffer is empty."""
+        attempts = 0  # failed writes of the readings at the head of the buffer
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                if self._stopping:
+                    return
+                continue
+            if self._write(batch):
+                attempts = 0
+                continue
+            attempts += 1
+            if attempts >= WRITE_ATTEMPTS:
+                self.failed += len(batch)
+                logger.error(f"Gave up on {len(batch)} readings after {attempts} failed writes")
+                attempts = 0
+                continue
+            # Keep the order: the batch is written before anything newer
+            with self._condition:
+                self._pending.extendleft(reversed(batch))
+                self.retries += 1
+            time.sleep(min(RETRY_BACKOFF * 2 ** (attempts - 1), MAX_RETRY_BACKOFF))
+
+    def _write(self, batch):
+        """Write one batch in one transaction; returns False when it failed."""
+        rows = []
+        latest = {}
+        for reading in batch:
+            row = {column.name: reading[column.name] for column in _INGEST_COLUMNS}
+            rows.append(row)
+            key = (reading['sensor_name'], reading['mac_address'])
+            if key not in latest or reading['vib_date'] > latest[key]['vib_date']:
+                latest[key] = reading
+
+        try:
+            with self._app.app_context():
+                with db.engine.begin() as conn:
+                    if conn.dialect.name == 'sqlite':
+                        # Same text layout the gateways write: local time with offset
+                        for row in rows:
+                            row['vib_date'] = row['vib_date'].isoformat(sep=' ')
+                        conn.execute(text(
+                            'INSERT INTO sensor_data (sensor_name, vib_date, temp, vibration, boot, voltage, rssi) '
+                            'VALUES (:sensor_name, :vib_date, :temp, :vibration, :boot, :voltage, :rssi)'
+                        ), rows)
+                    else:
+                        for row in rows:
+                            row['vib_date'] = row['vib_date'].replace(tzinfo=None)
+                        conn.execute(insert(SensorData.__table__), rows)
+
+                    for (sensor_name, mac_address), reading in latest.items():
+                        self._touch_sensor(conn, sensor_name, mac_address, reading)
+        except Exception:
+            logger.exception(f"Failed to write batch of {len(batch)} readings")
+            return False
+
+        self.written += len(batch)
+        self.batches += 1
+        return True
+
+    @staticmethod
+    def _touch_sensor(conn, sensor_name, mac_address, reading):
+        params = {
+            'last_seen': reading['vib_date'].replace(tzinfo=None),
+            'battery': reading['voltage'],
+        }
+        if mac_address:
+            where = 'mac_address = :mac_address'
+            params['mac_address'] = mac_address
+        else:
+            where = "sensor_type = :sensor_name AND status = 'active'"
+            params['sensor_name'] = sensor_name
+        # A delayed or backfilled batch must not move last_seen backwards.
+        # The typed bind stores last_seen as the ORM does, so the comparison
+        # also holds for SQLite's text timestamps.
+        conn.execute(text(
+            'UPDATE sensors SET last_seen = :last_seen, battery = COALESCE(:battery, battery) '
+            f'WHERE {where} AND (last_seen IS NULL OR last_seen < :last_seen)'
+        ).bindparams(bindparam('last_seen', type_=DateTime)), params)
+
+    def flush(self, timeout=30):
+        """Block until everything enqueued so far is written."""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            self._condition.notify_all()
+        while time.monotonic() < deadline:
+            with self._condition:
+                if not self._pending and self.written + self.failed >= self.accepted:
+                    return True
+            time.sleep(0.01)
+        return False
+
+    def close(self):
+        """Flush what is pending and stop the writer (runs at interpreter exit)."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=CLOSE_TIMEOUT)
+            if self._thread.is_alive():
+                with self._condition:
+                    lost = len(self._pending)
+                if lost:
+                    self.failed += lost
+                    logger.error(f"Stopped with {lost} readings not written (writer still retrying)")
+                return
+        if self._pending:
+            # The writer was never started or died: write the rest here,
+            # with the same retries
+            self._run()
+
+    def stats(self):
+        with self._condition:
+            pending = len(self._pending)
+        return {
+            'pending': pending,
+            'max_pending': self._max_pending,
+            'accepted': self.accepted,
+            'written': self.written,
+            'batches': self.batches,
+            'refused': self.refused,
+            'retries': self.retries,
+            'failed': self.failed,
+        }
@@ -0,0 +1,210 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# Request, phase and SQL timing exposed as Prometheus metrics on /metrics
+import contextvars
+import logging
+import os
+import time
+from contextlib import contextmanager
+from flask import Response, request
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram,
+                               REGISTRY, generate_latest, multiprocess)
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Statements listed per request in the slow-request log
+SLOW_LOG_TOP_QUERIES = 5
+# Characters of a statement kept for the slow-request log
+SLOW_LOG_STATEMENT_LENGTH = 200
+
+_QUERY_BUCKETS = (.0001, .00025, .0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5)
+_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100, 250)
+
+REQUEST_COUNT = Counter(
+    'laundry_http_requests_total', 'HTTP requests served',
+    ['endpoint', 'method', 'status'])
+REQUEST_DURATION = Histogram(
+    'laundry_http_request_duration_seconds', 'Time to build the response (excludes streamed bodies)',
+    ['endpoint', 'method'])
+PHASE_DURATION = Histogram(
+    'laundry_phase_duration_seconds', 'Time spent in a named phase of request handling',
+    ['phase'])
+QUERY_COUNT = Counter(
+    'laundry_db_queries_total', 'SQL statements executed',
+    ['endpoint'])
+QUERY_DURATION = Histogram(
+    'laundry_db_query_duration_seconds', 'Execution time of single SQL statements',
+    ['endpoint'], buckets=_QUERY_BUCKETS)
+QUERIES_PER_REQUEST = Histogram(
+    'laundry_db_queries_per_request', 'SQL statements executed per HTTP request',
+    ['endpoint'], buckets=_COUNT_BUCKETS)
+
+# Statements run outside a request (SSE producer, ingest writer, CLI) are
+# attributed to this endpoint label
+BACKGROUND = 'background'
+
+
+class RequestStats:
+    """Timings collected for the request being handled by this thread."""
+    __slots__ = ('endpoint', 'started', 'queries', 'query_seconds', 'phases', 'statements', 'keep_statements')
+
+    def __init__(self, endpoint, keep_statements):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.phases = []
+        self.statements = [] if keep_statements else None
+        self.keep_statements = keep_statements
+
+
+_current = contextvars.ContextVar('request_stats', default=None)
+# Set by init_app(); begin_request() collects nothing until then
+_enabled = False
+_slow_request_ms = None
+
+
+@contextmanager
+def phase(name):
+    """Time a named phase (status, popular_times, render, ...).
+
+    The duration is observed in laundry_phase_duration_seconds and, inside
+    a request, listed with its query count in the slow-request log.
+    """
+    stats = _current.get()
+    queries_before = stats.queries if stats is not None else 0
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        PHASE_DURATION.labels(name).observe(elapsed)
+        if stats is not None:
+            stats.phases.append((name, elapsed, stats.queries - queries_before))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._instrumentation_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._instrumentation_started
+    stats = _current.get()
+    if stats is None:
+        endpoint = BACKGROUND
+    else:
+        endpoint = stats.endpoint
+        stats.queries += 1
+        stats.query_seconds += elapsed
+        if stats.keep_statements:
+            stats.statements.append((elapsed, statement))
+    # labels() costs more than the observation itself; keep the children
+    children = _query_metrics.get(endpoint)
+    if children is None:
+        children = _query_metrics[endpoint] = (QUERY_COUNT.labels(endpoint), QUERY_DURATION.labels(endpoint))
+    children[0].inc()
+    children[1].observe(elapsed)
+
+
+_query_metrics = {}
+
+
+def _endpoint_label():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def _log_slow_request(stats, elapsed, method, path, status_code):
+    phases = ', '.join(f"{name} {seconds * 1000:.1f}ms/{queries}q" for name, seconds, queries in stats.phases)
+    slowest = sorted(stats.statements, key=lambda item: item[0], reverse=True)[:SLOW_LOG_TOP_QUERIES]
+    lines = [
+        f"Slow request {method} {path} -> {status_code}: "
+        f"{elapsed * 1000:.1f}ms, {stats.queries} queries in {stats.query_seconds * 1000:.1f}ms"
+        + (f"; phases: {phases}" if phases else '')
+    ]
+    for seconds, statement in slowest:
+        compact = ' '.join(statement.split())[:SLOW_LOG_STATEMENT_LENGTH]
+        lines.append(f"    {seconds * 1000:8.2f}ms  {compact}")
+    logger.warning('\n'.join(lines))
+
+
+def _record(stats, method, path, status_code):
+    elapsed = time.perf_counter() - stats.started
+    REQUEST_COUNT.labels(stats.endpoint, method, status_code).inc()
+    REQUEST_DURATION.labels(stats.endpoint, method).observe(elapsed)
+    QUERIES_PER_REQUEST.labels(stats.endpoint).observe(stats.queries)
+    if stats.keep_statements and elapsed * 1000 >= _slow_request_ms:
+        _log_slow_request(stats, elapsed, method, path, status_code)
+
+
+def begin_request(endpoint):
+    """Start timing a request that Flask does not serve (see asgi.py).
+
+    endpoint is the label its Flask route would have. Returns the stats
+    to pass to end_request(), None while the instrumentation is off.
+    """
+    if not _enabled:
+        return None
+    stats = RequestStats(endpoint, _slow_request_ms is not None)
+    _current.set(stats)
+    return stats
+
+
+def end_request(stats, method, path, status_code):
+    """Record a request started with begin_request(), as after_request does for Flask."""
+    _current.set(None)
+    if stats is not None:
+        _record(stats, method, path, status_code)
+
+
+def instrument_engine(engine):
+    """Count and time the statements of engine (also engines opened later, like site shards)."""
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def init_app(app, engines, slow_request_ms=None):
+    """Instrument app's requests and the engines' statements and add /metrics.
+
+    Args:
+        app: Flask application
+        engines: SQLAlchemy engines whose statements are counted and timed
+                 (the writer and, with the SQLite profile, the reader)
+        slow_request_ms: Log requests slower than this with their phases and
+                         slowest statements; None disables the log
+    """
+    global _enabled, _slow_request_ms
+    _enabled = True
+    _slow_request_ms = slow_request_ms
+    keep_statements = slow_request_ms is not None
+    for engine in engines:
+        instrument_engine(engine)
+
+    def _start_request_stats(endpoint, values):
+        _current.set(RequestStats(_endpoint_label(), keep_statements))
+
+    # First of the URL value preprocessors, which run before any
+    # before_request function: requests one of them aborts (404 for an
+    # unknown site) are counted too
+    app.url_value_preprocessors.setdefault(None, []).insert(0, _start_request_stats)
+
+    @app.after_request
+    def _record_request_stats(response):
+        stats = _current.get()
+        if stats is not None:
+            _record(stats, request.method, request.full_path.rstrip('?'), response.status_code)
+        return response
+
+    @app.teardown_request
+    def _clear_request_stats(exc):
+        _current.set(None)
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        """Prometheus metrics of this process, or of all gunicorn workers when
+        PROMETHEUS_MULTIPROC_DIR is set."""
+        if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
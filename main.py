@@ -1,15 +1,39 @@
 # Version v1.1.2 - Last modified: 2025-03-31
 # Laundry Status Application - Multi-sensor support with improved dryer logic
-from flask import Flask, render_template, jsonify, request, redirect, url_for, flash
+from flask import Flask, Response, stream_with_context, render_template, jsonify, request, redirect, url_for, flash, abort, g, has_app_context
 from datetime import datetime, timedelta
 import pytz
 import os
+import math
 import logging
-from sqlalchemy import func, cast, extract, text
-from models import db, SensorData, Sensor
+import sys
+import time
+import click
+from sqlalchemy import func, create_engine
+from sqlalchemy.exc import OperationalError
+from models import db, Sensor, SensorStats
+import migrations
+import queries
+import rollup
+import sensor_stats
+import ingest
+import cycles
+import synthetic
+import instrumentation
+import precompute
+import sqlite_profile
+import retention
+import export
+import bulk_import
+import partitions
+import shards
+import assets
+from status_cache import StatusCache, status_cache, payload_etag
+from status_stream import StatusBroadcaster
+from recent_readings import RecentReadings
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+# Configure logging (LOG_LEVEL=DEBUG for SQL-level detail)
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper())
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
@@ -21,9 +45,16 @@ USE_POSTGRES = os.environ.get('USE_POSTGRES', 'False').lower() in ('true', '1',
 # For Mac version, use the specific path
 MAC_VERSION = os.environ.get('MAC_VERSION', 'False').lower() in ('true', '1', 'yes')
 
+def _psycopg2_url(database_url):
+    # psycopg2 is the driver in requirements.txt; SQLAlchemy 2.1 would pick
+    # psycopg 3 for a plain postgresql:// URL (and bulk_import uses psycopg2's COPY)
+    if database_url.startswith(('postgres://', 'postgresql://')):
+        return 'postgresql+psycopg2://' + database_url.split('://', 1)[1]
+    return database_url
+
 if USE_POSTGRES and 'DATABASE_URL' in os.environ:
     # Use PostgreSQL database only if explicitly configured
-    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get('DATABASE_URL')
+    app.config["SQLALCHEMY_DATABASE_URI"] = _psycopg2_url(os.environ.get('DATABASE_URL'))
     app.logger.info("Using PostgreSQL database")
 else:
     # Use SQLite database (default)
@@ -35,14 +66,64 @@ else:
     app.logger.info(f"Using SQLite database: {sqlite_path}")
 
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024  # largest accepted ingest batch
 app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_recycle": 300,
     "pool_pre_ping": True,
 }
 
+# SQLite production profile: WAL journal and tuned pragmas, with a second,
+# query-only engine for reads so several workers can share the file while
+# the ingest writer commits (see sqlite_profile.py)
+SQLITE_PRODUCTION_MODE = os.environ.get('SQLITE_PRODUCTION_MODE', 'True').lower() in ('true', '1', 'yes')
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+SQLITE_MMAP_MB = int(os.environ.get('SQLITE_MMAP_MB', 128))
+SQLITE_CACHE_MB = int(os.environ.get('SQLITE_CACHE_MB', 32))
+use_sqlite_profile = SQLITE_PRODUCTION_MODE and app.config["SQLALCHEMY_DATABASE_URI"].startswith('sqlite:')
+using_postgres = app.config["SQLALCHEMY_DATABASE_URI"].startswith('postgresql')
+
+if use_sqlite_profile:
+    app.config["SQLALCHEMY_BINDS"] = {sqlite_profile.READER_BIND: app.config["SQLALCHEMY_DATABASE_URI"]}
+
 # Initialize the app with the extension
 db.init_app(app)
 
+if use_sqlite_profile:
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            sqlite_profile.configure_engine(engine, read_only=bind_key == sqlite_profile.READER_BIND,
+                                            busy_timeout_ms=SQLITE_BUSY_TIMEOUT_MS,
+                                            mmap_mb=SQLITE_MMAP_MB, cache_mb=SQLITE_CACHE_MB)
+
+# Bring the schema up to date (indexes, rollup tables) before serving.
+# Set AUTO_MIGRATE=false to run `flask db-upgrade` by hand instead.
+AUTO_MIGRATE = os.environ.get('AUTO_MIGRATE', 'True').lower() in ('true', '1', 'yes')
+
+if AUTO_MIGRATE:
+    with app.app_context():
+        try:
+            applied = migrations.upgrade()
+            if applied:
+                app.logger.info(f"Applied schema migrations: {applied}")
+        except OperationalError as e:
+            app.logger.error(f"Schema migration failed: {e}")
+
+# Request/SQL timing on /metrics; SLOW_REQUEST_MS logs slower requests
+# with their phase and query breakdown
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() in ('true', '1', 'yes')
+SLOW_REQUEST_MS = float(os.environ['SLOW_REQUEST_MS']) if os.environ.get('SLOW_REQUEST_MS') else None
+
+if METRICS_ENABLED:
+    with app.app_context():
+        instrumentation.init_app(app, db.engines.values(), SLOW_REQUEST_MS)
+
+# Minified, content-hashed and pre-compressed static CSS/JS cached for a
+# year, and compressed HTML (see assets.py)
+ASSETS_ENABLED = os.environ.get('ASSETS_ENABLED', 'True').lower() in ('true', '1', 'yes')
+
+if ASSETS_ENABLED:
+    assets.init_app(app)
+
 # Constants
 WASHER_CYCLE = 37  # Default cycle time in minutes
 DRYER_CYCLE = 64   # Updated dryer cycle to 64 minutes
@@ -52,17 +133,102 @@ FILL_ADJUSTMENT = 6  # Adjustment for washer fill time (6 minutes)
 MID_CYCLE_GAP_TOLERANCE = 8.25
 DRYER_INACTIVE_TIMEOUT = 3  # Dryer is considered inactive after 3 minutes without vibration
 TIMEZONE = pytz.timezone('America/Los_Angeles')
+# Server-Sent Event streams are closed after this long and the browser
+# reconnects, so a connection never pins a worker thread indefinitely
+SSE_MAX_STREAM_SECONDS = int(os.environ.get('SSE_MAX_STREAM_SECONDS', 300))
+# Open streams per worker; each holds one of gunicorn's --threads (64 in the
+# Docker image), the rest are left for other requests. Dashboards beyond
+# the cap are answered 503 and poll /api/status instead
+SSE_MAX_SUBSCRIBERS = int(os.environ.get('SSE_MAX_SUBSCRIBERS', 48))
+# Check every ring-buffer status against the SQL window logic (debugging)
+RING_BUFFER_VERIFY = os.environ.get('RING_BUFFER_VERIFY', 'False').lower() in ('true', '1', 'yes')
+# Popular times histograms and statuses are precomputed by one leader-elected
+# worker into a shared table; requests read them (see precompute.py)
+PRECOMPUTE_ENABLED = os.environ.get('PRECOMPUTE_ENABLED', 'True').lower() in ('true', '1', 'yes')
+POPULAR_TIMES_REFRESH_SECONDS = int(os.environ.get('POPULAR_TIMES_REFRESH_SECONDS', 300))
+# Stored snapshots older than this are ignored and computed on the request path
+STATUS_MAX_AGE = 3 * REFRESH_INTERVAL
+POPULAR_TIMES_MAX_AGE = 2 * POPULAR_TIMES_REFRESH_SECONDS + precompute.LEASE_SECONDS
+# The scheduler leader extracts cycles from new readings every
+# CYCLES_UPDATE_SECONDS (0: only `flask update-cycles`), at most
+# CYCLES_CATCH_UP_ROWS readings per run; /api/cycles only reads them
+CYCLES_UPDATE_SECONDS = int(os.environ.get('CYCLES_UPDATE_SECONDS', 60))
+CYCLES_CATCH_UP_ROWS = int(os.environ.get('CYCLES_CATCH_UP_ROWS', 100000))
+# Raw readings older than RETENTION_DAYS are folded into the hourly archive
+# and deleted by the scheduler leader (unset: keep every raw reading)
+RETENTION_DAYS = int(os.environ['RETENTION_DAYS']) if os.environ.get('RETENTION_DAYS') else None
+RETENTION_INTERVAL_SECONDS = int(os.environ.get('RETENTION_INTERVAL_SECONDS', 3600))
+RETENTION_ROWS_PER_RUN = int(os.environ.get('RETENTION_ROWS_PER_RUN', 100000))
+# How often the scheduler leader creates the coming months' sensor_data
+# partitions and drops the ones retention emptied (PostgreSQL)
+PARTITION_MAINTENANCE_SECONDS = int(os.environ.get('PARTITION_MAINTENANCE_SECONDS', 3600))
+# Shared secret the gateways send in X-Ingest-Token (no check when unset)
+INGEST_TOKEN = os.environ.get('INGEST_TOKEN')
+# One database per laundry site behind /api/<location>/... (see shards.py):
+# a URL with a {location} placeholder, e.g. sqlite:////data/sites/{location}.db
+SHARD_DATABASE_URL = os.environ.get('SHARD_DATABASE_URL')
+# Sites of a non-SQLite SHARD_DATABASE_URL (comma-separated); SQLite sites
+# are the database files that exist
+SHARD_LOCATIONS = [location.strip() for location in os.environ.get('SHARD_LOCATIONS', '').split(',')
+                   if location.strip()]
+# Site databases kept open per worker, each with its own ring buffers
+SHARD_MAX_OPEN = int(os.environ.get('SHARD_MAX_OPEN', 256))
+# Threads the cross-site admin views query the sites on
+SHARD_FAN_OUT_THREADS = int(os.environ.get('SHARD_FAN_OUT_THREADS', 8))
 
-def get_sensor_status(sensor_type="washer"):
-    """Get the current status of a specific sensor type."""
-    
-    # Query includes temperature data for the most recent 40 readings
-    readings = SensorData.query.filter_by(sensor_name=sensor_type) \
-                          .order_by(SensorData.vib_date.desc()) \
-                          .limit(40).all()
+def _localize(vib_date):
+    """Attach the site timezone to a stored (naive or offset) reading time."""
+    return TIMEZONE.localize(vib_date.replace(tzinfo=None))
 
-    now = datetime.now(TIMEZONE)
+def _find_cycle_start(readings, latest):
+    """Walk back from the newest reading to the first gap longer than
+    MID_CYCLE_GAP_TOLERANCE and return the reading time just after it.
+
+    Readings are only localized as far back as the walk goes.
+    """
+    current = latest
+    for reading in readings[1:]:
+        previous = _localize(reading[0])
+        gap = (current - previous).total_seconds() / 60
+        if gap > MID_CYCLE_GAP_TOLERANCE:
+            return current
+        current = previous
+    return latest
+
+def status_inputs_from_readings(readings):
+    """Reduce a window of readings to what the status logic needs.
+    
+    Args:
+        readings: (vib_date, voltage, temp) tuples, newest first
+    
+    Returns:
+        (latest, cycle_start, voltage, temperature), or None without readings
+    """
     if not readings:
+        return None
+    latest = _localize(readings[0][0])
+    return latest, _find_cycle_start(readings, latest), readings[0][1], readings[0][2]
+
+def compute_sensor_status(sensor_type, readings, now):
+    """Compute the status of a sensor from its most recent readings.
+    
+    Args:
+        sensor_type: The sensor name (selects washer or dryer cycle logic)
+        readings: (vib_date, voltage, temp) tuples, newest first
+        now: Current time in TIMEZONE
+    """
+    return status_from_inputs(sensor_type, status_inputs_from_readings(readings), now)
+
+def status_from_inputs(sensor_type, inputs, now):
+    """Compute the status of a sensor.
+    
+    Args:
+        sensor_type: The sensor name (selects washer or dryer cycle logic)
+        inputs: (latest, cycle_start, voltage, temperature) as returned by
+                status_inputs_from_readings or RecentReadings, or None
+        now: Current time in TIMEZONE
+    """
+    if inputs is None:
         free_since = now - timedelta(hours=1)
         return {
             'sensor_type': sensor_type,
@@ -73,40 +239,30 @@ def get_sensor_status(sensor_type="washer"):
             'temperature': None
         }
 
-    times = [TIMEZONE.localize(reading.vib_date.replace(tzinfo=None)) for reading in readings]
-    latest_voltage = readings[0].voltage
-    latest_temperature = readings[0].temp  # Get the latest temperature
+    latest, cycle_start, latest_voltage, latest_temperature = inputs
+    voltage = float(latest_voltage) if latest_voltage is not None else None
+    temperature = float(latest_temperature) if latest_temperature is not None else None
     
     # Determine appropriate cycle time based on sensor type
     cycle_time = DRYER_CYCLE if sensor_type == 'dryer' else WASHER_CYCLE
     
+    # For both machines, how long since the last vibration reading
+    time_since_last = (now - latest).total_seconds() / 60
+    
     # Handle dryer and washer differently
     if sensor_type == 'dryer':
-        # For dryers, we care about the time since the last reading
-        time_since_last = (now - times[0]).total_seconds() / 60
-        
         # If we haven't received data for DRYER_INACTIVE_TIMEOUT minutes, consider it free
         if time_since_last > DRYER_INACTIVE_TIMEOUT:
             free_minutes = int(time_since_last)
             return {
                 'sensor_type': sensor_type,
                 'status': 'free', 
-                'free_since': times[0].strftime('%Y-%m-%d %H:%M:%S'), 
+                'free_since': latest.strftime('%Y-%m-%d %H:%M:%S'), 
                 'message': f'The {sensor_type} has been free for the last {free_minutes} minutes', 
-                'voltage': float(latest_voltage) if latest_voltage is not None else None,
-                'temperature': float(latest_temperature) if latest_temperature is not None else None
+                'voltage': voltage,
+                'temperature': temperature
             }
         
-        # Dryer logic - find when the current cycle started based on vibration
-        cycle_start = times[0]
-        for i in range(1, len(times)):
-            current = times[i - 1]
-            previous = times[i]
-            gap = (current - previous).total_seconds() / 60
-            if gap > MID_CYCLE_GAP_TOLERANCE:
-                cycle_start = current
-                break
-        
         # No adjustment needed for dryer (starts vibrating immediately)
         time_since_start = (now - cycle_start).total_seconds() / 60
         
@@ -120,35 +276,14 @@ def get_sensor_status(sensor_type="washer"):
                 'start_time': cycle_start.strftime('%Y-%m-%d %H:%M:%S'), 
                 'minutes_remaining': minutes_remaining, 
                 'message': f'The {sensor_type} is busy from {cycle_start.strftime("%I:%M %p")} for the last {minutes_running} minutes. Free in ~{minutes_remaining} minutes', 
-                'voltage': float(latest_voltage) if latest_voltage is not None else None,
-                'temperature': float(latest_temperature) if latest_temperature is not None else None
+                'voltage': voltage,
+                'temperature': temperature
             }
-        
-        # Otherwise, dryer is free
-        free_minutes = int(time_since_last)
-        return {
-            'sensor_type': sensor_type,
-            'status': 'free', 
-            'free_since': times[0].strftime('%Y-%m-%d %H:%M:%S'), 
-            'message': f'The {sensor_type} has been free for the last {free_minutes} minutes', 
-            'voltage': float(latest_voltage) if latest_voltage is not None else None,
-            'temperature': float(latest_temperature) if latest_temperature is not None else None
-        }
     
     else:
         # Original washer logic
-        cycle_start = times[0]
-        for i in range(1, len(times)):
-            current = times[i - 1]
-            previous = times[i]
-            gap = (current - previous).total_seconds() / 60
-            if gap > MID_CYCLE_GAP_TOLERANCE:
-                cycle_start = current
-                break
-
         adjusted_start = cycle_start - timedelta(minutes=FILL_ADJUSTMENT)
         time_since_start = (now - adjusted_start).total_seconds() / 60
-        time_since_last = (now - times[0]).total_seconds() / 60
 
         if time_since_start <= cycle_time and time_since_last <= MID_CYCLE_GAP_TOLERANCE:
             minutes_running = int(time_since_start)
@@ -159,68 +294,159 @@ def get_sensor_status(sensor_type="washer"):
                 'start_time': adjusted_start.strftime('%Y-%m-%d %H:%M:%S'), 
                 'minutes_remaining': minutes_remaining, 
                 'message': f'The {sensor_type} is busy from {adjusted_start.strftime("%I:%M %p")} for the last {minutes_running} minutes. Free in ~{minutes_remaining} minutes', 
-                'voltage': float(latest_voltage) if latest_voltage is not None else None,
-                'temperature': float(latest_temperature) if latest_temperature is not None else None
+                'voltage': voltage,
+                'temperature': temperature
             }
 
-        free_minutes = int(time_since_last)
-        return {
-            'sensor_type': sensor_type,
-            'status': 'free', 
-            'free_since': times[0].strftime('%Y-%m-%d %H:%M:%S'), 
-            'message': f'The {sensor_type} has been free for the last {free_minutes} minutes', 
-            'voltage': float(latest_voltage) if latest_voltage is not None else None,
-            'temperature': float(latest_temperature) if latest_temperature is not None else None
-        }
+    # Otherwise, the machine is free
+    free_minutes = int(time_since_last)
+    return {
+        'sensor_type': sensor_type,
+        'status': 'free', 
+        'free_since': latest.strftime('%Y-%m-%d %H:%M:%S'), 
+        'message': f'The {sensor_type} has been free for the last {free_minutes} minutes', 
+        'voltage': voltage,
+        'temperature': temperature
+    }
 
-def get_all_sensors_status():
-    """Get status for all known sensor types."""
+def _next_minute_boundary(anchor, now):
+    """First moment from now on at which the whole minutes elapsed since anchor change.
     
-    # Get all active sensor types
-    sensors = Sensor.query.filter_by(status='active').all()
+    Exactly on a boundary that is now itself: the inclusive comparisons in
+    status_from_inputs flip right after it.
+    """
+    elapsed = (now - anchor).total_seconds()
+    return anchor + timedelta(minutes=math.ceil(elapsed / 60))
+
+def status_expires_at(inputs, now):
+    """Return when a status computed by compute_sensor_status at now stops being accurate.
     
-    # If no registered sensors, fall back to just washer
-    if not sensors:
-        return {'washer': get_sensor_status('washer')}
+    Every value in a status (minute counters, busy/free decision) changes on
+    a whole minute since the latest reading or since the cycle start, or
+    when the latest reading becomes older than MID_CYCLE_GAP_TOLERANCE.
+    """
+    if inputs is None:
+        # free_since is "an hour ago", rendered to the second
+        return now.replace(microsecond=0) + timedelta(seconds=1)
     
-    # Get status for each sensor type
-    status_dict = {}
-    for sensor in sensors:
-        sensor_type = sensor.sensor_type
-        if sensor_type not in status_dict:
-            status_dict[sensor_type] = get_sensor_status(sensor_type)
+    latest, cycle_start = inputs[0], inputs[1]
+    candidates = [_next_minute_boundary(latest, now), _next_minute_boundary(cycle_start, now)]
+    gap_deadline = latest + timedelta(minutes=MID_CYCLE_GAP_TOLERANCE)
+    if gap_deadline >= now:
+        candidates.append(gap_deadline)
+    return min(candidates)
+
+# Recent readings of every sensor, kept in memory by tailing sensor_data
+recent_readings = RecentReadings(_localize, MID_CYCLE_GAP_TOLERANCE)
+
+# The app's own database and its in-memory state; /api/<location>/ requests
+# switch to that site's shard
+default_shard = shards.Shard(None, None, None, recent_readings, status_cache)
+
+def current_shard():
+    """The Shard of the current request (default_shard outside site routes)."""
+    return (g.get('shard') if has_app_context() else None) or default_shard
+
+def _open_shard(location, url):
+    """Open a site's database with the app's engine settings, migrate it
+    (AUTO_MIGRATE) and give it its own ring buffers and status cache."""
+    url = _psycopg2_url(url)
+    engine = create_engine(url, **app.config["SQLALCHEMY_ENGINE_OPTIONS"])
+    reader = None
+    if SQLITE_PRODUCTION_MODE and url.startswith('sqlite:'):
+        reader = create_engine(url, **app.config["SQLALCHEMY_ENGINE_OPTIONS"])
+        for site_engine in (engine, reader):
+            sqlite_profile.configure_engine(site_engine, read_only=site_engine is reader,
+                                            busy_timeout_ms=SQLITE_BUSY_TIMEOUT_MS,
+                                            mmap_mb=SQLITE_MMAP_MB, cache_mb=SQLITE_CACHE_MB)
+    if AUTO_MIGRATE:
+        applied = migrations.upgrade(engine)
+        if applied:
+            app.logger.info(f"Applied schema migrations to site {location}: {applied}")
+    if METRICS_ENABLED:
+        for site_engine in (engine, reader):
+            if site_engine is not None:
+                instrumentation.instrument_engine(site_engine)
+    return shards.Shard(location, engine, reader,
+                        RecentReadings(_localize, MID_CYCLE_GAP_TOLERANCE), StatusCache())
+
+shard_resolver = shards.ShardResolver(
+    SHARD_DATABASE_URL, _open_shard, SHARD_LOCATIONS, SHARD_MAX_OPEN, SHARD_FAN_OUT_THREADS
+) if SHARD_DATABASE_URL else None
+
+def _verify_statuses(statuses, now):
+    """Compare ring-buffer statuses with the SQL window logic and log differences."""
+    readings_by_type = {sensor_type: [] for sensor_type in statuses}
+    for sensor_name, _, vib_date, voltage, temp in db.session.execute(
+            queries.latest_readings_batch(list(statuses), dialect_name=db.session.get_bind().dialect.name)):
+        readings_by_type[sensor_name].append((vib_date, voltage, temp))
     
-    return status_dict
+    for sensor_type, readings in readings_by_type.items():
+        expected = compute_sensor_status(sensor_type, readings, now)
+        if expected != statuses[sensor_type]:
+            app.logger.warning(f"Ring buffer status mismatch for {sensor_type}: "
+                               f"{statuses[sensor_type]} != {expected}")
 
-def get_popular_times(sensor_type="washer", specified_day=None):
-    """Get popular times data for a specific sensor type.
+def statuses_from_inputs(inputs_by_type, now):
+    """Compute {sensor_type: (status, expires_at)} from status inputs."""
+    return {
+        sensor_type: (status_from_inputs(sensor_type, inputs, now),
+                      status_expires_at(inputs, now))
+        for sensor_type, inputs in inputs_by_type.items()
+    }
+
+def _compute_statuses(sensor_types):
+    """Compute {sensor_type: (status, expires_at)} from the in-memory ring buffers."""
+    inputs_by_type = current_shard().recent_readings.status_inputs(sensor_types)
     
-    Args:
-        sensor_type: The type of sensor to get data for (default: "washer")
-        specified_day: Optional day number (0-6 for Sun-Sat) to get data for
-                      If None, uses the current day
-    """
     now = datetime.now(TIMEZONE)
-    current_day = now.weekday()  # 0 = Monday, 6 = Sunday in Python
-    
-    # Convert to 0 = Sunday, 6 = Saturday for UI consistency
-    current_day = (current_day + 1) % 7
+    computed = statuses_from_inputs(inputs_by_type, now)
+    if RING_BUFFER_VERIFY:
+        _verify_statuses({sensor_type: status for sensor_type, (status, _) in computed.items()}, now)
+    return computed
+
+def _load_active_sensor_types():
+    """Active sensor types, first occurrence of each in registration order."""
+    return list(dict.fromkeys(db.session.execute(queries.active_sensor_types()).scalars()))
+
+def get_status_snapshots(sensor_types=None):
+    """Get cached status snapshots for the given (default: all active) sensor types."""
+    shard = current_shard()
+    if sensor_types is None:
+        # If no registered sensors, fall back to just washer
+        sensor_types = shard.status_cache.sensor_types(_load_active_sensor_types) or ['washer']
     
-    # If specified_day is provided, use that instead
-    day_index = specified_day if specified_day is not None else current_day
+    with instrumentation.phase('status'):
+        shard.status_cache.invalidate(shard.recent_readings.sync())
+        return shard.status_cache.get_many(sensor_types, _compute_statuses, datetime.now(TIMEZONE))
+
+def get_sensor_status(sensor_type="washer"):
+    """Get the current status of a specific sensor type."""
+    return get_status_snapshots([sensor_type])[sensor_type].status
+
+def get_all_sensors_status():
+    """Get status for all known sensor types."""
+    return {sensor_type: snapshot.status
+            for sensor_type, snapshot in get_status_snapshots().items()}
+
+# Hours shown in the popular times chart (7am to 10pm)
+POPULAR_TIMES_HOURS = range(7, 22)
+
+def popular_times_histogram(sensor_type, day_index, usage=None):
+    """The part of the popular times data that only changes with new usage.
     
+    Args:
+        sensor_type: The type of sensor to get data for
+        day_index: Day number (0-6 for Sun-Sat)
+        usage: Optional precomputed result of rollup.usage_by_hour(sensor_type)
+               covering at least the requested day
+    """
     # Get the day name
     days = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
     day_name = days[day_index]
     
-    # Check if requested day is the current day
-    is_current_day = day_index == current_day
-    
-    # Get current hour (0-23)
-    current_hour = now.hour
-    
     # Hours to display (7am to 10pm)
-    display_hours = range(7, 22)
+    display_hours = POPULAR_TIMES_HOURS
     
     # Convert to 12-hour format for display
     hour_labels = []
@@ -240,81 +466,22 @@ def get_popular_times(sensor_type="washer", specified_day=None):
         
         hour_ranges.append(f'{display_hr}–{next_display_hr}{ampm}')
     
-    # Find the index of the current hour in our display range, if applicable
-    current_hour_index = -1
-    if is_current_day:
-        for i, hr in enumerate(display_hours):
-            if hr == current_hour:
-                current_hour_index = i
-                break
-    
-    # Get the status to determine if it's operating now
-    status = get_sensor_status(sensor_type)
-    is_operating = status['status'] == 'busy'
-    current_time = now.strftime('%I:%M %p')
-    
-    # Determine if it's open based on the time of day
-    # Assume laundry room is open 7am to 10pm
-    is_open = 7 <= now.hour < 22 if is_current_day else False
-    
-    # Get the day of week from the database
-    # Convert from Python's day numbering (0 = Monday) to 
-    # SQLite's strftime %w (0 = Sunday)
-    filter_day = day_index
-    
-    # Query to get distribution of usage by hour for the specified day
-    sql_query = """
-    SELECT 
-        strftime('%H', vib_date) AS hour,
-        COUNT(DISTINCT DATE(vib_date)) AS num_days,
-        COUNT(*) AS num_readings
-    FROM sensor_data
-    WHERE 
-        sensor_name = :sensor_type
-        AND CAST(strftime('%w', vib_date) AS INTEGER) = :day_of_week
-        AND strftime('%H', vib_date) BETWEEN '07' AND '21'
-    GROUP BY hour
-    ORDER BY hour
-    """
+    # Hourly usage comes from the usage_hourly rollup, never raw sensor_data
+    if usage is None:
+        with instrumentation.phase('popular_times'):
+            usage = rollup.usage_by_hour(sensor_type, day_index)
+    hourly_usage, total_days_by_dow = usage
     
-    # For sqlite
-    db_results = db.session.execute(text(sql_query), {
-        'sensor_type': sensor_type,
-        'day_of_week': filter_day
-    }).fetchall()
-    
-    # Get total days in the dataset for this day of week
-    total_days_query = """
-    SELECT COUNT(DISTINCT DATE(vib_date)) 
-    FROM sensor_data
-    WHERE 
-        sensor_name = :sensor_type
-        AND CAST(strftime('%w', vib_date) AS INTEGER) = :day_of_week
-    """
-    
-    total_days_result = db.session.execute(text(total_days_query), {
-        'sensor_type': sensor_type,
-        'day_of_week': filter_day
-    }).scalar()
-    
-    total_days = total_days_result or 1  # Default to 1 to avoid division by zero
+    total_days = total_days_by_dow.get(day_index) or 1  # Default to 1 to avoid division by zero
     
     # Process data for chart
     hours_data = {str(hr): 0 for hr in display_hours}
     categories = {str(hr): 'Not busy' for hr in display_hours}
     
-    for row in db_results:
-        hour_str = row[0]
-        if hour_str.startswith('0'):
-            hour_str = hour_str[1:]  # Remove leading zero
-        
-        hour = int(hour_str)
-        if hour in display_hours:
-            readings = row[2]
-            days = row[1]
-            
+    for (dow, hour), (day_count, readings) in hourly_usage.items():
+        if dow == day_index and hour in display_hours:
             # Calculate average readings per day for this hour
-            avg_per_day = readings / days if days > 0 else 0
+            avg_per_day = readings / day_count if day_count > 0 else 0
             
             # Calculate percentage of time busy during this hour
             # Assumption: 1 reading per minute while the washer is on
@@ -345,39 +512,239 @@ def get_popular_times(sensor_type="washer", specified_day=None):
         'hour_ranges': hour_ranges,
         'data': data,
         'categories': categories_list,
-        'total_days': total_days,
-        'current_hour_index': current_hour_index,
-        'washer_status': status['status'],
-        'is_open': is_open,
-        'current_time': current_time,
-        'is_current_day': is_current_day
+        'total_days': total_days
     }
 
+def day_index_of(now):
+    """Day number of now with 0 = Sunday, 6 = Saturday for UI consistency."""
+    return (now.weekday() + 1) % 7
+
+def popular_times_with_status(histogram, status, now):
+    """Complete a popular_times_histogram() with the current hour and machine status."""
+    # Check if requested day is the current day
+    is_current_day = histogram['day_index'] == day_index_of(now)
+    
+    # Find the index of the current hour in our display range, if applicable
+    current_hour_index = -1
+    if is_current_day:
+        for i, hr in enumerate(POPULAR_TIMES_HOURS):
+            if hr == now.hour:
+                current_hour_index = i
+                break
+    
+    # Determine if it's open based on the time of day
+    # Assume laundry room is open 7am to 10pm
+    is_open = 7 <= now.hour < 22 if is_current_day else False
+    
+    return dict(
+        histogram,
+        current_hour_index=current_hour_index,
+        washer_status=status['status'],
+        is_open=is_open,
+        current_time=now.strftime('%I:%M %p'),
+        is_current_day=is_current_day
+    )
+
+def get_popular_times(sensor_type="washer", specified_day=None, status=None, usage=None):
+    """Get popular times data for a specific sensor type.
+    
+    Args:
+        sensor_type: The type of sensor to get data for (default: "washer")
+        specified_day: Optional day number (0-6 for Sun-Sat) to get data for
+                      If None, uses the current day
+        status: Optional precomputed result of get_sensor_status(sensor_type)
+        usage: Optional precomputed result of rollup.usage_by_hour(sensor_type)
+               covering at least the requested day
+    """
+    now = datetime.now(TIMEZONE)
+    
+    # If specified_day is provided, use that instead
+    day_index = specified_day if specified_day is not None else day_index_of(now)
+    
+    # Get the status to determine if it's operating now
+    if status is None:
+        status = get_sensor_status(sensor_type)
+    
+    return popular_times_with_status(popular_times_histogram(sensor_type, day_index, usage), status, now)
+
+def popular_times_by_day(sensor_type):
+    """popular_times_histogram() of all seven days from one rollup query."""
+    usage = rollup.usage_by_hour(sensor_type)
+    return {day: popular_times_histogram(sensor_type, day, usage) for day in range(7)}
+
+def read_dashboard(sensor_type, days, all_statuses=False):
+    """Statuses and popular times, from the precomputed store when fresh enough.
+    
+    Args:
+        sensor_type: Sensor whose popular times are wanted
+        days: Day numbers (0-6 for Sun-Sat) to return popular times for
+        all_statuses: Return the status of every sensor, not just sensor_type
+    
+    Returns:
+        (statuses, {day: popular_times}); every popular times dict also
+        carries data_age_seconds (age of the oldest input) and
+        max_age_seconds (the bound beyond which it would be recomputed).
+    """
+    now = datetime.now(TIMEZONE)
+    stored = {}
+    # The scheduler fills the app's own database only; sites compute on request
+    if PRECOMPUTE_ENABLED and current_shard() is default_shard:
+        keys = [precompute.STATUS_KEY] + [precompute.popular_times_key(sensor_type, day) for day in days]
+        stored = precompute.read_snapshots(keys)
+    
+    statuses, status_age = stored.get(precompute.STATUS_KEY, (None, None))
+    if statuses is None or status_age > STATUS_MAX_AGE or sensor_type not in statuses:
+        if all_statuses:
+            statuses = get_all_sensors_status()
+            statuses.setdefault(sensor_type, get_sensor_status(sensor_type))
+        else:
+            statuses = {sensor_type: get_sensor_status(sensor_type)}
+        status_age = 0.0
+    
+    usage = None
+    popular_times = {}
+    for day in days:
+        histogram, age = stored.get(precompute.popular_times_key(sensor_type, day), (None, None))
+        if histogram is None or age > POPULAR_TIMES_MAX_AGE:
+            if usage is None:
+                with instrumentation.phase('popular_times'):
+                    usage = rollup.usage_by_hour(sensor_type, day if len(days) == 1 else None)
+            histogram, age = popular_times_histogram(sensor_type, day, usage), 0.0
+        day_data = popular_times_with_status(histogram, statuses[sensor_type], now)
+        day_data['data_age_seconds'] = max(age, status_age)
+        day_data['max_age_seconds'] = POPULAR_TIMES_MAX_AGE
+        popular_times[day] = day_data
+    return statuses, popular_times
+
+# One leader-elected worker keeps the precomputed store fresh and runs retention
+precompute_scheduler = precompute.PrecomputeScheduler(
+    app, get_all_sensors_status, popular_times_by_day, REFRESH_INTERVAL, POPULAR_TIMES_REFRESH_SECONDS,
+    snapshots=PRECOMPUTE_ENABLED
+)
+
+if CYCLES_UPDATE_SECONDS:
+    precompute_scheduler.add_job(
+        'cycles',
+        lambda: cycles.update(TIMEZONE, MID_CYCLE_GAP_TOLERANCE, CYCLES_CATCH_UP_ROWS,
+                              keep_going=precompute_scheduler.renew_lease),
+        CYCLES_UPDATE_SECONDS, renews_lease=True
+    )
+
+if RETENTION_DAYS:
+    precompute_scheduler.add_job(
+        'retention',
+        lambda: retention.run(TIMEZONE, MID_CYCLE_GAP_TOLERANCE, RETENTION_DAYS, RETENTION_ROWS_PER_RUN,
+                              keep_going=precompute_scheduler.renew_lease),
+        RETENTION_INTERVAL_SECONDS, renews_lease=True
+    )
+
+def maintain_partitions():
+    """Create the coming monthly partitions of sensor_data and drop the
+    ones retention emptied; returns (created, dropped) table names."""
+    detach_before = retention.cutoff_for(TIMEZONE, RETENTION_DAYS).date() if RETENTION_DAYS else None
+    with db.engine.begin() as conn:
+        return partitions.maintain(conn, datetime.now(TIMEZONE).date(), detach_before)
+
+if using_postgres:
+    precompute_scheduler.add_job('partitions', maintain_partitions, PARTITION_MAINTENANCE_SECONDS)
+
+@app.before_request
+def start_precompute_scheduler():
+    """Start the scheduler thread lazily, so CLI commands never run it."""
+    if PRECOMPUTE_ENABLED or CYCLES_UPDATE_SECONDS or RETENTION_DAYS or using_postgres:
+        precompute_scheduler.start()
+
+# Warm the ring buffers so the first dashboard request needs no window queries
+with app.app_context():
+    try:
+        recent_readings.sync()
+        recent_readings.status_inputs(status_cache.sensor_types(_load_active_sensor_types))
+    except OperationalError as e:
+        app.logger.error(f"Warming recent readings failed: {e}")
+
+# One shared producer per worker feeds every /api/status/stream client
+status_broadcaster = StatusBroadcaster(app, get_all_sensors_status, REFRESH_INTERVAL, SSE_MAX_SUBSCRIBERS)
+
 @app.route('/')
 def index():
     """Render the main page with all sensor statuses."""
-    sensor_statuses = get_all_sensors_status()
-    popular_times = get_popular_times()
+    current_day = day_index_of(datetime.now(TIMEZONE))
+    sensor_statuses, popular_times = read_dashboard('washer', [current_day], all_statuses=True)
+    popular_times = popular_times[current_day]
     
     #app.logger.debug(f"Popular Times for washer: {popular_times}")
     
-    return render_template('index.html', 
-                           sensors=sensor_statuses, 
-                           popular_times=popular_times, 
-                           version="1.1.2")
+    with instrumentation.phase('render'):
+        return render_template('index.html', 
+                               sensors=sensor_statuses, 
+                               popular_times=popular_times, 
+                               version="1.1.2")
+
+def conditional_status_response(snapshots, payload, environ):
+    """JSON response with ETag/Last-Modified; unchanged polls get a bodiless 304.
+    
+    environ only needs the conditional request headers (asgi.py passes
+    just those).
+    """
+    response = app.json.response(payload)
+    response.set_etag(payload_etag(payload))
+    response.last_modified = max(snapshot.computed_at for snapshot in snapshots.values())
+    response.cache_control.no_cache = True  # always revalidate, never serve stale
+    return response.make_conditional(environ)
+
+@app.url_value_preprocessor
+def select_site(endpoint, values):
+    """Serve /api/<location>/... from that site's database (404 for unknown sites)."""
+    if values and 'location' in values:
+        location = values.pop('location')
+        if shard_resolver is None:
+            abort(404)
+        try:
+            shards.use_shard(shard_resolver.get(location))
+        except shards.UnknownLocation:
+            abort(404)
 
 @app.route('/api/status')
+@app.route('/api/<location>/status')
 def status_endpoint():
-    """API endpoint to get current status of all sensors."""
-    return jsonify(get_all_sensors_status())
+    """API endpoint to get current status of all sensors (of one site under /api/<location>/)."""
+    snapshots = get_status_snapshots()
+    payload = {sensor_type: snapshot.status for sensor_type, snapshot in snapshots.items()}
+    return conditional_status_response(snapshots, payload, request.environ)
 
 @app.route('/api/status/<sensor_type>')
+@app.route('/api/<location>/status/<sensor_type>')
 def sensor_status_endpoint(sensor_type):
     """API endpoint to get status for a specific sensor type."""
-    return jsonify(get_sensor_status(sensor_type))
+    snapshots = get_status_snapshots([sensor_type])
+    return conditional_status_response(snapshots, snapshots[sensor_type].status, request.environ)
+
+@app.route('/api/status/stream')
+def status_stream_endpoint():
+    """Server-Sent Events stream of status changes for all sensors."""
+    subscriber = status_broadcaster.subscribe()
+    if subscriber is None:
+        response = jsonify({'error': 'Too many open status streams, poll /api/status'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(SSE_MAX_STREAM_SECONDS)
+        return response
+    response = Response(status_broadcaster.stream(subscriber, SSE_MAX_STREAM_SECONDS),
+                        mimetype='text/event-stream')
+    # also when the client is gone before the stream started
+    response.call_on_close(lambda: status_broadcaster.unsubscribe(subscriber))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # don't let a proxy buffer events
+    return response
+
+@app.route('/api/status-cache')
+def status_cache_endpoint():
+    """API endpoint exposing status cache hit/miss counters."""
+    return jsonify(status_cache.stats())
 
 @app.route('/api/popular-times')
 @app.route('/api/popular-times/<int:day>')
+@app.route('/api/<location>/popular-times')
+@app.route('/api/<location>/popular-times/<int:day>')
 def popular_times_endpoint(day=None):
     """API endpoint to get popular times data for the washer.
     
@@ -385,36 +752,201 @@ def popular_times_endpoint(day=None):
         day: Optional day number (0-6 for Sun-Sat). Default is current day.
     """
     sensor_type = request.args.get('sensor', 'washer')
-    return jsonify(get_popular_times(sensor_type, day))
+    if day is None:
+        day = day_index_of(datetime.now(TIMEZONE))
+    _, popular_times = read_dashboard(sensor_type, [day])
+    return jsonify(popular_times[day])
 
 @app.route('/api/popular-times/week')
+@app.route('/api/<location>/popular-times/week')
 def popular_times_week_endpoint():
     """API endpoint to get popular times data for the entire week."""
     sensor_type = request.args.get('sensor', 'washer')
     
-    # Get data for each day of the week
-    week_data = {}
-    for day in range(7):
-        day_data = get_popular_times(sensor_type, day)
-        week_data[day] = day_data
+    # One store read (or one status computation and one rollup query)
+    # shared by all seven days
+    _, week_data = read_dashboard(sensor_type, list(range(7)))
     
     return jsonify(week_data)
 
+@app.route('/api/precompute')
+def precompute_endpoint():
+    """API endpoint exposing the precompute scheduler state of this worker."""
+    return jsonify(precompute_scheduler.stats())
+
+# Readings posted to /api/ingest are written in bulk by one thread per worker
+ingest_buffer = ingest.WriteBehindBuffer(app, TIMEZONE)
+
+@app.route('/api/ingest', methods=['POST'])
+def ingest_endpoint():
+    """Accept one reading, a JSON array of readings or NDJSON from the gateways.
+    
+    Valid readings are queued for a bulk write and the response is sent
+    before they reach the database (202). Invalid ones are reported by
+    index. A full buffer answers 503 with Retry-After.
+    """
+    if INGEST_TOKEN and request.headers.get('X-Ingest-Token') != INGEST_TOKEN:
+        return jsonify({'error': 'Invalid ingest token'}), 401
+    
+    try:
+        readings, rejected = ingest.parse_payload(request.get_data(), request.content_type, TIMEZONE)
+    except ingest.ValidationError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if not readings:
+        return jsonify({'accepted': 0, 'rejected': rejected}), 400
+    
+    if not ingest_buffer.enqueue(readings):
+        response = jsonify({'error': 'Ingest buffer is full, retry later', 'accepted': 0})
+        response.status_code = 503
+        response.headers['Retry-After'] = '1'
+        return response
+    
+    return jsonify({'accepted': len(readings), 'rejected': rejected}), 202
+
+@app.route('/api/ingest/stats')
+def ingest_stats_endpoint():
+    """API endpoint exposing write-behind buffer counters."""
+    return jsonify(ingest_buffer.stats())
+
+def _parse_date_arg(name):
+    """Parse an optional ISO date/datetime query argument (site-local time)."""
+    value = request.args.get(name)
+    if not value:
+        return None
+    return datetime.fromisoformat(value).replace(tzinfo=None)
+
+@app.route('/api/cycles')
+def cycles_endpoint():
+    """API endpoint listing the historical cycles of a sensor.
+    
+    Query args: sensor (default washer), start and end (ISO dates, cycles
+    starting in [start, end)), min_readings (default 1) and limit
+    (default 1000). Read-only: the scheduler's cycles job keeps the stored
+    cycles current.
+    """
+    sensor_type = request.args.get('sensor', 'washer')
+    try:
+        start = _parse_date_arg('start')
+        end = _parse_date_arg('end')
+        min_readings = int(request.args.get('min_readings', 1))
+        limit = min(int(request.args.get('limit', 1000)), 10000)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid argument: {e}'}), 400
+    
+    found = [cycle for cycle in cycles.find_cycles(sensor_type, start, end, limit)
+             if cycle.reading_count >= min_readings]
+    busy_minutes = sum(cycle.duration_minutes for cycle in found)
+    utilization = None
+    if start is not None and end is not None and end > start:
+        utilization = round(busy_minutes / ((end - start).total_seconds() / 60), 4)
+    
+    return jsonify({
+        'sensor_type': sensor_type,
+        'start': start.strftime('%Y-%m-%d %H:%M:%S') if start else None,
+        'end': end.strftime('%Y-%m-%d %H:%M:%S') if end else None,
+        'cycles': [{
+            'start_time': cycle.start_time.strftime('%Y-%m-%d %H:%M:%S'),
+            'end_time': cycle.end_time.strftime('%Y-%m-%d %H:%M:%S'),
+            'duration_minutes': cycle.duration_minutes,
+            'reading_count': cycle.reading_count
+        } for cycle in found],
+        'summary': {
+            'count': len(found),
+            'busy_minutes': round(busy_minutes, 2),
+            'average_duration_minutes': round(busy_minutes / len(found), 2) if found else None,
+            'utilization': utilization
+        }
+    })
+
+def _bool_arg(name):
+    return request.args.get(name, 'false').lower() in ('true', '1', 'yes')
+
+@app.route('/api/export')
+def export_endpoint():
+    """Stream the raw readings of a sensor as CSV or NDJSON.
+    
+    Query args: sensor (required), start and end (ISO dates, readings in
+    [start, end)), format (csv or ndjson, default csv), gzip (true/false)
+    and after_id. Rows come in (vib_date, id) order; to resume a broken
+    download, pass the id of the last row received as after_id.
+    """
+    sensor_type = request.args.get('sensor')
+    if not sensor_type:
+        return jsonify({'error': 'sensor is required'}), 400
+    export_format = request.args.get('format', 'csv')
+    compress = _bool_arg('gzip')
+    try:
+        start = _parse_date_arg('start')
+        end = _parse_date_arg('end')
+        after_id = int(request.args['after_id']) if request.args.get('after_id') else None
+        rows = export.iter_rows(sensor_type, start, end, after_id)
+        body = export.stream(rows, export_format, TIMEZONE, compress, header=after_id is None)
+    except ValueError as e:  # includes export.ExportError
+        return jsonify({'error': f'Invalid argument: {e}'}), 400
+    
+    if compress:
+        mimetype = 'application/gzip'
+    else:
+        mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = \
+        f'attachment; filename="{export.filename(sensor_type, start, end, export_format, compress)}"'
+    return response
+
+# Sortable columns of the admin sensor list (query arg -> column)
+ADMIN_SORT_COLUMNS = {
+    'created': Sensor.created_at,
+    'mac': Sensor.mac_address,
+    'type': Sensor.sensor_type,
+    'name': Sensor.name,
+    'location': Sensor.location,
+    'last_seen': Sensor.last_seen,
+    'battery': Sensor.battery,
+    'status': Sensor.status,
+    'readings': SensorStats.reading_count,
+    'last_reading': SensorStats.last_reading,
+}
+ADMIN_PAGE_SIZE = 50
+
 @app.route('/admin')
 def admin_page():
-    """Admin page for sensor management."""
-    # Query for sensors with a count of their data
-    sensors = db.session.query(
-        Sensor, 
-        func.count(SensorData.id).label('data_count')
-    ).outerjoin(
-        SensorData, 
-        Sensor.sensor_type == SensorData.sensor_name
-    ).group_by(
-        Sensor.id
-    ).order_by(
-        Sensor.created_at.desc()
-    ).all()
+    """Admin page for sensor management.
+    
+    Query args: type, location (substring), status, sort (see
+    ADMIN_SORT_COLUMNS), order (asc/desc), page and per_page.
+    """
+    filters = {
+        'type': request.args.get('type', ''),
+        'location': request.args.get('location', ''),
+        'status': request.args.get('status', ''),
+    }
+    sort = request.args.get('sort', 'created')
+    if sort not in ADMIN_SORT_COLUMNS:
+        sort = 'created'
+    order = 'asc' if request.args.get('order') == 'asc' else 'desc'
+    
+    # Reading counts come from the trigger-maintained sensor_stats table
+    with instrumentation.phase('sensor_counts'):
+        query = db.session.query(Sensor, SensorStats).outerjoin(
+            SensorStats,
+            Sensor.sensor_type == SensorStats.sensor_name
+        )
+        if filters['type']:
+            query = query.filter(Sensor.sensor_type == filters['type'])
+        if filters['location']:
+            query = query.filter(Sensor.location.ilike(f"%{filters['location']}%"))
+        if filters['status']:
+            query = query.filter(Sensor.status == filters['status'])
+        
+        sort_column = ADMIN_SORT_COLUMNS[sort]
+        query = query.order_by(sort_column.asc() if order == 'asc' else sort_column.desc(), Sensor.id)
+        pagination = query.paginate(
+            page=request.args.get('page', 1, type=int),
+            per_page=request.args.get('per_page', ADMIN_PAGE_SIZE, type=int),
+            max_per_page=500,
+            error_out=False
+        )
     
     # Get list of unique sensor types for dropdown
     sensor_types = db.session.query(Sensor.sensor_type).distinct().all()
@@ -422,7 +954,7 @@ def admin_page():
     
     # Prepare sensor data for template
     sensor_data = []
-    for sensor, data_count in sensors:
+    for sensor, stats in pagination.items:
         sensor_data.append({
             'id': sensor.id,
             'mac_address': sensor.mac_address,
@@ -434,13 +966,22 @@ def admin_page():
             'last_time_sync': sensor.last_time_sync,
             'battery': sensor.battery,
             'status': sensor.status,
-            'data_count': data_count
+            'data_count': stats.reading_count if stats else 0,
+            'first_reading': stats.first_reading if stats else None,
+            'last_reading': stats.last_reading if stats else None,
+            'last_voltage': stats.last_voltage if stats else None
         })
     
-    return render_template('admin.html', 
-                          sensors=sensor_data, 
-                          sensor_types=sensor_types,
-                          version="1.1.2")
+    with instrumentation.phase('render'):
+        return render_template('admin.html', 
+                              sensors=sensor_data, 
+                              sensor_types=sensor_types,
+                              pagination=pagination,
+                              filters=filters,
+                              filter_args={key: value for key, value in filters.items() if value},
+                              sort=sort,
+                              order=order,
+                              version="1.1.2")
 
 @app.route('/admin/update-sensor/<int:sensor_id>', methods=['POST'])
 def update_sensor(sensor_id):
@@ -454,6 +995,7 @@ def update_sensor(sensor_id):
         sensor.status = request.form.get('status')
         
         db.session.commit()
+        status_cache.clear()
         flash('Sensor updated successfully', 'success')
     
     return redirect(url_for('admin_page'))
@@ -484,6 +1026,7 @@ def add_sensor_type():
         
         db.session.add(new_sensor)
         db.session.commit()
+        status_cache.clear()
         flash('New sensor added successfully', 'success')
     
     return redirect(url_for('admin_page'))
@@ -501,9 +1044,225 @@ def delete_sensor(sensor_id):
     # Delete the sensor
     db.session.delete(sensor)
     db.session.commit()
+    status_cache.clear()
     flash('Sensor deleted successfully', 'success')
     
     return redirect(url_for('admin_page'))
 
+def site_summary():
+    """Statuses and reading totals of the current site (runs per site in sites_overview)."""
+    statuses = get_all_sensors_status()
+    sensors, readings, last_reading = db.session.query(
+        func.count(SensorStats.sensor_name), func.sum(SensorStats.reading_count), func.max(SensorStats.last_reading)
+    ).one()
+    return {
+        'statuses': {sensor_type: status['status'] for sensor_type, status in statuses.items()},
+        'busy': sum(1 for status in statuses.values() if status['status'] == 'busy'),
+        'sensors_with_readings': sensors,
+        'readings': readings or 0,
+        'last_reading': last_reading.strftime('%Y-%m-%d %H:%M:%S') if last_reading else None,
+    }
+
+def sites_overview():
+    """site_summary() of every site, queried in parallel; a site that
+    fails gets an error message instead."""
+    if shard_resolver is None:
+        return []
+    with instrumentation.phase('sites'):
+        results = shard_resolver.fan_out(app, shard_resolver.locations(), site_summary)
+    sites = []
+    for location, (summary, error) in results.items():
+        site = {'location': location, 'error': None if error is None else str(error)}
+        site.update(summary or {})
+        sites.append(site)
+    return sites
+
+@app.route('/api/sites')
+def sites_endpoint():
+    """API endpoint with the status summary of every site."""
+    return jsonify(sites_overview())
+
+@app.route('/admin/sites')
+def admin_sites_page():
+    """Admin page with the status summary of every site."""
+    sites = sites_overview()
+    with instrumentation.phase('render'):
+        return render_template('sites.html', sites=sites, sharding=shard_resolver is not None, version="1.1.2")
+
+@app.cli.command('db-upgrade')
+def db_upgrade_command():
+    """Apply pending schema migrations."""
+    applied = migrations.upgrade()
+    click.echo(f"Applied migrations: {applied}" if applied else "Schema is up to date")
+    click.echo(f"Schema version: {migrations.current_version()}")
+
+@app.cli.command('site-upgrade')
+@click.argument('locations', nargs=-1)
+def site_upgrade_command(locations):
+    """Apply pending schema migrations to site databases (default: every site).
+    
+    Also creates the database file of a new SQLite site.
+    """
+    if shard_resolver is None:
+        raise click.UsageError('SHARD_DATABASE_URL is not set')
+    for location in locations or shard_resolver.locations():
+        if not shards.LOCATION_PATTERN.fullmatch(location):
+            raise click.BadParameter(f'invalid site name: {location}')
+        engine = create_engine(_psycopg2_url(shard_resolver.url(location)))
+        try:
+            applied = migrations.upgrade(engine)
+            click.echo(f"{location}: applied migrations {applied}" if applied else f"{location}: up to date")
+        finally:
+            engine.dispose()
+
+@app.cli.command('rebuild-usage-rollup')
+@click.option('--sensor', 'sensor_type', default=None, help='Only rebuild this sensor name.')
+def rebuild_usage_rollup_command(sensor_type):
+    """Backfill the usage_hourly rollup from raw sensor_data."""
+    with db.engine.begin() as conn:
+        rows = rollup.rebuild(conn, sensor_type)
+    click.echo(f"usage_hourly rebuilt: {rows} rows")
+
+@app.cli.command('reconcile-sensor-stats')
+@click.option('--sensor', 'sensor_type', default=None, help='Only reconcile this sensor name.')
+def reconcile_sensor_stats_command(sensor_type):
+    """Recompute the per-sensor reading counters from sensor_data."""
+    with db.engine.begin() as conn:
+        drift = sensor_stats.reconcile(conn, sensor_type)
+    for sensor_name, (old, new) in sorted(drift.items()):
+        old_count = old[0] if old else 0
+        new_count = new[0] if new else 0
+        click.echo(f"  {sensor_name}: {old_count} -> {new_count} readings")
+    click.echo(f"sensor_stats reconciled: {len(drift)} sensors changed")
+
+@app.cli.command('update-cycles')
+@click.option('--rebuild', is_flag=True, help='Drop all cycles and extract them from scratch.')
+def update_cycles_command(rebuild):
+    """Extract historical machine cycles from new readings."""
+    if rebuild:
+        processed, inserted = cycles.rebuild(TIMEZONE, MID_CYCLE_GAP_TOLERANCE)
+    else:
+        processed, inserted = cycles.update(TIMEZONE, MID_CYCLE_GAP_TOLERANCE)
+    click.echo(f"Processed {processed} readings, {inserted} new cycles")
+
+@app.cli.command('apply-retention')
+@click.option('--days', type=int, default=None, help='Archive readings older than this (default: RETENTION_DAYS).')
+@click.option('--max-rows', type=int, default=None, help='Stop after archiving this many readings.')
+def apply_retention_command(days, max_rows):
+    """Fold old raw readings into sensor_data_archive and delete them."""
+    days = days or RETENTION_DAYS
+    if not days:
+        raise click.UsageError('Give --days or set RETENTION_DAYS')
+    before = synthetic.count_readings()
+    archived, cutoff = retention.run(TIMEZONE, MID_CYCLE_GAP_TOLERANCE, days, max_rows)
+    click.echo(f"Archived {archived} of {before} readings from before {cutoff:%Y-%m-%d %H:%M}")
+
+@app.cli.command('maintain-partitions')
+def maintain_partitions_command():
+    """Create upcoming sensor_data partitions and drop emptied old ones (PostgreSQL)."""
+    with db.engine.connect() as conn:
+        if not partitions.is_partitioned(conn):
+            raise click.UsageError('sensor_data is not partitioned (PostgreSQL only, migration 9)')
+    created, dropped = maintain_partitions()
+    click.echo(f"Created {len(created)} partitions {created}, dropped {len(dropped)} {dropped}")
+
+@app.cli.command('export')
+@click.option('--sensor', 'sensor_type', required=True, help='Sensor name to export.')
+@click.option('--start', default=None, help='First day or time (ISO, site time).')
+@click.option('--end', default=None, help='Export readings before this day or time.')
+@click.option('--format', 'export_format', type=click.Choice(export.FORMATS), default='csv', show_default=True)
+@click.option('--gzip', 'compress', is_flag=True, help='Compress the output with gzip.')
+@click.option('--after-id', type=int, default=None, help='Resume after this reading id (no CSV header).')
+@click.option('--output', type=click.Path(dir_okay=False, writable=True), default='-',
+              help='File to write (default stdout); appended to when resuming.')
+def export_command(sensor_type, start, end, export_format, compress, after_id, output):
+    """Stream raw readings of a sensor to a CSV or NDJSON file."""
+    start_time = datetime.fromisoformat(start) if start else None
+    end_time = datetime.fromisoformat(end) if end else None
+    try:
+        rows = export.iter_rows(sensor_type, start_time, end_time, after_id)
+    except export.ExportError as e:
+        raise click.UsageError(str(e))
+    with click.open_file(output, 'ab' if after_id is not None else 'wb') as f:
+        for chunk in export.stream(rows, export_format, TIMEZONE, compress, header=after_id is None):
+            f.write(chunk)
+
+@app.cli.command('import-readings')
+@click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=bulk_import.BATCH_SIZE, show_default=True, help='Readings per transaction.')
+@click.option('--defer-indexes', is_flag=True,
+              help='Drop secondary indexes and insert triggers during the load; rebuild them once at the end.')
+@click.option('--restart', is_flag=True, help='Start over instead of resuming an interrupted import.')
+def import_readings_command(paths, batch_size, defer_indexes, restart):
+    """Bulk import historical readings from CSV, NDJSON or JSON files (.gz too)."""
+    def progress(result):
+        done = result['read']
+        if done % 100000 < batch_size:
+            click.echo(f"  {result['path']}: {done} records read, {result['inserted']} inserted")
+
+    started = time.perf_counter()
+    try:
+        results, affected = bulk_import.run(
+            paths, TIMEZONE, MID_CYCLE_GAP_TOLERANCE,
+            batch_size=batch_size, defer_indexes=defer_indexes, restart=restart, progress=progress,
+        )
+    except bulk_import.ImportFileError as e:
+        raise click.ClickException(f"{e}; the readings before it were imported")
+    seconds = time.perf_counter() - started
+    for result in results:
+        if result['skipped']:
+            click.echo(f"{result['path']}: resumed after {result['skipped']} records")
+        rate = result['read'] / result['seconds'] if result['seconds'] else 0
+        click.echo(f"{result['path']}: {result['read']} read, {result['inserted']} inserted, "
+                   f"{result['duplicates']} duplicates, {result['rejected']} rejected "
+                   f"in {result['seconds']:.1f} s ({rate:,.0f} rows/s)")
+    inserted = sum(result['inserted'] for result in results)
+    click.echo(f"Imported {inserted} readings for {len(affected)} sensors in {seconds:.1f} s "
+               f"({inserted / seconds:,.0f} rows/s including aggregate refresh)")
+
+@app.cli.command('generate-data')
+@click.option('--sensors', default=2, show_default=True, help='Number of sensors (alternating washer/dryer).')
+@click.option('--years', type=float, default=None, help='Years of history to generate.')
+@click.option('--rows', type=int, default=None, help='Generate about this many readings instead.')
+@click.option('--end', default=None, help='Last day of history (YYYY-MM-DD, default now).')
+@click.option('--seed', default=0, show_default=True)
+@click.option('--cycles-per-day', default=6, show_default=True, help='Average cycles per machine on weekdays.')
+@click.option('--append', is_flag=True, help='Allow writing into a database that already has readings.')
+def generate_data_command(sensors, years, rows, end, seed, cycles_per_day, append):
+    """Fill the database with synthetic washer/dryer traces (benchmarks, load tests)."""
+    if years is None and rows is None:
+        raise click.UsageError('Give --years or --rows')
+    existing = synthetic.count_readings()
+    if existing and not append:
+        raise click.UsageError(f'sensor_data already has {existing} readings; use --append to add more')
+    
+    end_time = None
+    if end:
+        end_time = TIMEZONE.localize(datetime.fromisoformat(end) + timedelta(days=1) - timedelta(microseconds=1))
+    written, first_day, days = synthetic.populate(
+        TIMEZONE, MID_CYCLE_GAP_TOLERANCE,
+        sensors=sensors,
+        days=math.ceil(years * 365) if years is not None else None,
+        rows=rows,
+        end=end_time,
+        seed=seed,
+        washer_cycle=WASHER_CYCLE,
+        dryer_cycle=DRYER_CYCLE,
+        cycles_per_day=cycles_per_day,
+        progress=lambda n: n % 1000000 < synthetic.INSERT_BATCH_SIZE and click.echo(f"  {n} readings"),
+    )
+    click.echo(f"Generated {written} readings for {sensors} sensors, {days} days from {first_day}")
+
+@app.cli.command('check-query-plans')
+def check_query_plans_command():
+    """Verify that every hot query in main.py is served by an index."""
+    failed = False
+    for name, plan_lines, uses_index in migrations.check_query_plans():
+        click.echo(f"[{'OK' if uses_index else 'FAIL'}] {name}")
+        for line in plan_lines:
+            click.echo(f"    {line}")
+        failed = failed or not uses_index
+    sys.exit(1 if failed else 0)
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
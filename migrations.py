@@ -0,0 +1,203 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# Versioned schema migrations for the Laundry Status Application
+import logging
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from models import (db, SensorData, Sensor, UsageHourly, SensorCycle, JobProgress, SensorStats,
+                    PrecomputedSnapshot, SchedulerLease, SensorDataArchive)
+import partitions
+import queries
+import rollup
+import sensor_stats
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary key for the PostgreSQL advisory lock held while migrating
+MIGRATION_LOCK_KEY = 7241991
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Register a migration step.
+
+    Steps must be idempotent: with several gunicorn workers starting at the
+    same time, two of them may race to apply the same version on SQLite.
+    """
+    def decorator(func):
+        MIGRATIONS.append((version, description, func))
+        return func
+    return decorator
+
+
+@migration(1, 'Create base tables')
+def _create_base_tables(conn):
+    db.metadata.create_all(conn, tables=[SensorData.__table__, Sensor.__table__])
+
+
+@migration(2, 'Composite (sensor_name, vib_date) index on sensor_data')
+def _add_sensor_date_index(conn):
+    conn.execute(text(
+        'CREATE INDEX IF NOT EXISTS ix_sensor_data_sensor_name_vib_date '
+        'ON sensor_data (sensor_name, vib_date)'
+    ))
+
+
+# Version 3 (generated day-of-week and hour columns on sensor_data) was
+# withdrawn before release: popular times read usage_hourly since version 4.
+
+
+@migration(4, 'Hourly usage rollup table maintained by an insert trigger')
+def _add_usage_hourly(conn):
+    db.metadata.create_all(conn, tables=[UsageHourly.__table__])
+    rollup.install_trigger(conn)
+    rollup.rebuild(conn)
+
+
+@migration(5, 'Historical cycle table and incremental job progress')
+def _add_sensor_cycles(conn):
+    db.metadata.create_all(conn, tables=[SensorCycle.__table__, JobProgress.__table__])
+
+
+@migration(6, 'Per-sensor reading counters maintained by an insert trigger')
+def _add_sensor_stats(conn):
+    db.metadata.create_all(conn, tables=[SensorStats.__table__])
+    sensor_stats.install_trigger(conn)
+    sensor_stats.reconcile(conn)
+
+
+@migration(7, 'Shared store for precomputed snapshots and the scheduler lease')
+def _add_precompute_tables(conn):
+    db.metadata.create_all(conn, tables=[PrecomputedSnapshot.__table__, SchedulerLease.__table__])
+
+
+@migration(8, 'Hourly archive of raw readings removed by retention')
+def _add_sensor_data_archive(conn):
+    db.metadata.create_all(conn, tables=[SensorDataArchive.__table__])
+
+
+@migration(9, 'Monthly range partitions and a BRIN index on sensor_data (PostgreSQL)')
+def _partition_sensor_data(conn):
+    # SQLite has no table partitioning; nothing changes there
+    if conn.dialect.name == 'postgresql':
+        partitions.partition_table(conn, datetime.utcnow().date())
+
+
+@migration(10, 'Covering usage_hourly index for popular times (PostgreSQL)')
+def _cover_usage_hourly_index(conn):
+    # PostgreSQL fetched one heap page per (day, hour) row of a sensor;
+    # with day and num_readings in the index it is an index-only scan
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text(
+            'CREATE INDEX IF NOT EXISTS ix_usage_hourly_sensor_dow_hour_covering '
+            'ON usage_hourly (sensor_name, dow, hour) INCLUDE (day, num_readings)'
+        ))
+        conn.execute(text('DROP INDEX IF EXISTS ix_usage_hourly_sensor_dow_hour'))
+
+
+def _ensure_version_table(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description VARCHAR(200) NOT NULL,
+            applied_at TIMESTAMP NOT NULL
+        )
+    """))
+
+
+def current_version(engine=None):
+    """Return the highest applied migration version (0 for a fresh database)."""
+    engine = engine or db.engine
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+        return conn.execute(text('SELECT MAX(version) FROM schema_migrations')).scalar() or 0
+
+
+def upgrade(engine=None):
+    """Apply all pending migrations in version order.
+
+    Returns the list of versions applied by this call.
+    """
+    engine = engine or db.engine
+    applied_now = []
+
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+
+    for version, description, func in sorted(MIGRATIONS, key=lambda m: m[0]):
+        try:
+            with engine.begin() as conn:
+                if conn.dialect.name == 'postgresql':
+                    conn.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': MIGRATION_LOCK_KEY})
+                already_applied = conn.execute(
+                    text('SELECT 1 FROM schema_migrations WHERE version = :version'),
+                    {'version': version}
+                ).scalar()
+                if already_applied:
+                    continue
+
+                logger.info(f"Applying migration {version}: {description}")
+                func(conn)
+                conn.execute(
+                    text('INSERT INTO schema_migrations (version, description, applied_at) '
+                         'VALUES (:version, :description, :applied_at)'),
+                    {'version': version, 'description': description, 'applied_at': datetime.utcnow()}
+                )
+                applied_now.append(version)
+        except IntegrityError:
+            # Another worker recorded this version between our check and insert
+            logger.info(f"Migration {version} was applied concurrently")
+
+    return applied_now
+
+
+def _hot_queries(dialect):
+    """Yield (name, sql, params) for every hot query issued by main.py."""
+    literal = {'literal_binds': True}
+    status_stmt = queries.latest_readings('washer').compile(dialect=dialect, compile_kwargs=literal)
+    yield 'get_sensor_status: latest readings', str(status_stmt), {}
+    batch_stmt = queries.latest_readings_batch(['washer', 'dryer'], dialect_name=dialect.name).compile(
+        dialect=dialect, compile_kwargs=literal
+    )
+    yield 'get_all_sensors_status: latest readings batch', str(batch_stmt), {}
+    yield 'get_popular_times: day', queries.POPULAR_TIMES_DAY_SQL, {
+        'sensor_type': 'washer', 'day_of_week': 1
+    }
+    yield 'popular_times_week_endpoint: week', queries.POPULAR_TIMES_WEEK_SQL, {'sensor_type': 'washer'}
+
+
+def _plan_uses_index(dialect_name, plan_lines):
+    if dialect_name == 'postgresql':
+        return not any('Seq Scan on' in line for line in plan_lines)
+    for line in plan_lines:
+        if line.startswith(('SCAN sensor_data', 'SCAN usage_hourly')) and 'INDEX' not in line:
+            return False
+        if 'USE TEMP B-TREE FOR ORDER BY' in line:
+            return False
+    return True
+
+
+def check_query_plans(engine=None):
+    """Explain each hot query and report whether it is served by an index.
+
+    Returns a list of (name, plan_lines, uses_index) tuples.
+    """
+    engine = engine or db.engine
+    results = []
+    with engine.begin() as conn:
+        dialect_name = conn.dialect.name
+        if dialect_name == 'postgresql':
+            # Small tables are cheaper to seq scan; we only want to know
+            # whether an index *can* serve the query.
+            conn.execute(text('SET LOCAL enable_seqscan = off'))
+            prefix = 'EXPLAIN '
+        else:
+            prefix = 'EXPLAIN QUERY PLAN '
+
+        for name, sql, params in _hot_queries(conn.dialect):
+            rows = conn.execute(text(prefix + sql), params).fetchall()
+            plan_lines = [str(row[-1]) for row in rows]
+            results.append((name, plan_lines, _plan_uses_index(dialect_name, plan_lines)))
+
+    return results
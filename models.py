@@ -2,13 +2,19 @@
 # Database models for Laundry Status Application
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from shards import ShardSession
 
-# Create SQLAlchemy instance
-db = SQLAlchemy()
+# Create SQLAlchemy instance (reads go to the query-only engine when configured,
+# everything to the site's database inside /api/<location>/ requests)
+db = SQLAlchemy(session_options={'class_': ShardSession})
 
 class SensorData(db.Model):
     """Model for sensor readings data."""
     __tablename__ = 'sensor_data'
+    __table_args__ = (
+        # Serves the per-sensor "latest readings" lookup in get_sensor_status
+        db.Index('ix_sensor_data_sensor_name_vib_date', 'sensor_name', 'vib_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     sensor_name = db.Column(db.String(50), nullable=False)
@@ -38,4 +44,126 @@ class Sensor(db.Model):
     status = db.Column(db.String(20), nullable=False, default='active')
     
     def __repr__(self):
-        return f'<Sensor {self.id} {self.mac_address} {self.sensor_type}>'
\ No newline at end of file
+        return f'<Sensor {self.id} {self.mac_address} {self.sensor_type}>'
+
+class UsageHourly(db.Model):
+    """Rollup of sensor_data: number of readings per sensor, date and hour.
+
+    Maintained by a database trigger on sensor_data inserts (see
+    migrations.py) so external writers keep it current too.
+    """
+    __tablename__ = 'usage_hourly'
+    __table_args__ = (
+        db.Index('ix_usage_hourly_sensor_dow_hour', 'sensor_name', 'dow', 'hour'),
+    )
+    
+    sensor_name = db.Column(db.String(50), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    hour = db.Column(db.Integer, primary_key=True)
+    dow = db.Column(db.Integer, nullable=False)  # 0 = Sunday, 6 = Saturday
+    num_readings = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<UsageHourly {self.sensor_name} {self.day} {self.hour}:00 {self.num_readings}>'
+
+
+class SensorCycle(db.Model):
+    """A machine cycle found in sensor_data: a run of readings without a
+    gap longer than MID_CYCLE_GAP_TOLERANCE. Times are site-local."""
+    __tablename__ = 'sensor_cycles'
+    __table_args__ = (
+        db.Index('ix_sensor_cycles_sensor_start', 'sensor_name', 'start_time'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    sensor_name = db.Column(db.String(50), nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)
+    duration_minutes = db.Column(db.Float, nullable=False)
+    reading_count = db.Column(db.Integer, nullable=False)
+    
+    def __repr__(self):
+        return f'<SensorCycle {self.id} {self.sensor_name} {self.start_time} {self.duration_minutes}m>'
+
+
+class JobProgress(db.Model):
+    """Position of an incremental background job in sensor_data."""
+    __tablename__ = 'job_progress'
+    
+    job = db.Column(db.String(50), primary_key=True)
+    last_reading_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<JobProgress {self.job} {self.last_reading_id}>'
+
+
+class SensorStats(db.Model):
+    """Per-sensor summary of sensor_data for the admin page.
+
+    Maintained by an insert trigger on sensor_data (see sensor_stats.py);
+    `flask reconcile-sensor-stats` recomputes it after deletes or drift.
+    """
+    __tablename__ = 'sensor_stats'
+    
+    sensor_name = db.Column(db.String(50), primary_key=True)
+    reading_count = db.Column(db.Integer, nullable=False, default=0)
+    first_reading = db.Column(db.DateTime, nullable=True)
+    last_reading = db.Column(db.DateTime, nullable=True)
+    last_voltage = db.Column(db.Float, nullable=True)
+    
+    def __repr__(self):
+        return f'<SensorStats {self.sensor_name} {self.reading_count}>'
+
+
+class PrecomputedSnapshot(db.Model):
+    """A JSON payload computed by the background scheduler for all workers."""
+    __tablename__ = 'precomputed_snapshots'
+    
+    key = db.Column(db.String(100), primary_key=True)   # e.g. 'status:washer'
+    payload = db.Column(db.Text, nullable=False)
+    computed_at = db.Column(db.DateTime, nullable=False)  # UTC
+    
+    def __repr__(self):
+        return f'<PrecomputedSnapshot {self.key} {self.computed_at}>'
+
+
+class SchedulerLease(db.Model):
+    """Leader lease: the worker named in owner runs the named job until expires_at (UTC)."""
+    __tablename__ = 'scheduler_leases'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    owner = db.Column(db.String(100), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f'<SchedulerLease {self.name} {self.owner} {self.expires_at}>'
+
+
+class SensorDataArchive(db.Model):
+    """Raw readings older than the retention period, folded into one row per
+    sensor, day and hour (the usage_hourly buckets) by retention.py.
+
+    Averages cover the readings that carry the value.
+    """
+    __tablename__ = 'sensor_data_archive'
+    
+    sensor_name = db.Column(db.String(50), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    hour = db.Column(db.Integer, primary_key=True)
+    dow = db.Column(db.Integer, nullable=False)  # 0 = Sunday, 6 = Saturday
+    num_readings = db.Column(db.Integer, nullable=False)
+    first_reading = db.Column(db.DateTime, nullable=False)
+    last_reading = db.Column(db.DateTime, nullable=False)
+    temp_min = db.Column(db.Float, nullable=True)
+    temp_max = db.Column(db.Float, nullable=True)
+    temp_avg = db.Column(db.Float, nullable=True)
+    voltage_min = db.Column(db.Float, nullable=True)
+    voltage_max = db.Column(db.Float, nullable=True)
+    voltage_avg = db.Column(db.Float, nullable=True)
+    vibration_min = db.Column(db.Float, nullable=True)
+    vibration_max = db.Column(db.Float, nullable=True)
+    vibration_avg = db.Column(db.Float, nullable=True)
+    
+    def __repr__(self):
+        return f'<SensorDataArchive {self.sensor_name} {self.day} {self.hour}:00 {self.num_readings}>'
@@ -0,0 +1,202 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# Monthly range partitions of sensor_data on PostgreSQL
+import logging
+from datetime import date, datetime
+from sqlalchemy import text
+import rollup
+import sensor_stats
+
+logger = logging.getLogger(__name__)
+
+# Months of partitions kept ready after the current one
+MONTHS_AHEAD = 2
+# Catches readings outside every monthly partition (clock errors, backfills
+# of older months) until maintain() creates their month
+DEFAULT_PARTITION = 'sensor_data_default'
+# Maintenance gives up instead of queueing behind long queries on sensor_data
+LOCK_TIMEOUT = '5s'
+
+_PREFIX = 'sensor_data_p'
+_COLUMNS = 'id, sensor_name, vib_date, temp, vibration, boot, voltage, rssi'
+
+# Same columns as the SensorData model. vib_date holds the
+# site's wall-clock time, so EXTRACT and date_trunc work in the site
+# timezone. The partition key has to be part of the primary key.
+_CREATE_TABLE_SQL = """
+CREATE TABLE sensor_data (
+    id INTEGER NOT NULL DEFAULT nextval('{sequence}'),
+    sensor_name VARCHAR(50) NOT NULL,
+    vib_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    temp FLOAT,
+    vibration FLOAT,
+    boot INTEGER,
+    voltage FLOAT,
+    rssi INTEGER,
+    PRIMARY KEY (id, vib_date)
+) PARTITION BY RANGE (vib_date)
+"""
+
+# Created on the parent, so every partition gets them too
+_INDEX_SQL = [
+    'CREATE INDEX IF NOT EXISTS ix_sensor_data_sensor_name_vib_date ON sensor_data (sensor_name, vib_date)',
+    # A few pages per month of readings; serves vib_date ranges across all
+    # sensors (retention cutoff, exports) where the btree would be far larger
+    'CREATE INDEX IF NOT EXISTS ix_sensor_data_vib_date_brin ON sensor_data USING brin (vib_date)',
+]
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{_PREFIX}{month:%Y%m}'
+
+
+def is_partitioned(conn):
+    """Whether sensor_data is a partitioned table (PostgreSQL only)."""
+    if conn.dialect.name != 'postgresql':
+        return False
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('sensor_data')"
+    )).scalar() is not None
+
+
+def monthly_partitions(conn):
+    """{first day of month: table name} of the attached monthly partitions."""
+    names = conn.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = to_regclass('sensor_data')
+    """)).scalars()
+    return {datetime.strptime(name[len(_PREFIX):], '%Y%m').date(): name
+            for name in names if name.startswith(_PREFIX)}
+
+
+def create_partition(conn, month):
+    """Create the partition for month, moving its rows out of the default partition."""
+    name = partition_name(month)
+    bounds = {'start': month, 'end': next_month(month)}
+    values = f"FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+    stray = conn.execute(text(
+        f'SELECT 1 FROM {DEFAULT_PARTITION} WHERE vib_date >= :start AND vib_date < :end LIMIT 1'
+    ), bounds).scalar()
+    if stray is None:
+        conn.execute(text(f'CREATE TABLE {name} PARTITION OF sensor_data {values}'))
+        return name
+    # A partition cannot be added over rows the default partition holds.
+    # Moving them into a standalone table does not fire the insert
+    # triggers (they are already counted); attaching builds the indexes.
+    conn.execute(text(f'CREATE TABLE {name} (LIKE sensor_data INCLUDING DEFAULTS INCLUDING GENERATED)'))
+    conn.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION} WHERE vib_date >= :start AND vib_date < :end
+            RETURNING {_COLUMNS}
+        )
+        INSERT INTO {name} ({_COLUMNS}) SELECT {_COLUMNS} FROM moved
+    """), bounds)
+    conn.execute(text(f'ALTER TABLE sensor_data ATTACH PARTITION {name} {values}'))
+    return name
+
+
+def ensure_partitions(conn, times):
+    """Create the missing monthly partitions for the given times, so a
+    backfill of older months is not written to the default partition.
+    Does nothing unless sensor_data is partitioned. Returns the table
+    names created.
+    """
+    if not is_partitioned(conn):
+        return []
+    missing = {month_start(value) for value in times} - monthly_partitions(conn).keys()
+    return [create_partition(conn, month) for month in sorted(missing)]
+
+
+def partition_table(conn, today, months_ahead=MONTHS_AHEAD):
+    """Turn an unpartitioned sensor_data into a partitioned one, monthly by vib_date.
+
+    The readings are copied in one statement, keeping their ids and the
+    id sequence; usage_hourly and sensor_stats are not touched since the
+    insert triggers are only installed on the new table afterwards.
+    Returns the number of monthly partitions created.
+    """
+    if is_partitioned(conn):
+        return 0
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence('sensor_data', 'id')")).scalar()
+    first = conn.execute(text('SELECT MIN(vib_date) FROM sensor_data')).scalar()
+
+    conn.execute(text('ALTER TABLE sensor_data RENAME TO sensor_data_unpartitioned'))
+    conn.execute(text('ALTER TABLE sensor_data_unpartitioned '
+                      'RENAME CONSTRAINT sensor_data_pkey TO sensor_data_unpartitioned_pkey'))
+    # Index names are unique per schema; the old table goes away below
+    for index_name in conn.execute(text(
+        "SELECT indexname FROM pg_indexes WHERE tablename = 'sensor_data_unpartitioned' "
+        "AND indexname <> 'sensor_data_unpartitioned_pkey'"
+    )).scalars().all():
+        conn.execute(text(f'DROP INDEX {index_name}'))
+
+    conn.execute(text(_CREATE_TABLE_SQL.format(sequence=sequence)))
+    conn.execute(text(f'ALTER SEQUENCE {sequence} OWNED BY sensor_data.id'))
+    conn.execute(text(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF sensor_data DEFAULT'))
+    month = month_start(first or today)
+    last = month_start(today)
+    for _ in range(months_ahead):
+        last = next_month(last)
+    created = 0
+    while month <= last:
+        create_partition(conn, month)
+        month = next_month(month)
+        created += 1
+
+    conn.execute(text(f'INSERT INTO sensor_data ({_COLUMNS}) '
+                      f'SELECT {_COLUMNS} FROM sensor_data_unpartitioned'))
+    conn.execute(text('DROP TABLE sensor_data_unpartitioned'))
+    for statement in _INDEX_SQL:
+        conn.execute(text(statement))
+    rollup.install_trigger(conn)
+    sensor_stats.install_trigger(conn)
+    conn.execute(text('ANALYZE sensor_data'))
+    logger.info(f"Partitioned sensor_data into {created} monthly partitions")
+    return created
+
+
+def maintain(conn, today, detach_before=None, months_ahead=MONTHS_AHEAD):
+    """Create and detach monthly partitions as time moves on.
+
+    Creates the partitions of the next months_ahead months and of every
+    month with readings in the default partition. With detach_before (a
+    date, normally the retention cutoff), partitions that end on or before
+    it and are empty, because retention archived their readings, are
+    detached and dropped; that frees their space at once where deleting
+    rows leaves it to VACUUM. Returns (created, dropped) table names.
+    """
+    if not is_partitioned(conn):
+        return [], []
+    conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+    existing = monthly_partitions(conn)
+
+    wanted = {month_start(today)}
+    for _ in range(months_ahead):
+        wanted.add(next_month(max(wanted)))
+    wanted.update(value.date() for value in conn.execute(text(
+        f"SELECT DISTINCT date_trunc('month', vib_date) FROM {DEFAULT_PARTITION}"
+    )).scalars())
+    created = [create_partition(conn, month) for month in sorted(wanted - existing.keys())]
+
+    dropped = []
+    if detach_before is not None:
+        for month, name in sorted(existing.items()):
+            if next_month(month) > detach_before:
+                break
+            if conn.execute(text(f'SELECT 1 FROM {name} LIMIT 1')).scalar() is None:
+                conn.execute(text(f'ALTER TABLE sensor_data DETACH PARTITION {name}'))
+                conn.execute(text(f'DROP TABLE {name}'))
+                dropped.append(name)
+
+    if created or dropped:
+        logger.info(f"sensor_data partitions created: {created}, dropped: {dropped}")
+    return created, dropped
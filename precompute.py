@@ -0,0 +1,267 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# Leader-elected background precomputation of dashboard snapshots
+import atexit
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from models import db, PrecomputedSnapshot, SchedulerLease
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = 'precompute'
+# A leader that stops renewing (crashed, hung) is replaced after this long
+LEASE_SECONDS = 30
+
+# Store key of the statuses of all sensors, rewritten on every leader tick
+STATUS_KEY = 'status'
+
+
+def popular_times_key(sensor_type, day_index):
+    return f'popular_times:{sensor_type}:{day_index}'
+
+
+def write_snapshots(conn, payloads, computed_at):
+    """Upsert {key: payload} into precomputed_snapshots."""
+    if not payloads:
+        return
+    insert = postgresql.insert if conn.dialect.name == 'postgresql' else sqlite.insert
+    statement = insert(PrecomputedSnapshot.__table__)
+    statement = statement.on_conflict_do_update(
+        index_elements=['key'],
+        set_={'payload': statement.excluded.payload, 'computed_at': statement.excluded.computed_at}
+    )
+    conn.execute(statement, [
+        {'key': key, 'payload': json.dumps(payload, sort_keys=True), 'computed_at': computed_at}
+        for key, payload in payloads.items()
+    ])
+
+
+def read_snapshots(keys):
+    """Read payloads from the store in one query.
+
+    Returns {key: (payload, age_seconds)} for the keys that exist; callers
+    decide what is too old and compute that themselves.
+    """
+    return snapshots_from_rows(db.session.execute(snapshots_query(keys)))
+
+
+def snapshots_query(keys):
+    """Select (key, payload, computed_at) of the stored snapshots with the given keys."""
+    return select(PrecomputedSnapshot.key, PrecomputedSnapshot.payload, PrecomputedSnapshot.computed_at) \
+        .where(PrecomputedSnapshot.key.in_(keys))
+
+
+def snapshots_from_rows(rows):
+    """Turn snapshots_query() rows into the read_snapshots() result."""
+    now = datetime.utcnow()
+    return {
+        key: (json.loads(payload), round(max(0.0, (now - computed_at).total_seconds()), 1))
+        for key, payload, computed_at in rows
+    }
+
+
+def acquire_lease(owner, now, seconds=LEASE_SECONDS, name=LEASE_NAME):
+    """Take or renew the named lease; True if owner holds it until now + seconds."""
+    expires_at = now + timedelta(seconds=seconds)
+    with db.engine.begin() as conn:
+        renewed = conn.execute(
+            update(SchedulerLease)
+            .where(SchedulerLease.name == name)
+            .where(or_(SchedulerLease.owner == owner, SchedulerLease.expires_at < now))
+            .values(owner=owner, expires_at=expires_at)
+        ).rowcount
+    if renewed:
+        return True
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(SchedulerLease.__table__.insert(),
+                         {'name': name, 'owner': owner, 'expires_at': expires_at})
+        return True
+    except IntegrityError:
+        return False  # held by another worker
+
+
+def release_lease(owner, name=LEASE_NAME):
+    """Give the lease up so another worker can take over right away."""
+    with db.engine.begin() as conn:
+        conn.execute(
+            update(SchedulerLease)
+            .where(SchedulerLease.name == name, SchedulerLease.owner == owner)
+            .values(expires_at=datetime(1970, 1, 1))
+        )
+
+
+class PrecomputeScheduler:
+    """Refreshes the shared snapshot store from one worker at a time.
+
+    Every worker runs the thread, but only the holder of the database lease
+    computes: statuses of all sensors every interval (the ring buffers pick
+    up new readings on each tick) and the popular times histograms of all
+    sensors and days every popular_times_interval. Other workers only read
+    the store. Maintenance jobs added with add_job() run on the leader too.
+    """
+
+    def __init__(self, app, compute_statuses, compute_popular_times, interval, popular_times_interval,
+                 snapshots=True):
+        """
+        Args:
+            app: Flask application (for the app context of the thread)
+            compute_statuses: Callable returning {sensor_type: status}
+            compute_popular_times: Callable taking a sensor type and returning
+                                   {day_index: histogram}
+            interval: Seconds between ticks
+            popular_times_interval: Seconds between popular times refreshes
+            snapshots: Write the snapshot store (False: only run jobs)
+        """
+        self._app = app
+        self._compute_statuses = compute_statuses
+        self._compute_popular_times = compute_popular_times
+        self._interval = interval
+        self._popular_times_interval = popular_times_interval
+        self._snapshots = snapshots
+        self._jobs = []
+        self._owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._popular_times_due = 0
+        self._lease_until = 0  # time.monotonic() when the lease we hold runs out
+        self.is_leader = False
+        self.ticks = 0
+        self.popular_times_refreshes = 0
+        self.failures = 0
+        atexit.register(self.stop)
+
+    def add_job(self, name, func, interval, renews_lease=False):
+        """Run func() on the leader every interval seconds, after the snapshots.
+
+        The lease is renewed before every job, and a job is put off while
+        its last run took longer than the lease has left. A job that calls
+        renew_lease() between its steps (renews_lease=True) may run longer
+        than the lease and is expected to stop when that returns False.
+        A job that fails is logged and retried at its next due time.
+        """
+        self._jobs.append({'name': name, 'func': func, 'interval': interval, 'renews_lease': renews_lease,
+                           'due': 0, 'runs': 0, 'failures': 0, 'skipped': 0, 'last_seconds': None})
+
+    def start(self):
+        """Start the thread once per process (safe to call on every request)."""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='precompute-scheduler', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                with self._app.app_context():
+                    self.tick()
+            except Exception:
+                self.failures += 1
+                logger.exception("Precompute tick failed")
+            time.sleep(self._interval)
+
+    def renew_lease(self):
+        """Take or renew the lease for another LEASE_SECONDS; False once another worker holds it."""
+        started = time.monotonic()
+        leader = acquire_lease(self._owner, datetime.utcnow())
+        if leader:
+            self._lease_until = started + LEASE_SECONDS
+        elif self.is_leader:
+            logger.warning(f"Precompute scheduler {self._owner} lost the lease")
+            self.is_leader = False
+        return leader
+
+    def lease_remaining(self):
+        """Seconds until the lease we hold runs out (0 if we do not hold it)."""
+        return max(0.0, self._lease_until - time.monotonic()) if self.is_leader else 0.0
+
+    def tick(self):
+        """Renew the lease and, as leader, refresh what is due."""
+        now = datetime.utcnow()
+        leader = self.renew_lease()
+        if leader and not self.is_leader:
+            logger.info(f"Precompute scheduler {self._owner} is now the leader")
+            # the previous leader's refresh and job times are unknown
+            self._popular_times_due = 0
+            for job in self._jobs:
+                job['due'] = 0
+        self.is_leader = leader
+        if not leader:
+            return
+
+        if self._snapshots:
+            self._write_snapshots(now)
+        self._run_due_jobs()
+        self.ticks += 1
+
+    def _write_snapshots(self, now):
+        statuses = self._compute_statuses()
+        payloads = {STATUS_KEY: statuses}
+        if time.monotonic() >= self._popular_times_due:
+            for sensor_type in sorted(set(statuses) | {'washer'}):
+                for day_index, histogram in self._compute_popular_times(sensor_type).items():
+                    payloads[popular_times_key(sensor_type, day_index)] = histogram
+            self._popular_times_due = time.monotonic() + self._popular_times_interval
+            self.popular_times_refreshes += 1
+
+        with db.engine.begin() as conn:
+            write_snapshots(conn, payloads, now)
+        db.session.remove()
+
+    def _run_due_jobs(self):
+        for job in self._jobs:
+            if time.monotonic() < job['due']:
+                continue
+            # the snapshots or the previous job may have used up the lease
+            if not self.renew_lease():
+                return
+            remaining = self.lease_remaining()
+            if not job['renews_lease'] and (job['last_seconds'] or 0) >= remaining:
+                job['skipped'] += 1
+                logger.warning(f"Scheduled job {job['name']} put off: its last run took {job['last_seconds']}s, "
+                               f"the lease has {remaining:.1f}s left")
+                continue
+            started = time.monotonic()
+            try:
+                job['func']()
+                job['runs'] += 1
+            except Exception:
+                job['failures'] += 1
+                logger.exception(f"Scheduled job {job['name']} failed")
+            finally:
+                db.session.remove()
+            job['last_seconds'] = round(time.monotonic() - started, 3)
+            job['due'] = time.monotonic() + job['interval']
+            if not self.is_leader:
+                return  # lost the lease while the job ran
+
+    def stop(self):
+        """Release the lease (runs at interpreter exit) so a peer takes over at once."""
+        if self.is_leader:
+            with self._app.app_context():
+                release_lease(self._owner)
+            self.is_leader = False
+
+    def stats(self):
+        return {
+            'owner': self._owner,
+            'is_leader': self.is_leader,
+            'ticks': self.ticks,
+            'popular_times_refreshes': self.popular_times_refreshes,
+            'failures': self.failures,
+            'jobs': {job['name']: {key: job[key] for key in ('runs', 'failures', 'skipped', 'last_seconds')}
+                     for job in self._jobs},
+        }
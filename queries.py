@@ -0,0 +1,77 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# Hot dashboard queries shared by main.py and the query plan check in migrations.py
+from sqlalchemy import String, column, select, true, union_all, values
+from models import Sensor, SensorData
+
+# Number of most recent readings the status logic looks at
+STATUS_WINDOW = 40
+
+# Hourly usage distribution for one sensor, read from the usage_hourly
+# rollup. Every rollup row is one distinct date with readings in that hour,
+# so COUNT(*) is the number of days and SUM(num_readings) the readings.
+# The second branch returns the total number of days per day of week
+# (hour is NULL on those rows).
+_POPULAR_TIMES_SQL = """
+SELECT dow, hour, COUNT(*) AS num_days, SUM(num_readings) AS num_readings
+FROM usage_hourly
+WHERE sensor_name = :sensor_type {day_filter}
+  AND hour BETWEEN 7 AND 21
+GROUP BY dow, hour
+UNION ALL
+SELECT dow, NULL, COUNT(DISTINCT day), NULL
+FROM usage_hourly
+WHERE sensor_name = :sensor_type {day_filter}
+GROUP BY dow
+"""
+
+POPULAR_TIMES_DAY_SQL = _POPULAR_TIMES_SQL.format(day_filter='AND dow = :day_of_week')
+POPULAR_TIMES_WEEK_SQL = _POPULAR_TIMES_SQL.format(day_filter='')
+
+
+def active_sensor_types():
+    """Select the sensor type of every active sensor, in registration order."""
+    return select(Sensor.sensor_type).where(Sensor.status == 'active').order_by(Sensor.id)
+
+
+def latest_readings(sensor_type, limit=STATUS_WINDOW):
+    """Select (vib_date, voltage, temp) of a sensor's most recent readings, newest first."""
+    return select(SensorData.vib_date, SensorData.voltage, SensorData.temp) \
+        .where(SensorData.sensor_name == sensor_type) \
+        .order_by(SensorData.vib_date.desc()) \
+        .limit(limit)
+
+
+def latest_readings_batch(sensor_types, limit=STATUS_WINDOW, dialect_name='sqlite'):
+    """Select the latest window of several sensors in one statement.
+
+    Rows are (sensor_name, id, vib_date, voltage, temp), newest first within each
+    sensor. Each sensor gets its own LIMITed branch of a UNION ALL so every
+    branch is an index range read on (sensor_name, vib_date); a
+    ROW_NUMBER() OVER (PARTITION BY sensor_name) window would have to
+    number every historical reading before it could filter.
+
+    On PostgreSQL the same LIMITed read runs once per sensor as a LATERAL
+    subquery: with a partitioned sensor_data every UNION ALL branch would
+    be planned against every partition, which costs more than running it.
+    """
+    if dialect_name == 'postgresql':
+        sensors = values(column('sensor_name', String), name='sensors') \
+            .data([(sensor_type,) for sensor_type in sensor_types])
+        window = select(SensorData.id, SensorData.vib_date, SensorData.voltage, SensorData.temp) \
+            .where(SensorData.sensor_name == sensors.c.sensor_name) \
+            .order_by(SensorData.vib_date.desc()) \
+            .limit(limit) \
+            .lateral('latest')
+        return select(sensors.c.sensor_name, window.c.id, window.c.vib_date, window.c.voltage, window.c.temp) \
+            .select_from(sensors.join(window, true()))
+
+    branches = []
+    for sensor_type in sensor_types:
+        branch = select(SensorData.sensor_name, SensorData.id, SensorData.vib_date,
+                        SensorData.voltage, SensorData.temp) \
+            .where(SensorData.sensor_name == sensor_type) \
+            .order_by(SensorData.vib_date.desc()) \
+            .limit(limit) \
+            .subquery()
+        branches.append(select(branch))
+    return union_all(*branches)
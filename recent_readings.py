@@ -0,0 +1,312 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# Per-sensor ring buffers of recent readings, kept current by tailing sensor_data
+import logging
+import math
+import threading
+import time
+from array import array
+from sqlalchemy import bindparam, func, select
+from models import db, SensorData
+import queries
+
+logger = logging.getLogger(__name__)
+
+# Rows read per round trip while catching up with sensor_data
+TAIL_BATCH_SIZE = 5000
+# PostgreSQL hands out ids at insert, not at commit: with concurrent
+# writers (the write-behind buffer, the gateways) a lower id can become
+# visible after a higher one was tailed. Ids skipped below the high water
+# mark are re-read for TAIL_GAP_SECONDS, at most TAIL_GAP_IDS of them
+# per jump. SQLite serialises writers, so it never has such gaps.
+TAIL_GAP_SECONDS = 60
+TAIL_GAP_IDS = 10000
+
+_NAN = float('nan')
+
+# Built once: every status request runs it, usually to find nothing new
+_TAIL_QUERY = select(SensorData.id, SensorData.sensor_name, SensorData.vib_date,
+                     SensorData.voltage, SensorData.temp) \
+    .where(SensorData.id > bindparam('after_id')) \
+    .order_by(SensorData.id) \
+    .limit(TAIL_BATCH_SIZE)
+
+
+def _to_float(value):
+    return _NAN if value is None else float(value)
+
+
+def _from_float(value):
+    return None if math.isnan(value) else value
+
+
+class SensorRing:
+    """The last `capacity` readings of one sensor plus its cycle tracking.
+
+    Times, voltages and temperatures live in fixed-size array columns
+    (NaN for a missing value). The cycle start is tracked as readings are
+    appended: run_start is the first reading after the most recent gap
+    longer than the tolerance and run_length counts the readings since.
+    """
+    __slots__ = ('ids', 'times', 'voltages', 'temps', 'head', 'count',
+                 'latest', 'run_start', 'run_length')
+
+    def __init__(self, capacity):
+        self.ids = array('q', [0] * capacity)
+        self.times = array('d', [0.0] * capacity)
+        self.voltages = array('d', [_NAN] * capacity)
+        self.temps = array('d', [_NAN] * capacity)
+        self.head = 0      # index of the next slot to write
+        self.count = 0
+        self.latest = None      # localized time of the newest reading
+        self.run_start = None   # localized time the current run began, None if no gap seen
+        self.run_length = 0
+
+    def append(self, row_id, localized, voltage, temp, gap_tolerance):
+        """Add a reading that is not older than the newest one."""
+        if self.latest is not None:
+            gap = (localized - self.latest).total_seconds() / 60
+            if gap > gap_tolerance:
+                self.run_start = localized
+                self.run_length = 1
+            else:
+                self.run_length += 1
+        capacity = len(self.times)
+        self.ids[self.head] = row_id
+        self.times[self.head] = localized.timestamp()
+        self.voltages[self.head] = _to_float(voltage)
+        self.temps[self.head] = _to_float(temp)
+        self.head = (self.head + 1) % capacity
+        self.count = min(self.count + 1, capacity)
+        self.latest = localized
+
+    def __contains__(self, row_id):
+        return row_id in self.ids
+
+    def newest(self):
+        """(voltage, temperature) of the newest reading."""
+        index = (self.head - 1) % len(self.times)
+        return _from_float(self.voltages[index]), _from_float(self.temps[index])
+
+    def cycle_start(self):
+        """Cycle start as the 40-reading window walk in main.py finds it.
+
+        That walk only sees gaps within the window, so a run longer than
+        the window (or a history without any gap) yields the newest reading.
+        """
+        if self.run_start is not None and self.run_length <= len(self.times) - 1:
+            return self.run_start
+        return self.latest
+
+
+class RecentReadings:
+    """Ring buffers for every sensor, fed by tailing sensor_data by id.
+
+    Every gunicorn worker keeps its own copy; sync() reads only rows above
+    the highest id seen so far, so readings written by other workers, the
+    ingest buffer or the gateways directly all show up the same way. Ids
+    skipped on the way are read again until they turn up or expire (see
+    TAIL_GAP_SECONDS); rows committed later than that are missed until
+    the ring is reloaded.
+    """
+
+    def __init__(self, localize, gap_tolerance, capacity=queries.STATUS_WINDOW):
+        self._localize = localize
+        self._gap_tolerance = gap_tolerance
+        self._capacity = capacity
+        self._lock = threading.Lock()
+        self._rings = {}
+        self._loading = {}  # sensor name: rows tailed while its ring is being loaded
+        self._high_water_id = None
+        self._gaps = {}  # id skipped below the high water mark: when it was skipped
+
+    def clear(self):
+        """Drop every ring; the next sync() starts over from the database."""
+        with self._lock:
+            self._rings.clear()
+            self._loading.clear()
+            self._high_water_id = None
+            self._gaps.clear()
+
+    def _build_rings(self, sensor_types, rows):
+        """Build rings for sensor_types from latest_readings_batch rows."""
+        rows_by_type = {sensor_type: [] for sensor_type in sensor_types}
+        for sensor_name, row_id, vib_date, voltage, temp in rows:
+            rows_by_type[sensor_name].append((row_id, vib_date, voltage, temp))
+
+        rings = {}
+        for sensor_type, rows in rows_by_type.items():
+            # Without a gap inside the loaded window run_start stays None:
+            # whatever came before is out of reach of the window walk too
+            ring = SensorRing(self._capacity)
+            for row_id, vib_date, voltage, temp in reversed(rows):
+                ring.append(row_id, self._localize(vib_date), voltage, temp, self._gap_tolerance)
+            rings[sensor_type] = ring
+        return rings
+
+    def _load(self, sensor_types):
+        """Build rings for sensor_types from the database (newest window only)."""
+        return self._build_rings(sensor_types, db.session.execute(
+            queries.latest_readings_batch(sensor_types, self._capacity, db.session.get_bind().dialect.name)))
+
+    def _start(self, high_water_id):
+        """First sync: drop the rings and tail from high_water_id on."""
+        with self._lock:
+            self._rings.clear()
+            self._loading.clear()
+            self._high_water_id = high_water_id
+            self._gaps.clear()
+
+    def _tail_from(self):
+        """The id to tail sensor_data after: below the oldest gap still awaited, if any."""
+        with self._lock:
+            if self._high_water_id is None:
+                return None
+            expired = time.monotonic() - TAIL_GAP_SECONDS
+            for row_id in [row_id for row_id, skipped in self._gaps.items() if skipped < expired]:
+                del self._gaps[row_id]
+            return min(self._gaps) - 1 if self._gaps else self._high_water_id
+
+    def _append(self, ring, row_id, vib_date, voltage, temp):
+        """Append one tailed row; False if it is older than the ring's newest (reload the ring)."""
+        if row_id in ring:
+            return True  # loaded with this row already
+        localized = self._localize(vib_date)
+        if ring.latest is not None and localized < ring.latest:
+            return False  # backfilled, out of order
+        ring.append(row_id, localized, voltage, temp, self._gap_tolerance)
+        return True
+
+    def _apply(self, rows, changed):
+        """Append a batch of tailed rows to the rings.
+
+        Returns the id to read the next batch after, or None if the rings
+        were cleared meanwhile (the next sync() starts over).
+        """
+        reload = set()
+        now = time.monotonic()
+        with self._lock:
+            if self._high_water_id is None:
+                return None
+            for row_id, sensor_name, vib_date, voltage, temp in rows:
+                if row_id > self._high_water_id:
+                    for skipped in range(max(self._high_water_id + 1, row_id - TAIL_GAP_IDS), row_id):
+                        self._gaps[skipped] = now
+                    self._high_water_id = row_id
+                elif self._gaps.pop(row_id, None) is None:
+                    continue  # tailed already
+                if sensor_name is None:
+                    continue
+                changed.add(sensor_name)
+                ring = self._rings.get(sensor_name)
+                if ring is None:
+                    # Being loaded: the load may not see this row yet, so
+                    # keep it for _add_rings()
+                    if sensor_name in self._loading:
+                        self._loading[sensor_name].append((row_id, vib_date, voltage, temp))
+                    continue
+                if not self._append(ring, row_id, vib_date, voltage, temp):
+                    reload.add(sensor_name)
+            for sensor_name in reload:
+                self._rings.pop(sensor_name, None)
+        return rows[-1][0]
+
+    def sync(self):
+        """Append readings newer than the last seen id.
+
+        Returns the set of sensor names that received readings, or None on
+        the first call (everything must be considered changed).
+        """
+        after_id = self._tail_from()
+        if after_id is None:
+            self._start(db.session.execute(select(func.max(SensorData.id))).scalar() or 0)
+            return None
+
+        changed = set()
+        while after_id is not None:
+            rows = db.session.execute(_TAIL_QUERY, {'after_id': after_id}).all()
+            if not rows:
+                break
+            after_id = self._apply(rows, changed)
+            if len(rows) < TAIL_BATCH_SIZE:
+                break
+        return changed
+
+    async def sync_async(self, conn):
+        """sync() on an AsyncConnection (see asgi.py)."""
+        after_id = self._tail_from()
+        if after_id is None:
+            self._start((await conn.execute(select(func.max(SensorData.id)))).scalar() or 0)
+            return None
+
+        changed = set()
+        while after_id is not None:
+            rows = (await conn.execute(_TAIL_QUERY, {'after_id': after_id})).all()
+            if not rows:
+                break
+            after_id = self._apply(rows, changed)
+            if len(rows) < TAIL_BATCH_SIZE:
+                break
+        return changed
+
+    def _begin_load(self, sensor_types):
+        """The sensors of sensor_types without a ring. From now until
+        _add_rings() the rows sync() tails for them are kept."""
+        with self._lock:
+            missing = [sensor_type for sensor_type in sensor_types if sensor_type not in self._rings]
+            for sensor_type in missing:
+                self._loading.setdefault(sensor_type, [])
+            return missing
+
+    def _add_rings(self, missing, loaded):
+        """Install the rings loaded for missing and append the rows tailed meanwhile."""
+        with self._lock:
+            for sensor_type in missing:
+                tailed = self._loading.pop(sensor_type, None)
+                ring = loaded.get(sensor_type)
+                if ring is None or sensor_type in self._rings:
+                    continue  # the load failed, or another thread was first
+                if tailed is None:
+                    continue  # cleared meanwhile: load again next time
+                if all(self._append(ring, *row) for row in tailed):
+                    self._rings[sensor_type] = ring
+
+    def _inputs(self, sensor_types, loaded):
+        inputs = {}
+        with self._lock:
+            for sensor_type in sensor_types:
+                # a ring that could not be installed still answers this call
+                ring = self._rings.get(sensor_type) or loaded[sensor_type]
+                if ring.latest is None:
+                    inputs[sensor_type] = None
+                else:
+                    voltage, temperature = ring.newest()
+                    inputs[sensor_type] = (ring.latest, ring.cycle_start(), voltage, temperature)
+        return inputs
+
+    def status_inputs(self, sensor_types):
+        """Return {sensor_type: (latest, cycle_start, voltage, temperature) or None}.
+
+        Sensors without a ring are loaded from the database first; after
+        that no query is needed until the next sync().
+        """
+        missing = self._begin_load(sensor_types)
+        loaded = {}
+        if missing:
+            try:
+                loaded = self._load(missing)
+            finally:
+                self._add_rings(missing, loaded)
+        return self._inputs(sensor_types, loaded)
+
+    async def status_inputs_async(self, conn, sensor_types):
+        """status_inputs() on an AsyncConnection (see asgi.py)."""
+        missing = self._begin_load(sensor_types)
+        loaded = {}
+        if missing:
+            try:
+                rows = (await conn.execute(
+                    queries.latest_readings_batch(missing, self._capacity, conn.dialect.name))).all()
+                loaded = self._build_rings(missing, rows)
+            finally:
+                self._add_rings(missing, loaded)
+        return self._inputs(sensor_types, loaded)
@@ -0,0 +1,158 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# Retention: fold old raw readings into sensor_data_archive and delete them
+import logging
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, select, text
+from models import db, JobProgress, SensorData, SensorStats
+import cycles
+import queries
+import rollup
+
+logger = logging.getLogger(__name__)
+
+# Raw readings archived and deleted per transaction; keeps each write lock
+# short enough that ingest commits are not held up noticeably
+CHUNK_SIZE = 5000
+# Pause between chunks so waiting writers get the lock
+CHUNK_PAUSE = 0.05
+
+_STAT_COLUMNS = ('temp', 'voltage', 'vibration')
+_LEAST = {'sqlite': 'MIN', 'postgresql': 'LEAST'}
+_GREATEST = {'sqlite': 'MAX', 'postgresql': 'GREATEST'}
+
+
+def cutoff_for(timezone, days, now=None):
+    """Local midnight days days before now, as naive site time."""
+    now = now or datetime.now(timezone)
+    return datetime.combine((now - timedelta(days=days)).date(), datetime.min.time())
+
+
+def _merge_extreme(function, column):
+    # MIN()/MAX() of two arguments return NULL if either is NULL in SQLite
+    existing = f'sensor_data_archive.{column}'
+    return f'{column} = {function}(COALESCE({existing}, excluded.{column}), COALESCE(excluded.{column}, {existing}))'
+
+
+def _merge_average(column):
+    existing = f'sensor_data_archive.{column}'
+    return (
+        f'{column} = CASE WHEN excluded.{column} IS NULL THEN {existing} '
+        f'WHEN {existing} IS NULL THEN excluded.{column} '
+        f'ELSE ({existing} * sensor_data_archive.num_readings + excluded.{column} * excluded.num_readings) '
+        f'/ (sensor_data_archive.num_readings + excluded.num_readings) END'
+    )
+
+
+def _archive_statement(dialect_name):
+    """Upsert the archive buckets of the readings with the given ids.
+
+    A bucket that already exists (its hour was split over two chunks, or a
+    late reading was backfilled) is merged; averages are weighted by count.
+    """
+    least = _LEAST.get(dialect_name, _LEAST['sqlite'])
+    greatest = _GREATEST.get(dialect_name, _GREATEST['sqlite'])
+    day = rollup.day_expression(dialect_name)
+    hour = rollup.hour_expression(dialect_name)
+    dow = rollup.dow_expression(dialect_name)
+    stat_columns = ', '.join(f'{column}_min, {column}_max, {column}_avg' for column in _STAT_COLUMNS)
+    aggregates = ', '.join(f'MIN({column}), MAX({column}), AVG({column})' for column in _STAT_COLUMNS)
+    merges = [
+        'num_readings = sensor_data_archive.num_readings + excluded.num_readings',
+        _merge_extreme(least, 'first_reading'),
+        _merge_extreme(greatest, 'last_reading'),
+    ]
+    for column in _STAT_COLUMNS:
+        merges += [_merge_extreme(least, f'{column}_min'), _merge_extreme(greatest, f'{column}_max'),
+                   _merge_average(f'{column}_avg')]
+    return text(f"""
+        INSERT INTO sensor_data_archive
+            (sensor_name, day, hour, dow, num_readings, first_reading, last_reading, {stat_columns})
+        SELECT sensor_name, {day}, {hour}, {dow}, COUNT(*), MIN(vib_date), MAX(vib_date), {aggregates}
+        FROM sensor_data
+        WHERE id IN :ids
+        GROUP BY sensor_name, {day}, {hour}, {dow}
+        ON CONFLICT (sensor_name, day, hour)
+        DO UPDATE SET {', '.join(merges)}
+    """).bindparams(bindparam('ids', expanding=True))
+
+
+_DELETE_SQL = text('DELETE FROM sensor_data WHERE id IN :ids').bindparams(bindparam('ids', expanding=True))
+
+
+def _sensor_cutoff(sensor_name, cutoff):
+    """The cutoff for one sensor, moved back so the newest STATUS_WINDOW
+    readings stay raw (the status logic reads them); None if it has fewer."""
+    oldest_kept = db.session.execute(
+        select(SensorData.vib_date)
+        .where(SensorData.sensor_name == sensor_name)
+        .order_by(SensorData.vib_date.desc())
+        .offset(queries.STATUS_WINDOW - 1)
+        .limit(1)
+    ).scalar()
+    if oldest_kept is None:
+        return None
+    return min(cutoff, oldest_kept.replace(tzinfo=None))
+
+
+def archive(cutoff, max_rows=None, chunk_size=CHUNK_SIZE, pause=CHUNK_PAUSE, keep_going=None):
+    """Archive and delete the raw readings from before cutoff (naive site time).
+
+    Only readings the cycle extraction has processed are touched, oldest
+    first, chunk_size per transaction. keep_going() is called before every
+    chunk; archiving stops when it returns False. usage_hourly and sensor_stats are
+    not changed: deletes do not fire their triggers and both already
+    count the archived readings. Returns the number of readings archived.
+    """
+    processed_id = db.session.execute(
+        select(JobProgress.last_reading_id).where(JobProgress.job == cycles.JOB_NAME)
+    ).scalar() or 0
+    sensor_names = db.session.execute(
+        select(SensorStats.sensor_name).order_by(SensorStats.sensor_name)
+    ).scalars().all()
+    archive_sql = _archive_statement(db.engine.dialect.name)
+    select_sql = text(
+        'SELECT id FROM sensor_data WHERE sensor_name = :sensor_name AND vib_date < :cutoff AND id <= :max_id '
+        'ORDER BY vib_date LIMIT :limit'
+    ).bindparams(bindparam('cutoff', type_=db.DateTime))
+
+    archived = 0
+    stopped = False
+    for sensor_name in sensor_names:
+        sensor_cutoff = _sensor_cutoff(sensor_name, cutoff)
+        if sensor_cutoff is None:
+            continue
+        while max_rows is None or archived < max_rows:
+            if keep_going is not None and not keep_going():
+                stopped = True
+                break
+            limit = chunk_size if max_rows is None else min(chunk_size, max_rows - archived)
+            with db.engine.begin() as conn:
+                ids = conn.execute(select_sql, {
+                    'sensor_name': sensor_name, 'cutoff': sensor_cutoff, 'max_id': processed_id, 'limit': limit
+                }).scalars().all()
+                if ids:
+                    conn.execute(archive_sql, {'ids': ids})
+                    conn.execute(_DELETE_SQL, {'ids': ids})
+            archived += len(ids)
+            if len(ids) < limit:
+                break
+            time.sleep(pause)
+        if stopped:
+            logger.info("Retention stopped early")
+            break
+
+    if archived:
+        logger.info(f"Retention archived {archived} readings from before {cutoff}")
+    return archived
+
+
+def run(timezone, gap_tolerance, days, max_rows=None, keep_going=None):
+    """Extract cycles from pending readings, then archive readings older than days.
+
+    keep_going() is called between chunks of both; see archive().
+    Returns (readings archived, cutoff).
+    """
+    cycles.update(timezone, gap_tolerance, max_rows, keep_going)
+    cutoff = cutoff_for(timezone, days)
+    return archive(cutoff, max_rows, keep_going=keep_going), cutoff
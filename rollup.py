@@ -0,0 +1,177 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# Hourly usage rollup (usage_hourly) behind the popular times charts
+import logging
+from sqlalchemy import inspect, text
+from models import db, SensorDataArchive
+import queries
+
+logger = logging.getLogger(__name__)
+
+# Bucket expressions matching the triggers: SQLite's DATE() applies the
+# stored UTC offset the same way strftime('%w'/'%H') does.
+_DAY_EXPRESSION = {
+    'sqlite': 'DATE(vib_date)',
+    'postgresql': 'CAST(vib_date AS DATE)',
+}
+_HOUR_EXPRESSION = {
+    'sqlite': "CAST(strftime('%H', vib_date) AS INTEGER)",
+    'postgresql': 'CAST(EXTRACT(HOUR FROM vib_date) AS INTEGER)',
+}
+_DOW_EXPRESSION = {
+    'sqlite': "CAST(strftime('%w', vib_date) AS INTEGER)",
+    'postgresql': 'CAST(EXTRACT(DOW FROM vib_date) AS INTEGER)',
+}
+
+
+def day_expression(dialect_name):
+    """SQL for the usage_hourly day of a sensor_data row."""
+    return _DAY_EXPRESSION.get(dialect_name, _DAY_EXPRESSION['sqlite'])
+
+
+def hour_expression(dialect_name):
+    """SQL for the usage_hourly hour of a sensor_data row."""
+    return _HOUR_EXPRESSION.get(dialect_name, _HOUR_EXPRESSION['sqlite'])
+
+
+def dow_expression(dialect_name):
+    """SQL for the usage_hourly day of week (0 is Sunday) of a sensor_data row."""
+    return _DOW_EXPRESSION.get(dialect_name, _DOW_EXPRESSION['sqlite'])
+
+# SQLite trigger keeping usage_hourly current for every insert, including
+# rows written straight into the database by the sensor gateways.
+SQLITE_TRIGGER_SQL = """
+CREATE TRIGGER IF NOT EXISTS trg_sensor_data_usage_hourly
+AFTER INSERT ON sensor_data
+WHEN NEW.sensor_name IS NOT NULL
+BEGIN
+    INSERT INTO usage_hourly (sensor_name, day, hour, dow, num_readings)
+    VALUES (
+        NEW.sensor_name,
+        DATE(NEW.vib_date),
+        CAST(strftime('%H', NEW.vib_date) AS INTEGER),
+        CAST(strftime('%w', NEW.vib_date) AS INTEGER),
+        1
+    )
+    ON CONFLICT (sensor_name, day, hour)
+    DO UPDATE SET num_readings = num_readings + 1;
+END
+"""
+
+POSTGRES_TRIGGER_SQL = [
+    """
+    CREATE OR REPLACE FUNCTION sensor_data_usage_hourly() RETURNS trigger AS $$
+    BEGIN
+        IF NEW.sensor_name IS NOT NULL THEN
+            INSERT INTO usage_hourly (sensor_name, day, hour, dow, num_readings)
+            VALUES (
+                NEW.sensor_name,
+                CAST(NEW.vib_date AS DATE),
+                CAST(EXTRACT(HOUR FROM NEW.vib_date) AS INTEGER),
+                CAST(EXTRACT(DOW FROM NEW.vib_date) AS INTEGER),
+                1
+            )
+            ON CONFLICT (sensor_name, day, hour)
+            DO UPDATE SET num_readings = usage_hourly.num_readings + 1;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS trg_sensor_data_usage_hourly ON sensor_data",
+    """
+    CREATE TRIGGER trg_sensor_data_usage_hourly
+    AFTER INSERT ON sensor_data
+    FOR EACH ROW EXECUTE FUNCTION sensor_data_usage_hourly()
+    """,
+]
+
+
+def install_trigger(conn):
+    """Create the insert trigger that maintains usage_hourly."""
+    if conn.dialect.name == 'postgresql':
+        for statement in POSTGRES_TRIGGER_SQL:
+            conn.execute(text(statement))
+    else:
+        conn.execute(text(SQLITE_TRIGGER_SQL))
+
+
+def drop_trigger(conn):
+    """Remove the insert trigger (bulk loads rebuild the rollup afterwards)."""
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text("DROP TRIGGER IF EXISTS trg_sensor_data_usage_hourly ON sensor_data"))
+    else:
+        conn.execute(text("DROP TRIGGER IF EXISTS trg_sensor_data_usage_hourly"))
+
+
+def rebuild(conn, sensor_type=None):
+    """Recompute usage_hourly from raw sensor_data and the retention archive.
+
+    Used to backfill the rollup when it is first created and to repair it
+    after rows were changed outside of inserts. Returns the number of
+    rollup rows written from raw readings.
+    """
+    day = day_expression(conn.dialect.name)
+    hour = hour_expression(conn.dialect.name)
+    dow = dow_expression(conn.dialect.name)
+    sensor_filter = 'AND sensor_name = :sensor_type' if sensor_type else ''
+    params = {'sensor_type': sensor_type} if sensor_type else {}
+
+    conn.execute(
+        text(f"DELETE FROM usage_hourly WHERE 1 = 1 {sensor_filter}"),
+        params
+    )
+    result = conn.execute(text(f"""
+        INSERT INTO usage_hourly (sensor_name, day, hour, dow, num_readings)
+        SELECT sensor_name, {day}, {hour}, {dow}, COUNT(*)
+        FROM sensor_data
+        WHERE sensor_name IS NOT NULL {sensor_filter}
+        GROUP BY sensor_name, {day}, {hour}, {dow}
+    """), params)
+    # Archived hours use the same buckets; add them to any raw readings
+    # backfilled into an archived hour since
+    if inspect(conn).has_table(SensorDataArchive.__tablename__):
+        conn.execute(text(f"""
+            INSERT INTO usage_hourly (sensor_name, day, hour, dow, num_readings)
+            SELECT sensor_name, day, hour, dow, num_readings
+            FROM sensor_data_archive
+            WHERE 1 = 1 {sensor_filter}
+            ON CONFLICT (sensor_name, day, hour)
+            DO UPDATE SET num_readings = usage_hourly.num_readings + excluded.num_readings
+        """), params)
+    logger.info(f"Rebuilt usage_hourly for {sensor_type or 'all sensors'}: {result.rowcount} rows")
+    return result.rowcount
+
+
+def usage_query(sensor_type, day_of_week=None):
+    """(statement, params) of the usage_by_hour() query."""
+    if day_of_week is None:
+        return text(queries.POPULAR_TIMES_WEEK_SQL), {'sensor_type': sensor_type}
+    return text(queries.POPULAR_TIMES_DAY_SQL), {'sensor_type': sensor_type, 'day_of_week': day_of_week}
+
+
+def usage_from_rows(rows):
+    """Turn usage_query() rows into the usage_by_hour() result."""
+    hourly = {}
+    total_days = {}
+    for dow, hour, num_days, num_readings in rows:
+        if hour is None:
+            total_days[int(dow)] = num_days
+        else:
+            hourly[(int(dow), int(hour))] = (num_days, num_readings)
+    return hourly, total_days
+
+
+def usage_by_hour(sensor_type, day_of_week=None):
+    """Read the hourly usage distribution of a sensor from the rollup.
+
+    Args:
+        sensor_type: The sensor name to read usage for
+        day_of_week: Optional day number (0-6 for Sun-Sat). If None, all
+                     seven days are returned by the same query.
+
+    Returns:
+        (hourly, total_days) where hourly maps (dow, hour) to
+        (num_days, num_readings) for hours 7-21 and total_days maps dow
+        to the number of distinct dates with any readings.
+    """
+    return usage_from_rows(db.session.execute(*usage_query(sensor_type, day_of_week)))
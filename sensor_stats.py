@@ -0,0 +1,140 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# Per-sensor reading counters (sensor_stats) behind the admin page
+import logging
+from sqlalchemy import inspect, text
+from models import SensorDataArchive
+
+logger = logging.getLogger(__name__)
+
+# SQLite trigger keeping sensor_stats current for every insert, including
+# rows written straight into the database by the sensor gateways. All SET
+# expressions see the old row, so last_reading is compared before it changes.
+SQLITE_TRIGGER_SQL = """
+CREATE TRIGGER IF NOT EXISTS trg_sensor_data_sensor_stats
+AFTER INSERT ON sensor_data
+WHEN NEW.sensor_name IS NOT NULL
+BEGIN
+    INSERT INTO sensor_stats (sensor_name, reading_count, first_reading, last_reading, last_voltage)
+    VALUES (NEW.sensor_name, 1, NEW.vib_date, NEW.vib_date, NEW.voltage)
+    ON CONFLICT (sensor_name) DO UPDATE SET
+        reading_count = reading_count + 1,
+        first_reading = MIN(first_reading, excluded.first_reading),
+        last_voltage = CASE WHEN excluded.last_reading >= last_reading
+                            THEN excluded.last_voltage ELSE last_voltage END,
+        last_reading = MAX(last_reading, excluded.last_reading);
+END
+"""
+
+POSTGRES_TRIGGER_SQL = [
+    """
+    CREATE OR REPLACE FUNCTION sensor_data_sensor_stats() RETURNS trigger AS $$
+    BEGIN
+        IF NEW.sensor_name IS NOT NULL THEN
+            INSERT INTO sensor_stats (sensor_name, reading_count, first_reading, last_reading, last_voltage)
+            VALUES (NEW.sensor_name, 1, NEW.vib_date, NEW.vib_date, NEW.voltage)
+            ON CONFLICT (sensor_name) DO UPDATE SET
+                reading_count = sensor_stats.reading_count + 1,
+                first_reading = LEAST(sensor_stats.first_reading, EXCLUDED.first_reading),
+                last_voltage = CASE WHEN EXCLUDED.last_reading >= sensor_stats.last_reading
+                                    THEN EXCLUDED.last_voltage ELSE sensor_stats.last_voltage END,
+                last_reading = GREATEST(sensor_stats.last_reading, EXCLUDED.last_reading);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS trg_sensor_data_sensor_stats ON sensor_data",
+    """
+    CREATE TRIGGER trg_sensor_data_sensor_stats
+    AFTER INSERT ON sensor_data
+    FOR EACH ROW EXECUTE FUNCTION sensor_data_sensor_stats()
+    """,
+]
+
+_STATS_COLUMNS = ('reading_count', 'first_reading', 'last_reading', 'last_voltage')
+
+
+def install_trigger(conn):
+    """Create the insert trigger that maintains sensor_stats."""
+    if conn.dialect.name == 'postgresql':
+        for statement in POSTGRES_TRIGGER_SQL:
+            conn.execute(text(statement))
+    else:
+        conn.execute(text(SQLITE_TRIGGER_SQL))
+
+
+def drop_trigger(conn):
+    """Remove the insert trigger (bulk loads reconcile afterwards)."""
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text("DROP TRIGGER IF EXISTS trg_sensor_data_sensor_stats ON sensor_data"))
+    else:
+        conn.execute(text("DROP TRIGGER IF EXISTS trg_sensor_data_sensor_stats"))
+
+
+def _read_stats(conn, sensor_type):
+    sensor_filter = 'WHERE sensor_name = :sensor_type' if sensor_type else ''
+    rows = conn.execute(text(
+        f"SELECT sensor_name, {', '.join(_STATS_COLUMNS)} FROM sensor_stats {sensor_filter}"
+    ), {'sensor_type': sensor_type} if sensor_type else {})
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+def reconcile(conn, sensor_type=None):
+    """Recompute sensor_stats from raw sensor_data and the retention archive.
+
+    Repairs drift from deleted or updated readings and backfills the table
+    when it is first created. Archived readings still count, so the totals
+    do not change when retention deletes raw rows. Returns {sensor_name:
+    (old, new)} for every sensor whose stats changed, each a
+    (reading_count, first_reading, last_reading, last_voltage) tuple or None.
+    """
+    sensor_filter = 'AND sensor_name = :sensor_type' if sensor_type else ''
+    params = {'sensor_type': sensor_type} if sensor_type else {}
+
+    sources = [f"""
+        SELECT sensor_name, COUNT(*) AS reading_count,
+               MIN(vib_date) AS first_reading, MAX(vib_date) AS last_reading
+        FROM sensor_data
+        WHERE sensor_name IS NOT NULL {sensor_filter}
+        GROUP BY sensor_name
+    """]
+    # Battery of a sensor without raw readings left: low end of its last archived hour
+    last_voltage = """(SELECT voltage FROM sensor_data latest
+                WHERE latest.sensor_name = totals.sensor_name
+                ORDER BY latest.vib_date DESC, latest.id DESC
+                LIMIT 1)"""
+    if inspect(conn).has_table(SensorDataArchive.__tablename__):
+        sources.append(f"""
+            SELECT sensor_name, SUM(num_readings), MIN(first_reading), MAX(last_reading)
+            FROM sensor_data_archive
+            WHERE 1 = 1 {sensor_filter}
+            GROUP BY sensor_name
+        """)
+        last_voltage = f"""COALESCE({last_voltage},
+               (SELECT voltage_min FROM sensor_data_archive archived
+                WHERE archived.sensor_name = totals.sensor_name
+                ORDER BY archived.last_reading DESC
+                LIMIT 1))"""
+
+    before = _read_stats(conn, sensor_type)
+    conn.execute(text(f"DELETE FROM sensor_stats WHERE 1 = 1 {sensor_filter}"), params)
+    conn.execute(text(f"""
+        INSERT INTO sensor_stats (sensor_name, reading_count, first_reading, last_reading, last_voltage)
+        SELECT totals.sensor_name, totals.reading_count, totals.first_reading, totals.last_reading,
+               {last_voltage}
+        FROM (
+            SELECT sensor_name, SUM(reading_count) AS reading_count,
+                   MIN(first_reading) AS first_reading, MAX(last_reading) AS last_reading
+            FROM ({' UNION ALL '.join(sources)}) source
+            GROUP BY sensor_name
+        ) totals
+    """), params)
+    after = _read_stats(conn, sensor_type)
+
+    drift = {
+        sensor_name: (before.get(sensor_name), after.get(sensor_name))
+        for sensor_name in set(before) | set(after)
+        if before.get(sensor_name) != after.get(sensor_name)
+    }
+    logger.info(f"Reconciled sensor_stats for {sensor_type or 'all sensors'}: {len(drift)} sensors changed")
+    return drift
@@ -0,0 +1,180 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# One database per laundry site: the shard resolver and per-request session routing
+import contextvars
+import glob
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from flask import g, has_app_context
+from sqlite_profile import ReadWriteSession
+
+logger = logging.getLogger(__name__)
+
+# Site names as they appear in /api/<location>/...; also keeps them safe
+# to put into file names and database names
+LOCATION_PATTERN = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+
+class UnknownLocation(LookupError):
+    """No database is configured for a site."""
+
+
+class Shard:
+    """The database of one site and the in-memory state built from it.
+
+    location is None for the app's own database (SQLALCHEMY_DATABASE_URI),
+    whose engines the session picks as before.
+    """
+
+    def __init__(self, location, engine, reader, recent_readings, status_cache):
+        self.location = location
+        self.engine = engine
+        self.reader = reader
+        self.recent_readings = recent_readings
+        self.status_cache = status_cache
+
+    def dispose(self):
+        for engine in (self.engine, self.reader):
+            if engine is not None:
+                engine.dispose()
+
+
+class ShardSession(ReadWriteSession):
+    """ReadWriteSession that runs everything on the current site's engines.
+
+    Inside an app context with g.shard set (see use_shard), queries go to
+    that site's reader when it has one and writes to its writer engine.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        shard = g.get('shard') if has_app_context() else None
+        if bind is None and shard is not None and shard.engine is not None:
+            if shard.reader is not None and not self._flushing and not getattr(clause, 'is_dml', False):
+                return shard.reader
+            return shard.engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def use_shard(shard):
+    """Route this app context's session and status state to shard."""
+    g.shard = shard
+
+
+class ShardResolver:
+    """Maps site names to their databases, opening each one on first use.
+
+    url_template holds a {location} placeholder, e.g.
+    sqlite:////data/sites/{location}.db or
+    postgresql://laundry@db-host/laundry_{location}. With a SQLite template
+    the sites are the database files that exist; otherwise they have to be
+    listed in locations. open_shard(location, url) builds a Shard. At most
+    max_open shards stay open; the least recently used one is closed
+    beyond that.
+    """
+
+    def __init__(self, url_template, open_shard, locations=None, max_open=256, fan_out_threads=8):
+        if '{location}' not in url_template:
+            raise ValueError('the shard URL needs a {location} placeholder')
+        self.url_template = url_template
+        self._open_shard = open_shard
+        self._locations = set(locations) if locations else None
+        self._max_open = max_open
+        self._lock = threading.Lock()
+        self._shards = OrderedDict()
+        self._executor = ThreadPoolExecutor(max_workers=fan_out_threads, thread_name_prefix='shard-fan-out')
+
+    def url(self, location):
+        return self.url_template.replace('{location}', location)
+
+    def _sqlite_path(self, location):
+        """Database file of a site, None when the template is not SQLite."""
+        if not self.url_template.startswith('sqlite'):
+            return None
+        return self.url(location).split(':///', 1)[1]
+
+    def exists(self, location):
+        """Whether a site is configured (without opening its database)."""
+        if not LOCATION_PATTERN.fullmatch(location or ''):
+            return False
+        if self._locations is not None:
+            return location in self._locations
+        path = self._sqlite_path(location)
+        return path is not None and os.path.exists(path)
+
+    def locations(self):
+        """Every configured site, sorted."""
+        if self._locations is not None:
+            return sorted(self._locations)
+        path = self._sqlite_path('{location}')
+        if path is None:
+            return []
+        prefix, suffix = path.split('{location}', 1)
+        found = []
+        for match in glob.glob(glob.escape(prefix) + '*' + glob.escape(suffix)):
+            location = match[len(prefix):len(match) - len(suffix)]
+            if LOCATION_PATTERN.fullmatch(location):
+                found.append(location)
+        return sorted(found)
+
+    def get(self, location):
+        """The open Shard of a site; raises UnknownLocation."""
+        with self._lock:
+            shard = self._shards.get(location)
+            if shard is not None:
+                self._shards.move_to_end(location)
+                return shard
+        if not self.exists(location):
+            raise UnknownLocation(location)
+        # Opening may migrate the database; not under the lock, so other
+        # sites keep being served meanwhile
+        shard = self._open_shard(location, self.url(location))
+        with self._lock:
+            existing = self._shards.get(location)
+            if existing is not None:
+                closed = [shard]  # opened concurrently by another thread
+                shard = existing
+            else:
+                self._shards[location] = shard
+                closed = []
+                while len(self._shards) > self._max_open:
+                    closed.append(self._shards.popitem(last=False)[1])
+        for old in closed:
+            old.dispose()
+        return shard
+
+    def open_count(self):
+        with self._lock:
+            return len(self._shards)
+
+    def fan_out(self, app, locations, func):
+        """Call func() once per site on the fan-out threads.
+
+        Every call runs in its own app context routed to its site, with the
+        caller's context variables (the request metrics). Returns
+        {location: (result, None)} or {location: (None, exception)}.
+        """
+        def run(location):
+            with app.app_context():
+                use_shard(self.get(location))
+                return func()
+
+        futures = {location: self._executor.submit(contextvars.copy_context().run, run, location)
+                   for location in locations}
+        results = {}
+        for location, future in futures.items():
+            try:
+                results[location] = (future.result(), None)
+            except Exception as e:
+                logger.warning(f"Site {location} failed: {e}")
+                results[location] = (None, e)
+        return results
+
+    def close(self):
+        with self._lock:
+            shards = list(self._shards.values())
+            self._shards.clear()
+        for shard in shards:
+            shard.dispose()
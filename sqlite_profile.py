@@ -0,0 +1,64 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# SQLite production profile: WAL journal, pragmas and the read/write engine split
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+# Bind key (SQLALCHEMY_BINDS) of the query-only engine
+READER_BIND = 'reader'
+
+
+def configure_engine(engine, read_only, busy_timeout_ms=5000, mmap_mb=128, cache_mb=32):
+    """Apply the production pragmas to every new connection of engine.
+
+    Args:
+        engine: SQLAlchemy engine of a SQLite database
+        read_only: Refuse writes on these connections (PRAGMA query_only)
+        busy_timeout_ms: How long a writer waits for another worker's lock
+        mmap_mb: Bytes of the database file read through mmap, in MiB
+        cache_mb: Page cache per connection, in MiB
+
+    With WAL, readers never block the writer and the writer never blocks
+    readers, so several gunicorn workers can share the file. Writer
+    transactions take the write lock when they begin (BEGIN IMMEDIATE): a
+    deferred transaction that read first and tries to write after another
+    worker committed fails with "database is locked" at once, without
+    waiting for busy_timeout.
+    """
+    @event.listens_for(engine, 'connect')
+    def _apply_pragmas(dbapi_connection, connection_record):
+        # Transactions are begun below (writer) or not at all (reader,
+        # every statement sees the latest commit) instead of by pysqlite
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode = WAL')
+        # Durable at checkpoints; a power cut may lose the last commits
+        # but never corrupts the database
+        cursor.execute('PRAGMA synchronous = NORMAL')
+        cursor.execute(f'PRAGMA busy_timeout = {int(busy_timeout_ms)}')
+        cursor.execute(f'PRAGMA mmap_size = {int(mmap_mb) * 1024 * 1024}')
+        cursor.execute(f'PRAGMA cache_size = {-int(cache_mb) * 1024}')
+        cursor.execute('PRAGMA temp_store = MEMORY')
+        if read_only:
+            cursor.execute('PRAGMA query_only = ON')
+        cursor.close()
+
+    if not read_only:
+        @event.listens_for(engine, 'begin')
+        def _begin_immediate(conn):
+            conn.exec_driver_sql('BEGIN IMMEDIATE')
+
+
+class ReadWriteSession(Session):
+    """Session that runs queries on the READER_BIND engine when there is one.
+
+    Flushes and INSERT/UPDATE/DELETE statements go to the default engine,
+    as does everything when no reader is configured (PostgreSQL, or the
+    production profile turned off).
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not getattr(clause, 'is_dml', False):
+            reader = self._db.engines.get(READER_BIND)
+            if reader is not None:
+                return reader
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
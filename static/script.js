@@ -107,6 +107,8 @@ function getBusynessCategory(percentage, category) {
  * @param {Object} dryerStatus - Dryer status data
  */
 function initializeStatus(washerStatus, dryerStatus) {
+    latestStatus = { washer: washerStatus, dryer: dryerStatus };
+    
     // Update washer status
     const washerStatusElement = document.getElementById('washer-status');
     washerStatusElement.textContent = washerStatus.message;
@@ -136,6 +138,57 @@ function initializeStatus(washerStatus, dryerStatus) {
     updatePopularTimes();
 }
 
+let latestStatus = {};
+let statusSource = null;
+let pollingTimer = null;
+// Seconds before a refused status stream is tried again
+const STREAM_RETRY_SECONDS = 300;
+
+/**
+ * Applies full or partial status data to the page
+ * @param {Object} data - Status objects keyed by sensor type; sensors that
+ *                        are missing keep their last known status
+ */
+function applyStatus(data) {
+    Object.assign(latestStatus, data);
+    const washer = latestStatus.washer;
+    const dryer = latestStatus.dryer;
+    
+    // Update washer status
+    const washerStatusElement = document.getElementById('washer-status');
+    washerStatusElement.textContent = washer.message;
+    washerStatusElement.className = washer.status;
+    
+    // Update dryer status
+    const dryerStatusElement = document.getElementById('dryer-status');
+    dryerStatusElement.textContent = dryer.message;
+    dryerStatusElement.className = dryer.status;
+    
+    // Update washer battery and temperature
+    updateBatteryStatus(washer.voltage, 'washer');
+    updateTemperatureDisplay(washer.temperature, 'washer');
+    
+    // Update dryer battery and temperature if available
+    if (dryer.voltage !== undefined) {
+        updateBatteryStatus(dryer.voltage, 'dryer');
+    }
+    if (dryer.temperature !== undefined) {
+        updateTemperatureDisplay(dryer.temperature, 'dryer');
+    }
+    
+    // Update operating status
+    updateOperatingStatus();
+    
+    // Update popular times only if there's a change
+    const now = new Date();
+    const currentDay = now.getDay();
+    const currentHour = now.getHours();
+    
+    if (lastDay !== currentDay || lastHour !== currentHour || lastWasherStatus !== washer.status) {
+        updatePopularTimes();
+    }
+}
+
 /**
  * Updates the status by fetching new data from the server
  */
@@ -145,46 +198,84 @@ function refreshStatus() {
             if (!response.ok) throw new Error('Status fetch failed: ' + response.status);
             return response.json();
         })
-        .then(data => {
-            // Update washer status
-            const washerStatusElement = document.getElementById('washer-status');
-            washerStatusElement.textContent = data.washer.message;
-            washerStatusElement.className = data.washer.status;
-            
-            // Update dryer status
-            const dryerStatusElement = document.getElementById('dryer-status');
-            dryerStatusElement.textContent = data.dryer.message;
-            dryerStatusElement.className = data.dryer.status;
-            
-            // Update washer battery and temperature
-            updateBatteryStatus(data.washer.voltage, 'washer');
-            updateTemperatureDisplay(data.washer.temperature, 'washer');
-            
-            // Update dryer battery and temperature if available
-            if (data.dryer.voltage !== undefined) {
-                updateBatteryStatus(data.dryer.voltage, 'dryer');
-            }
-            if (data.dryer.temperature !== undefined) {
-                updateTemperatureDisplay(data.dryer.temperature, 'dryer');
-            }
-            
-            // Update operating status
-            updateOperatingStatus();
-            
-            // Update popular times only if there's a change
-            const now = new Date();
-            const currentDay = now.getDay();
-            const currentHour = now.getHours();
-            
-            if (lastDay !== currentDay || lastHour !== currentHour || lastWasherStatus !== data.washer.status) {
-                updatePopularTimes();
-            }
-        })
+        .then(data => applyStatus(data))
         .catch(error => {
             console.error('Error refreshing status:', error);
         });
 }
 
+/**
+ * Keeps the clock and the popular times hour current without any request
+ */
+function checkLocalTime() {
+    updateOperatingStatus();
+    
+    const now = new Date();
+    if (lastDay !== now.getDay() || lastHour !== now.getHours()) {
+        updatePopularTimes();
+    }
+}
+
+/**
+ * Polls /api/status every refreshInterval seconds
+ * @param {number} refreshInterval - Polling interval in seconds
+ */
+function startPolling(refreshInterval) {
+    if (pollingTimer === null) {
+        pollingTimer = setInterval(refreshStatus, refreshInterval * 1000);
+    }
+}
+
+/**
+ * Stops polling once the status stream is open again
+ */
+function stopPolling() {
+    if (pollingTimer !== null) {
+        clearInterval(pollingTimer);
+        pollingTimer = null;
+    }
+}
+
+/**
+ * Opens the status stream; polls while it is down
+ * @param {number} refreshInterval - Polling interval in seconds
+ */
+function openStatusStream(refreshInterval) {
+    statusSource = new EventSource('/api/status/stream');
+    statusSource.onopen = () => stopPolling();
+    statusSource.addEventListener('status', event => {
+        applyStatus(JSON.parse(event.data));
+    });
+    statusSource.onerror = () => {
+        // A dropped stream is retried by the browser (CONNECTING); a refused
+        // one (CLOSED, e.g. 503 when the server has too many open streams)
+        // is not, so try it again later. Poll in the meantime
+        startPolling(refreshInterval);
+        if (statusSource.readyState === EventSource.CLOSED) {
+            statusSource = null;
+            // spread the retries of the refused dashboards
+            const delay = STREAM_RETRY_SECONDS * (1 + Math.random()) * 1000;
+            setTimeout(() => openStatusStream(refreshInterval), delay);
+        }
+    };
+}
+
+/**
+ * Subscribes to status changes pushed over Server-Sent Events, falling
+ * back to polling when EventSource is unavailable or the stream is down
+ * @param {number} refreshInterval - Polling interval in seconds
+ */
+function startStatusUpdates(refreshInterval) {
+    setInterval(checkLocalTime, refreshInterval * 1000);
+    
+    if (!window.EventSource) {
+        startPolling(refreshInterval);
+        return;
+    }
+    
+    openStatusStream(refreshInterval);
+}
+
 /**
  * Updates the popular times chart
  */
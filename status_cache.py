@@ -0,0 +1,130 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# In-process cache of computed sensor statuses for the dashboard endpoints
+import hashlib
+import json
+import threading
+import time
+
+# How long the list of active sensor types is trusted before re-reading
+# it (admin changes made in this worker clear it immediately)
+SENSOR_TYPES_TTL = 60
+
+
+class StatusSnapshot:
+    """A computed status and the moment it stops being accurate."""
+    __slots__ = ('status', 'expires_at', 'computed_at')
+
+    def __init__(self, status, expires_at, computed_at):
+        self.status = status
+        self.expires_at = expires_at
+        self.computed_at = computed_at
+
+
+class StatusCache:
+    """Cache of per-sensor status snapshots.
+
+    A snapshot is dropped when a new reading for its sensor shows up in
+    sensor_data (see RecentReadings.sync) or when its expires_at passes,
+    i.e. the next time a minute counter, the busy/free decision or the gap
+    tolerance would change the output.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshots = {}
+        self._sensor_types = None
+        self._sensor_types_loaded_at = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def clear(self):
+        """Forget every snapshot and the active sensor list."""
+        with self._lock:
+            self._snapshots.clear()
+            self._sensor_types = None
+
+    def invalidate(self, sensor_types):
+        """Drop the snapshots of sensor_types, or all of them when None."""
+        with self._lock:
+            if sensor_types is None:
+                self.invalidations += len(self._snapshots)
+                self._snapshots.clear()
+                return
+            for sensor_type in sensor_types:
+                if self._snapshots.pop(sensor_type, None) is not None:
+                    self.invalidations += 1
+
+    def cached_sensor_types(self):
+        """Return the cached active sensor types, or None when they are stale."""
+        with self._lock:
+            if self._sensor_types is not None and \
+                    time.monotonic() - self._sensor_types_loaded_at < SENSOR_TYPES_TTL:
+                return self._sensor_types
+        return None
+
+    def store_sensor_types(self, sensor_types):
+        """Cache freshly loaded active sensor types and return them."""
+        with self._lock:
+            self._sensor_types = sensor_types
+            self._sensor_types_loaded_at = time.monotonic()
+        return sensor_types
+
+    def sensor_types(self, loader):
+        """Return the cached active sensor types, reloading them with loader() when stale."""
+        sensor_types = self.cached_sensor_types()
+        if sensor_types is None:
+            sensor_types = self.store_sensor_types(loader())
+        return sensor_types
+
+    def get_many(self, sensor_types, compute, now):
+        """Return {sensor_type: StatusSnapshot}, computing the missing or expired ones.
+
+        Args:
+            sensor_types: Sensor types to look up
+            compute: Callable taking a list of sensor types and returning
+                     {sensor_type: (status, expires_at)}
+            now: Current time, comparable with expires_at
+        """
+        snapshots = {}
+        missing = []
+        with self._lock:
+            for sensor_type in sensor_types:
+                snapshot = self._snapshots.get(sensor_type)
+                if snapshot is not None and now < snapshot.expires_at:
+                    snapshots[sensor_type] = snapshot
+                    self.hits += 1
+                else:
+                    missing.append(sensor_type)
+                    self.misses += 1
+
+        if missing:
+            computed = compute(missing)
+            with self._lock:
+                for sensor_type, (status, expires_at) in computed.items():
+                    snapshot = StatusSnapshot(status, expires_at, now)
+                    self._snapshots[sensor_type] = snapshot
+                    snapshots[sensor_type] = snapshot
+
+        return {sensor_type: snapshots[sensor_type] for sensor_type in sensor_types}
+
+    def stats(self):
+        """Hit/miss counters for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'cached_sensors': sorted(self._snapshots),
+            }
+
+
+def payload_etag(payload):
+    """Content-based ETag, identical across gunicorn workers for the same JSON."""
+    serialized = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha1(serialized).hexdigest()
+
+
+status_cache = StatusCache()
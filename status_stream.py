@@ -0,0 +1,162 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# Server-Sent Events fan-out of sensor status changes
+import json
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Seconds between keepalive comments on an idle stream
+KEEPALIVE_INTERVAL = 15
+# Pending events per client before it is considered too slow and dropped
+SUBSCRIBER_QUEUE_SIZE = 16
+
+
+def _change_key(status):
+    """The status fields whose change is worth pushing to dashboards.
+
+    The message is included: it carries the minutes free or running, which
+    change while the other fields stay the same.
+    """
+    return (
+        status.get('status'),
+        status.get('minutes_remaining'),
+        status.get('message'),
+        status.get('voltage'),
+        status.get('temperature'),
+    )
+
+
+def format_event(event, data):
+    """Serialize one SSE event."""
+    return f"event: {event}\ndata: {json.dumps(data, sort_keys=True)}\n\n"
+
+
+class StatusBroadcaster:
+    """One producer thread per worker computes statuses and fans deltas out.
+
+    The producer runs only while at least one client is subscribed. Every
+    interval it computes all statuses once (through the status cache) and
+    queues, for every subscriber, only the sensors whose busy/free state,
+    remaining minutes, message, voltage or temperature changed.
+
+    Every open stream holds a worker thread, so at most max_subscribers
+    are served at once; subscribe() refuses the rest.
+    """
+
+    def __init__(self, app, compute, interval, max_subscribers=None):
+        self._app = app
+        self._compute = compute
+        self._interval = interval
+        self._max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._thread = None
+        self._current = {}
+        self._ready = threading.Event()
+        self.ticks = 0
+        self.events_sent = 0
+        self.dropped = 0
+        self.refused = 0
+
+    def subscribe(self):
+        """A queue of status deltas for a new stream, or None when max_subscribers are open."""
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            if self._max_subscribers is not None and len(self._subscribers) >= self._max_subscribers:
+                self.refused += 1
+                return None
+            self._subscribers.add(subscriber)
+            if self._thread is None or not self._thread.is_alive():
+                self._ready.clear()
+                self._thread = threading.Thread(target=self._run, name='status-broadcaster', daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def snapshot(self, timeout=10):
+        """Full status of every sensor as last computed by the producer."""
+        self._ready.wait(timeout)
+        with self._lock:
+            return dict(self._current)
+
+    def _publish(self, delta):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(delta)
+                self.events_sent += 1
+            except queue.Full:
+                # Too slow to keep up: end its stream, the browser reconnects
+                # and starts again from a full snapshot
+                self.unsubscribe(subscriber)
+                self.dropped += 1
+                while True:
+                    try:
+                        subscriber.get_nowait()
+                    except queue.Empty:
+                        break
+                subscriber.put_nowait(None)
+
+    def _tick(self):
+        with self._app.app_context():
+            statuses = self._compute()
+
+        with self._lock:
+            previous = self._current
+            self._current = statuses
+        self.ticks += 1
+        self._ready.set()
+
+        delta = {
+            sensor_type: status for sensor_type, status in statuses.items()
+            if sensor_type not in previous or _change_key(previous[sensor_type]) != _change_key(status)
+        }
+        if delta and previous:
+            self._publish(delta)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+            try:
+                self._tick()
+            except Exception:
+                logger.exception("Status broadcaster tick failed")
+            time.sleep(self._interval)
+
+    def stream(self, subscriber, max_seconds):
+        """Generate the SSE stream of a subscribe()d client.
+
+        The first event is the full status, later ones carry only changed
+        sensors. The stream ends after max_seconds so long-lived
+        connections are recycled; EventSource reconnects on its own.
+        """
+        try:
+            yield f"retry: {self._interval * 1000}\n\n"
+            yield format_event('status', self.snapshot())
+            deadline = time.monotonic() + max_seconds
+            while time.monotonic() < deadline:
+                try:
+                    delta = subscriber.get(timeout=KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if delta is None:
+                    break
+                yield format_event('status', delta)
+        finally:
+            self.unsubscribe(subscriber)
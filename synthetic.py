@@ -0,0 +1,244 @@
+# Version v1.2.0 - Last modified: 2026-10-17
+# Synthetic washer/dryer vibration traces for load and benchmark databases
+import logging
+import math
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import func, select, text
+from models import db, Sensor, SensorData
+import bulk_import
+
+logger = logging.getLogger(__name__)
+
+# Seconds between readings while a machine runs, as the ESP32 gateways send them
+READING_INTERVAL = 61
+# Readings written per transaction
+INSERT_BATCH_SIZE = 10000
+# Share of cycles with a pause in reporting shorter than the gap tolerance
+# (washer fill, a dropped packet); the status logic must bridge these
+MID_CYCLE_GAP_PROBABILITY = 0.3
+# Relative number of cycle starts per hour of the day (laundry room hours)
+HOUR_WEIGHTS = {7: 2, 8: 4, 9: 6, 10: 7, 11: 6, 12: 5, 13: 5, 14: 5,
+                15: 5, 16: 6, 17: 7, 18: 8, 19: 7, 20: 5, 21: 3}
+# Battery voltage right after a charge and when it gets recharged
+BATTERY_FULL = 4.2
+BATTERY_EMPTY = 3.5
+
+
+def sensor_names(count):
+    """washer, dryer, washer_2, dryer_2, ... (the name selects the cycle logic)."""
+    names = []
+    for index in range(count):
+        machine = 'washer' if index % 2 == 0 else 'dryer'
+        number = index // 2 + 1
+        names.append(machine if number == 1 else f'{machine}_{number}')
+    return names
+
+
+class TraceProfile:
+    """How one machine behaves: cycle length, usage and battery drain."""
+
+    def __init__(self, sensor_name, cycle_minutes, cycles_per_day, rng):
+        self.sensor_name = sensor_name
+        self.cycle_minutes = cycle_minutes
+        self.cycles_per_day = cycles_per_day
+        self.is_dryer = sensor_name.startswith('dryer')
+        self.battery_days = rng.uniform(20, 40)   # days from full to recharge
+        self.battery_phase = rng.uniform(0, 1)
+        self.boot = rng.randint(0, 1000)
+
+    def voltage(self, day_number, rng):
+        phase = (self.battery_phase + day_number / self.battery_days) % 1
+        return round(BATTERY_FULL - (BATTERY_FULL - BATTERY_EMPTY) * phase + rng.gauss(0, 0.01), 2)
+
+
+def expected_readings_per_day(profiles, gap_tolerance, sample_days=28):
+    """Average readings a day over all profiles, used to size a run by rows.
+
+    Simulates a few weeks of one washer and one dryer (cycle overlaps are
+    skipped, so the plain cycles x length estimate is too high).
+    """
+    rng = random.Random(-1)
+    sample = [TraceProfile(profile.sensor_name, profile.cycle_minutes, profile.cycles_per_day, rng)
+              for profile in profiles[:2]]
+    count = sum(
+        len(_cycle_readings(start, profile, day, gap_tolerance, rng))
+        for day in range(sample_days)
+        for profile in sample
+        for start in _cycle_starts(datetime(2024, 1, 1) + timedelta(days=day), profile, rng)
+    )
+    return count / sample_days * len(profiles) / len(sample)
+
+
+def _cycle_starts(day_start, profile, rng):
+    """Non-overlapping cycle start times of one machine on one day."""
+    weekend = day_start.weekday() >= 5
+    mean = profile.cycles_per_day * (1.3 if weekend else 1)
+    count = max(0, int(round(rng.gauss(mean, math.sqrt(mean)))))
+    hours = rng.choices(list(HOUR_WEIGHTS), weights=list(HOUR_WEIGHTS.values()), k=count)
+    starts = sorted(day_start + timedelta(hours=hour, seconds=rng.randint(0, 3599)) for hour in hours)
+
+    kept = []
+    busy_until = None
+    for start in starts:
+        if busy_until is None or start > busy_until:
+            kept.append(start)
+            busy_until = start + timedelta(minutes=profile.cycle_minutes * 1.3)
+    return kept
+
+
+def _cycle_readings(start, profile, day_number, gap_tolerance, rng):
+    """Reading times and values of one cycle, with an optional mid-cycle gap."""
+    length = max(10.0, rng.gauss(profile.cycle_minutes, profile.cycle_minutes * 0.08))
+    count = int(length * 60 / READING_INTERVAL) + 1
+    gap_at = gap_seconds = None
+    if rng.random() < MID_CYCLE_GAP_PROBABILITY and count > 4:
+        gap_at = rng.randint(2, count - 2)
+        gap_seconds = rng.uniform(2, gap_tolerance - 0.5) * 60
+
+    voltage = profile.voltage(day_number, rng)
+    base_temp = 28.0 if profile.is_dryer else 21.0
+    offset = 0.0
+    readings = []
+    for index in range(count):
+        if index == gap_at:
+            offset += gap_seconds - READING_INTERVAL
+        profile.boot += 1
+        readings.append((
+            start + timedelta(seconds=index * READING_INTERVAL + offset + rng.uniform(-0.5, 0.5)),
+            round(base_temp + rng.gauss(0, 1.5), 2),
+            round(rng.uniform(5, 15), 2),
+            profile.boot,
+            voltage,
+            rng.randint(-100, -40),
+        ))
+    return readings
+
+
+def generate_rows(profiles, start_day, days, timezone, gap_tolerance, seed=0, until=None):
+    """Yield sensor_data rows day by day, each day ordered by time.
+
+    Rows are dicts ready for the sensor_data insert; vib_date is the
+    site-local wall time as a datetime with the site UTC offset attached.
+    Readings after until (default: now) are not generated.
+    """
+    rng = random.Random(seed)
+    until = until or datetime.now(timezone)
+    for day_number in range(days):
+        day_start = start_day + timedelta(days=day_number)
+        # Cycles run between 7:00 and 23:00, well clear of DST switches at 2:00
+        offset = timezone.localize(day_start + timedelta(hours=12)).tzinfo
+        day_rows = []
+        for profile in profiles:
+            for cycle_start in _cycle_starts(day_start, profile, rng):
+                for vib_date, temp, vibration, boot, voltage, rssi in _cycle_readings(
+                        cycle_start, profile, day_number, gap_tolerance, rng):
+                    day_rows.append({
+                        'sensor_name': profile.sensor_name,
+                        'vib_date': vib_date.replace(tzinfo=offset),
+                        'temp': temp,
+                        'vibration': vibration,
+                        'boot': boot,
+                        'voltage': voltage,
+                        'rssi': rssi,
+                    })
+        day_rows.sort(key=lambda row: row['vib_date'])
+        for row in day_rows:
+            if row['vib_date'] > until:
+                return
+            yield row
+
+
+def _register_sensors(profiles, timezone):
+    """Add an active Sensor row for every generated sensor name."""
+    existing = {row[0] for row in db.session.query(Sensor.sensor_type)}
+    now = datetime.now(timezone).replace(tzinfo=None)
+    for index, profile in enumerate(profiles):
+        if profile.sensor_name in existing:
+            continue
+        db.session.add(Sensor(
+            mac_address=f'02:00:00:00:{index // 256:02X}:{index % 256:02X}',
+            sensor_type=profile.sensor_name,
+            name=f'Synthetic {profile.sensor_name}',
+            location='Synthetic data',
+            created_at=now,
+            status='active',
+        ))
+    db.session.commit()
+
+
+def populate(timezone, gap_tolerance, sensors=2, days=None, rows=None, end=None, seed=0,
+             washer_cycle=37, dryer_cycle=64, cycles_per_day=6, progress=None):
+    """Fill sensor_data with synthetic traces ending at end (default: now).
+
+    Give either days of history or a target number of rows (the history is
+    then sized to about that many rows and cut off if it reaches it). The
+    usage_hourly and sensor_stats triggers and the secondary indexes are
+    dropped during the load and rebuilt once afterwards, which is much
+    faster than trigger calls and index updates per row; do not run this
+    while real gateways write to the same database.
+
+    Returns (rows written, first day, days of history).
+    """
+    rng = random.Random(seed)
+    profiles = [
+        TraceProfile(name, dryer_cycle if name.startswith('dryer') else washer_cycle, cycles_per_day, rng)
+        for name in sensor_names(sensors)
+    ]
+    if days is None:
+        if rows is None:
+            raise ValueError('days or rows is required')
+        days = max(1, math.ceil(rows / expected_readings_per_day(profiles, gap_tolerance)))
+
+    end = end or datetime.now(timezone)
+    start_day = datetime.combine((end - timedelta(days=days - 1)).date(), datetime.min.time())
+
+    _register_sensors(profiles, timezone)
+
+    written = 0
+    with db.engine.begin() as conn:
+        bulk_import.drop_deferrable_indexes(conn)
+    try:
+        batch = []
+        for row in generate_rows(profiles, start_day, days, timezone, gap_tolerance, seed, until=end):
+            batch.append(row)
+            if len(batch) >= INSERT_BATCH_SIZE or (rows is not None and written + len(batch) >= rows):
+                with db.engine.begin() as conn:
+                    bulk_import.write_batch(conn, batch)
+                written += len(batch)
+                batch = []
+                if progress:
+                    progress(written)
+                if rows is not None and written >= rows:
+                    break
+        if batch:
+            with db.engine.begin() as conn:
+                bulk_import.write_batch(conn, batch)
+            written += len(batch)
+    finally:
+        with db.engine.begin() as conn:
+            bulk_import.restore_deferrable_indexes(conn)
+
+    # Last seen and battery as the gateways would have left them
+    with db.engine.begin() as conn:
+        for profile in profiles:
+            latest = conn.execute(
+                select(SensorData.vib_date, SensorData.voltage)
+                .where(SensorData.sensor_name == profile.sensor_name)
+                .order_by(SensorData.vib_date.desc())
+                .limit(1)
+            ).first()
+            if latest is not None:
+                conn.execute(text(
+                    "UPDATE sensors SET last_seen = :last_seen, battery = :battery "
+                    "WHERE sensor_type = :sensor_name AND status = 'active'"
+                ), {'last_seen': latest.vib_date.replace(tzinfo=None), 'battery': latest.voltage,
+                    'sensor_name': profile.sensor_name})
+
+    logger.info(f"Generated {written} synthetic readings for {sensors} sensors over {days} days")
+    return written, start_day.date(), days
+
+
+def count_readings():
+    """Number of rows in sensor_data."""
+    return db.session.execute(select(func.count()).select_from(SensorData)).scalar()